@@ -0,0 +1,13 @@
+"""
+Benchmarks of the hot paths: map building, sensing, stepping the
+adversaries and placement. Run from the root of the repository with
+
+    python -m benchmarks --output results.json
+    python -m benchmarks --output new.json --compare results.json
+
+Results are JSON keyed by benchmark name, so runs on different commits can
+be compared. Nothing is displayed, so the benchmarks run headless.
+"""
+import matplotlib
+
+matplotlib.use('Agg')
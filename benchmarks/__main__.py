@@ -0,0 +1,92 @@
+import argparse
+import datetime
+import importlib
+import json
+import platform
+import subprocess
+import sys
+from typing import Dict, Optional
+
+import numpy as np
+
+# Benchmark modules, each has run(quick) returning results by benchmark name
+SUITES = ['roommap', 'sensors', 'adversary', 'placement']
+
+
+def _commit() -> Optional[str]:
+    """
+    Commit of the checkout being benchmarked, None outside of git
+    """
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results: Dict[str, dict], baseline: Dict[str, dict], threshold: float) -> bool:
+    """
+    Print the change of the best time of every benchmark in both runs, the
+    best time is the least affected by other load on the machine
+
+    :param threshold: Relative slow down that counts as a regression
+    :return: True if any benchmark regressed
+    """
+    regressed = False
+    for name in sorted(set(results) & set(baseline)):
+        ratio = results[name]['min'] / baseline[name]['min']
+        flag = ''
+        if ratio > 1 + threshold:
+            flag = '  REGRESSION'
+            regressed = True
+        print('{:60} {:12.6f}s {:7.2f}x{}'.format(name, results[name]['min'], ratio, flag))
+    return regressed
+
+
+def main():
+    parser = argparse.ArgumentParser(description='''Benchmark the hot paths and
+                                     write the results as JSON''')
+    parser.add_argument('--output', help='''File to write the results to, by
+                        default they are printed''')
+    parser.add_argument('--only', nargs='+', choices=SUITES, default=SUITES,
+                        help='Only run these benchmark suites')
+    parser.add_argument('--quick', action='store_true', help='''Skip the
+                        largest problem sizes and repeat less''')
+    parser.add_argument('--compare', type=argparse.FileType('r'), help='''Results
+                        of an earlier run to compare against''')
+    parser.add_argument('--threshold', type=float, default=0.2, help='''Relative
+                        slow down of the best time that counts as a
+                        regression''')
+    args = parser.parse_args()
+
+    results = {}
+    for suite in args.only:
+        print('Running {} benchmarks'.format(suite), file=sys.stderr)
+        module = importlib.import_module('benchmarks.bench_{}'.format(suite))
+        results.update(module.run(args.quick))
+
+    output = {
+        'meta': {
+            'commit': _commit(),
+            'date': datetime.datetime.now(datetime.timezone.utc).isoformat(),
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'platform': platform.platform(),
+            'quick': args.quick
+        },
+        'results': results
+    }
+
+    if args.output is None:
+        print(json.dumps(output, indent=2))
+    else:
+        with open(args.output, 'w') as f:
+            json.dump(output, f, indent=2)
+
+    if args.compare is not None:
+        if compare(results, json.load(args.compare)['results'], args.threshold):
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,35 @@
+"""
+Step rate of the adversaries, one at a time and as a vectorized pool
+"""
+from typing import Dict
+
+import numpy as np
+
+from benchmarks.maps import environment
+from benchmarks.timing import measure
+from surveillance.adversary import Adversary, AdversaryPool
+from surveillance.evaluation import random_adversary_poses
+
+
+# Number of adversaries in the pool that is stepped
+POOL_SIZES = [1, 100, 10000]
+
+
+def run(quick: bool = False) -> Dict[str, dict]:
+    map_environment = environment('very_large_map')
+
+    results = {}
+    for size in POOL_SIZES[:-1] if quick else POOL_SIZES:
+        adversaries = [Adversary(1, {'radius': 10, 'speed': 5}, map_environment)
+                       for _ in range(size)]
+        pool = AdversaryPool(adversaries)
+        pool.place(*random_adversary_poses(map_environment, size, 10, np.random.default_rng(0)))
+
+        if size == 1:
+            results['adversary.update'] = measure(adversaries[0].update)
+
+        result = measure(pool.update, adversaries=size)
+        result['steps_per_second'] = size / result['median']
+        results['adversary_pool.update.{}'.format(size)] = result
+
+    return results
@@ -0,0 +1,83 @@
+"""
+Every placement step on the bundled maps, and the line placement as the
+number of line sensors grows
+"""
+import contextlib
+import io
+import math
+from typing import Dict, List
+
+from benchmarks.maps import MAPS, environment
+from benchmarks.timing import measure
+from surveillance.environment import Environment
+from surveillance.graph import CompactGraph
+from surveillance.helpers import _get_hallways
+from surveillance.placement.camera import CameraSensorPlacement
+from surveillance.placement.line import LineSensorPlacement
+from surveillance.placement.robot import RobotPlacement
+from surveillance.sensors.base import Sensor
+from surveillance.sensors.factory import SensorFactory
+
+
+# Sensors placed on every map, the same as configs/example.yaml
+SENSORS = [
+    {'type': 'Line', 'name': 'Line A'},
+    {'type': 'Line', 'name': 'Line B'},
+    {'type': 'Robot', 'name': 'Robot A', 'speed': 10},
+    {'type': 'Camera', 'name': 'Camera A', 'range': 200}
+]
+
+# Most hallway combinations the exhaustive line placement is timed on
+MAX_COMBINATIONS = 20000
+
+
+def _sensors(map_environment: Environment, configs: List[dict]) -> List[Sensor]:
+    factory = SensorFactory(1, map_environment)
+    return [factory.construct(config) for config in configs]
+
+
+def run(quick: bool = False) -> Dict[str, dict]:
+    results = {}
+    repeat = 1 if quick else 3
+
+    # The steps in the order Placement runs them, each on the graph left by
+    # the previous step
+    for name in MAPS:
+        map_environment = environment(name)
+        sensors = _sensors(map_environment, SENSORS)
+        graph = CompactGraph.from_dict(map_environment.room_map.reduced_graph)
+
+        steps = [('line', LineSensorPlacement(map_environment)),
+                 ('camera', CameraSensorPlacement(map_environment)),
+                 ('robot', RobotPlacement(map_environment))]
+        for (step_name, step) in steps:
+            results['placement.{}.{}'.format(step_name, name)] = measure(
+                lambda: step.place(sensors, graph), repeat=repeat)
+
+            with contextlib.redirect_stdout(io.StringIO()):
+                result = step.place(sensors, graph)
+            for placement in result.placements:
+                sensors.remove(placement.sensor)
+            graph = result.graph
+
+    # Line placement with more and more line sensors, until there are too
+    # many combinations of hallways to check them all
+    map_environment = environment('very_large_map')
+    graph = CompactGraph.from_dict(map_environment.room_map.reduced_graph)
+    num_hallways = len(_get_hallways(map_environment.room_map))
+    step = LineSensorPlacement(map_environment, strategy='exhaustive')
+
+    max_combinations = MAX_COMBINATIONS // 10 if quick else MAX_COMBINATIONS
+    for k in range(1, num_hallways + 1):
+        combinations = math.comb(num_hallways, k)
+        if combinations > max_combinations:
+            break
+
+        sensors = _sensors(map_environment, [{'type': 'Line', 'name': str(index)}
+                                             for index in range(k)])
+        result = measure(lambda: step.place(sensors, graph), repeat=repeat,
+                         sensors=k, combinations=combinations)
+        result['combinations_per_second'] = combinations / result['median']
+        results['placement.line.very_large_map.k{}'.format(k)] = result
+
+    return results
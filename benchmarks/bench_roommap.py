@@ -0,0 +1,33 @@
+"""
+RoomMap construction (classifying the boxes and reducing the graph),
+reduce_graph on its own and rendering the map image
+"""
+from typing import Dict
+
+from benchmarks.maps import MAPS, box_matrix, synthetic_maps
+from benchmarks.timing import measure
+from surveillance.roombuilder.roombuilder import RoomMap
+
+
+# Pixels per box when rendering, so the largest maps fit in memory
+RENDER_BOX_SIZE = 10
+
+
+def run(quick: bool = False) -> Dict[str, dict]:
+    matrices = {name: box_matrix(name) for name in MAPS}
+    synthetic = synthetic_maps()
+    if quick:
+        synthetic = dict(list(synthetic.items())[:2])
+    matrices.update(synthetic)
+
+    results = {}
+    for (name, matrix) in matrices.items():
+        room_map = RoomMap(matrix)
+        size = dict(boxes=int(matrix.size), reduced_nodes=len(room_map.reduced_graph))
+
+        results['roommap.construct.{}'.format(name)] = measure(lambda: RoomMap(matrix), **size)
+        results['roommap.reduce_graph.{}'.format(name)] = measure(room_map.reduce_graph, **size)
+        results['roommap.render.{}'.format(name)] = measure(lambda: room_map.render(RENDER_BOX_SIZE),
+                                                            box_size=RENDER_BOX_SIZE, **size)
+
+    return results
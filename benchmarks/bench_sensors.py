@@ -0,0 +1,58 @@
+"""
+Detection tests and ray casts of every sensor type against pools of
+adversaries
+"""
+from typing import Dict
+
+import numpy as np
+
+from benchmarks.maps import environment
+from benchmarks.timing import measure
+from surveillance.adversary import Adversary, AdversaryPool
+from surveillance.evaluation import random_adversary_poses
+from surveillance.sensors.camera import CameraSensor
+from surveillance.sensors.line import LineSensor
+from surveillance.sensors.robot import Robot
+
+
+# Number of adversaries in the pool the sensors check
+POOL_SIZES = [1, 100, 10000]
+
+
+def _pool(size: int) -> AdversaryPool:
+    """
+    Pool of adversaries at random poses on very_large_map, the same poses
+    every run
+    """
+    map_environment = environment('very_large_map')
+    pool = AdversaryPool([Adversary(1, {'radius': 10, 'speed': 5}, map_environment)
+                          for _ in range(size)])
+    pool.place(*random_adversary_poses(map_environment, size, 10, np.random.default_rng(0)))
+    return pool
+
+
+def run(quick: bool = False) -> Dict[str, dict]:
+    map_environment = environment('very_large_map')
+
+    # Sensors in the middle of the large open room at the top left, looking
+    # across it
+    sensors = {
+        'line': LineSensor(1, map_environment, {'name': 'Line'}),
+        'camera': CameraSensor(1, map_environment, {'name': 'Camera', 'range': 400}),
+        'robot': Robot(1, map_environment, {'name': 'Robot', 'range': 200})
+    }
+    for sensor in sensors.values():
+        sensor.place(200, 300, 0.3)
+
+    results = {}
+    results['sensor.line._get_endpoint'] = measure(sensors['line']._get_endpoint)
+    results['sensor.camera._get_endpoint'] = measure(lambda: sensors['camera']._get_endpoint(0.3))
+    results['sensor.robot._get_endpoint'] = measure(lambda: sensors['robot']._get_endpoint(0.3))
+
+    for size in POOL_SIZES[:-1] if quick else POOL_SIZES:
+        pool = _pool(size)
+        for (name, sensor) in sensors.items():
+            results['sensor.{}.adversary_detected.{}'.format(name, size)] = measure(
+                lambda: sensor.adversary_detected(pool), adversaries=size)
+
+    return results
@@ -0,0 +1,47 @@
+"""
+Shared maps for the benchmarks: the bundled assets and synthetic maps of
+increasing size
+"""
+from functools import lru_cache
+from typing import Dict
+
+import numpy as np
+
+from surveillance.environment import Environment
+from surveillance.roombuilder.generator import generate_floor_plan
+from surveillance.roombuilder.roombuilder import RoomMap
+
+
+# Bundled maps, all use a scale of 1 pixel per CM
+MAPS = ['small_map', 'big_map', 'very_large_map']
+
+# Boxes along each side of the synthetic maps
+SYNTHETIC_SIZES = [50, 100, 200, 400, 1000]
+
+# Boxes of floor per room of the synthetic maps
+SYNTHETIC_BOXES_PER_ROOM = 150
+
+
+@lru_cache(maxsize=None)
+def environment(name: str) -> Environment:
+    """
+    Load a bundled map once per run
+    """
+    return Environment('assets/{}.png'.format(name), 1, 'assets/{}.pickle'.format(name))
+
+
+def box_matrix(name: str) -> np.ndarray:
+    """
+    Box matrix of a bundled map
+    """
+    return np.asarray(RoomMap.load('assets/{}.pickle'.format(name)).map)
+
+
+def synthetic_maps() -> Dict[str, np.ndarray]:
+    """
+    Generated box matrices by name, smallest first. The seed is fixed so
+    every run benchmarks the same maps
+    """
+    return {'synthetic_{}x{}'.format(size, size):
+            generate_floor_plan(size, size, size * size // SYNTHETIC_BOXES_PER_ROOM, seed=0)
+            for size in SYNTHETIC_SIZES}
@@ -0,0 +1,33 @@
+"""
+Timing helpers shared by the benchmarks
+"""
+import contextlib
+import io
+import time
+from typing import Callable
+
+
+def measure(func: Callable[[], object], repeat: int = 5, min_time: float = 0.05, **params) -> dict:
+    """
+    Time a function like timeit: the number of calls per run is doubled
+    until a run takes at least min_time, then the best and median time per
+    call over repeat runs are kept. Anything the function prints is dropped.
+
+    :param params: Extra values stored with the result (i.e. the problem size)
+    :return: The result, times are in seconds per call
+    """
+    def run(number: int) -> float:
+        with contextlib.redirect_stdout(io.StringIO()):
+            start = time.perf_counter()
+            for _ in range(number):
+                func()
+            return time.perf_counter() - start
+
+    number = 1
+    elapsed = run(number)
+    while elapsed < min_time:
+        number *= 2
+        elapsed = run(number)
+
+    times = sorted([elapsed / number] + [run(number) / number for _ in range(repeat - 1)])
+    return dict(params, min=times[0], median=times[len(times) // 2], number=number, repeat=repeat)
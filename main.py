@@ -5,11 +5,17 @@ import matplotlib.pyplot as plt
 import numpy as np
 import yaml
 
+from surveillance import instrumentation
 from surveillance.adversary import Adversary, AdversaryPool
+from surveillance.cache import ArtifactCache
 from surveillance.environment import Environment
+from surveillance.evaluation import evaluate_placement
+from surveillance.mapbundle import load_bundle
+from surveillance.policies import PolicyFactory
 from surveillance.sensors.base import Sensor
 from surveillance.sensors.factory import SensorFactory
 from surveillance.placement.placement import Placement
+from surveillance.simulator import DetectionEvent, Simulator
 
 
 def main():
@@ -17,10 +23,37 @@ def main():
                                      configurations virtually''')
     parser.add_argument('config', type=argparse.FileType('r'), help='''Config
                         file to load surveillance settings from''')
+    parser.add_argument('--headless', action='store_true', help='''Run the
+                        simulation without displaying it, only the detections
+                        are printed''')
+    parser.add_argument('--trials', type=int, help='''Instead of running the
+                        simulation, evaluate the placement against this many
+                        adversaries with random starting poses and speeds''')
+    parser.add_argument('--workers', type=int, help='''Number of processes
+                        to split the trials across''')
+    parser.add_argument('--cache', help='''Directory to keep the artifacts
+                        derived from the map in (i.e. camera coverage tables),
+                        so they are reused across runs''')
+    parser.add_argument('--cache-size', type=int, default=512, help='''Maximum
+                        size of the cache in megabytes, the least recently
+                        used artifacts are removed first''')
+    parser.add_argument('--profile', help='''Time the hot paths and profile
+                        the run, a summary per phase is printed and the
+                        cProfile stats are written to this file (trials run
+                        by --workers are not included)''')
     args = parser.parse_args()
 
+    if args.profile is None:
+        run(args)
+    else:
+        with instrumentation.profile(args.profile):
+            run(args)
+
+
+def run(args: argparse.Namespace) -> None:
     # Setup the viewing
-    fig, ax = plt.subplots()
+    if not args.headless and args.trials is None:
+        fig, ax = plt.subplots()
 
     # Parse the config
     config = yaml.load(args.config, Loader=yaml.Loader)
@@ -28,10 +61,17 @@ def main():
     pixel_to_cm = config['environment']['map']['pixel_to_cm']
     max_timesteps = config['environment'].get('max_timesteps', np.inf)
 
-    # Create the environment
-    environment = Environment(config['environment']['map']['image'],
-                              pixel_to_cm,
-                              config['environment']['map']['graph'])
+    # Create the environment, from a map bundle if there is one
+    map_config = config['environment']['map']
+    with instrumentation.phase('environment'):
+        if 'bundle' in map_config:
+            environment = load_bundle(map_config['bundle'], pixel_to_cm)
+        else:
+            cache = None
+            if args.cache is not None:
+                cache = ArtifactCache(args.cache, args.cache_size * 2**20)
+            environment = Environment(map_config['image'], pixel_to_cm,
+                                      map_config['graph'], cache)
 
     # Pull in the test adversaries
     adversaries: List[Adversary] = []
@@ -49,26 +89,64 @@ def main():
         sensors.append(sensor_factory.construct(sensor_config))
 
     # Determine the ideal positions
-    placer = Placement(environment)
-    placements = placer.get_placement(sensors)
+    placer = Placement(environment, config.get('placement'))
+    with instrumentation.phase('placement'):
+        placements = placer.get_placement(sensors)
 
     for placement in placements.placements:
         # TODO: Remove hard coded value
         print(placement.pose)
-        placement.sensor.place(placement.pose.x, placement.pose.y, placement.pose.theta)
+        placement.apply()
+
+    # Adversaries with a policy are steered by it, the rest go straight
+    policy_factory = PolicyFactory(environment, sensors)
+    policies = [policy_factory.construct(adversary_config['policy'])
+                if 'policy' in adversary_config else None
+                for adversary_config in config['adversaries']]
+
+    if args.trials is not None:
+        # Adversaries take on the size of the first configured adversary
+        # with speeds up to its configured speed, and its policy
+        adversary_config = config['adversaries'][0]
+        with instrumentation.phase('evaluation'):
+            result = evaluate_placement(
+                environment, placements, args.trials,
+                max_timesteps=config['environment'].get('max_timesteps', 500),
+                radius=adversary_config.get('radius', 10),
+                speed=(1, adversary_config.get('speed', 1)),
+                workers=args.workers,
+                policy=policies[0])
+        print(yaml.dump(result.summary(), sort_keys=False))
+        return
 
     for adversary in adversaries:
         adversary.place(350, 210, 0)
 
-    # Simulation loop
-    timestep = 0
-    while timestep < max_timesteps:
+    for (index, policy) in enumerate(policies):
+        if policy is not None:
+            adversary_pool.add_policy(policy, [index])
+
+    simulator = Simulator(environment, sensors, adversary_pool, max_timesteps)
+
+    if args.headless:
+        # Print the events as they happen, the run may never end
+        def report(timestep: int, events: List[DetectionEvent]) -> None:
+            for event in events:
+                print('Timestep {}: Adversary detected by sensor {}'.format(
+                    event.timestep, event.sensor.name))
+
+        with instrumentation.phase('simulation'):
+            simulator.run(report, keep_events=False)
+        return
+
+    # for stopping simulation with the esc key.
+    fig.canvas.mpl_connect(
+        'key_release_event',
+        lambda event: [exit(0) if event.key == 'escape' else None])
+
+    def draw(timestep: int, events: List[DetectionEvent]) -> None:
         print('Timestep: {}'.format(timestep))
         plt.cla()
-        # for stopping simulation with the esc key.
-        plt.gcf().canvas.mpl_connect(
-            'key_release_event',
-            lambda event: [exit(0) if event.key == 'escape' else None])
 
         # Display the environment
         environment.display(ax)
@@ -81,24 +159,16 @@ def main():
         for adversary in adversaries:
             adversary.display(ax)
 
-        # Detect adversaries
-        for sensor in sensors:
-            if sensor.adversary_detected(adversary_pool):
-                sensor.display(ax, color='r')
-                print('Adversary detected by sensor {}'.format(
-                    sensor.name))
-
-        # Update sensors
-        for sensor in sensors:
-            sensor.update()
-
-        # Update adversaries
-        for adversary in adversaries:
-            adversary.update()
+        # Highlight the sensors that detected an adversary
+        for event in events:
+            event.sensor.display(ax, color='r')
+            print('Adversary detected by sensor {}'.format(event.sensor.name))
 
         # Update loop
         plt.pause(0.0001)
-        timestep += 1
+
+    with instrumentation.phase('simulation'):
+        simulator.run(on_step=draw, keep_events=False)
 
     plt.show()
 
@@ -1,4 +1,4 @@
-from typing import List
+from typing import TYPE_CHECKING, List, Tuple
 
 from matplotlib.axes._axes import Axes
 import matplotlib.pyplot as plt
@@ -6,10 +6,49 @@ import numpy as np
 
 from surveillance.base import SurveillanceObject
 from surveillance.environment import Environment
+from surveillance.instrumentation import instrument
+from surveillance.raycast import segments_hit_circles
+from surveillance.spatial import UniformGrid
+
+if TYPE_CHECKING:
+    # The policies import the sensors, which import the adversaries
+    from surveillance.policies import AdversaryPolicy
+
+
+def _pooled(name: str) -> property:
+    """
+    Attribute of an adversary that is stored in the arrays of its pool once
+    the adversary is added to one. Unplaced positions are stored as NaN in
+    the pool and read back as None
+    """
+    def getter(self):
+        if self.pool is None:
+            return self.__dict__.get(name)
+        value = getattr(self.pool, name)[self.index]
+        return None if np.isnan(value) else value
+
+    def setter(self, value):
+        if self.pool is None:
+            self.__dict__[name] = value
+        else:
+            getattr(self.pool, name)[self.index] = np.nan if value is None else value
+            self.pool.grid_stale = True
+
+    return property(getter, setter)
 
 
 class Adversary(SurveillanceObject):
+    x = _pooled('x')
+    y = _pooled('y')
+    theta = _pooled('theta')
+    radius = _pooled('radius')
+    speed = _pooled('speed')
+
     def __init__(self, pixel_to_cm: float, config, environment: Environment):
+        # Set by AdversaryPool, once set the state lives in the pool
+        self.pool = None
+        self.index = None
+
         SurveillanceObject.__init__(self, pixel_to_cm)
         self.radius = config.get('radius', 10)
         self.speed = config.get('speed', 1)
@@ -32,6 +71,7 @@ class Adversary(SurveillanceObject):
         distance = np.sqrt((x - self.x) ** 2 + (y - self.y) ** 2)
         return distance <= self.radius
 
+    @instrument
     def update(self) -> None:
         # Check if the path forward is clear accounting for the radius
         x_i = self.x + self.speed * np.cos(self.theta)
@@ -52,13 +92,147 @@ class Adversary(SurveillanceObject):
 
 class AdversaryPool:
     """
-    Collection of the adversaries
+    Collection of the adversaries. The state of every adversary is stored as
+    a struct of arrays (x, y, theta, speed and radius) so that the whole pool
+    can be moved and queried with vectorized operations. The Adversary
+    objects remain as views into these arrays for display and placement.
+
+    Larger pools keep a uniform grid index of the adversaries over the
+    environment map, so point and segment queries only test the
+    adversaries in the cells they cross. The index is brought up to date
+    before a query if anything moved, only the adversaries that changed cell
+    are moved in it.
     """
+    # Below this many adversaries queries test every adversary, which is
+    # faster than going through the grid
+    GRID_MIN_ADVERSARIES = 1000
+
+    # Smallest grid cell in pixels
+    GRID_MIN_CELL_PX = 16
+
     def __init__(self, adversaries: List[Adversary]):
         self.adversaries = adversaries
+        self.environment = adversaries[0].environment if adversaries else None
+
+        def gather(name: str) -> np.ndarray:
+            values = [getattr(adversary, name) for adversary in adversaries]
+            return np.array([np.nan if value is None else value
+                             for value in values], dtype=float)
+
+        self.x = gather('x')
+        self.y = gather('y')
+        self.theta = gather('theta')
+        self.speed = gather('speed')
+        self.radius = gather('radius')
+
+        # From now on every adversary reads and writes its state in the pool
+        for (index, adversary) in enumerate(adversaries):
+            adversary.pool = self
+            adversary.index = index
+
+        # Policies that steer groups of adversaries, adversaries without a
+        # policy keep going straight
+        self.policies: List[Tuple['AdversaryPolicy', np.ndarray]] = []
+
+        # Built on the first query. Anything that writes to x, y or radius
+        # directly must set grid_stale
+        self.grid = None
+        self.grid_stale = True
+
+    def add_policy(self, policy: 'AdversaryPolicy', members=None) -> None:
+        """
+        Let a policy steer the given adversaries (indexes into the pool),
+        by default every adversary
+        """
+        members = np.arange(len(self)) if members is None else np.asarray(members, dtype=np.intp)
+        self.policies.append((policy, members))
+
+    def __len__(self) -> int:
+        return len(self.adversaries)
+
+    def place(self, x, y, theta) -> None:
+        """
+        Set the location and orientation of every adversary, values can
+        either be scalars or arrays with one entry per adversary
+
+        :param x: The x location in CMs
+        :param y: The y location in CMs
+        :param theta: The angle in radians
+        """
+        self.x[:] = x
+        self.y[:] = y
+        self.theta[:] = theta
+        self.grid_stale = True
+
+    @instrument
+    def update(self) -> None:
+        """
+        Let the policies steer their adversaries, then move every adversary
+        forward. Adversaries that would run into an object turn 90 degrees
+        instead (see Adversary.update)
+        """
+        if len(self) == 0:
+            return
+
+        for (policy, members) in self.policies:
+            self.theta[members] = policy.steer(self.x[members], self.y[members],
+                                               self.theta[members])
+
+        cos = np.cos(self.theta)
+        sin = np.sin(self.theta)
+
+        # Check if the path forward is clear accounting for the radius
+        x_i = self.x + self.speed * cos
+        y_i = self.y + self.speed * sin
+        clear = self.environment.in_free_space(x_i + self.radius * cos,
+                                               y_i + self.radius * sin)
+
+        self.x[clear] = x_i[clear]
+        self.y[clear] = y_i[clear]
+        self.theta[~clear] += np.pi / 2
+        self.grid_stale = True
+
+    def _nearby(self, cells_of) -> np.ndarray:
+        """
+        Indexes of the adversaries that a query has to test
+
+        :param cells_of: Function of the grid giving the cells the query covers
+        """
+        if len(self) < self.GRID_MIN_ADVERSARIES:
+            return np.arange(len(self))
+
+        if self.grid_stale:
+            # Cells are at least twice as large as the largest adversary (see
+            # UniformGrid)
+            max_radius = np.nanmax(self.radius) if np.isfinite(self.radius).any() else 0
+            if self.grid is None or self.grid.cell_cm < 2 * max_radius:
+                cell_px = max(int(np.ceil(2 * max_radius * self.environment.cm_to_pixel)),
+                              self.GRID_MIN_CELL_PX)
+                self.grid = UniformGrid(self.environment.map.shape,
+                                        self.environment.cm_to_pixel, cell_px)
+            self.grid.update(self.x, self.y)
+            self.grid_stale = False
+
+        return self.grid.points_in(cells_of(self.grid))
 
     def in_adversary(self, x: float, y: float) -> bool:
-        for adversary in self.adversaries:
-            if adversary.in_adversary(x, y):
-                return True
-        return False
+        nearby = self._nearby(lambda grid: grid.cells_near_points(x, y))
+        distance_squared = (x - self.x[nearby]) ** 2 + (y - self.y[nearby]) ** 2
+        return bool(np.any(distance_squared <= self.radius[nearby] ** 2))
+
+    def segments_intersect(self, x0, y0, x1, y1) -> np.ndarray:
+        """
+        Determine which adversaries are crossed by any of the given line
+        segments (i.e. a fan of rays that all start at the same sensor)
+
+        :return: Boolean array with one entry per adversary
+        """
+        detected = np.zeros(len(self), dtype=bool)
+        if len(self) == 0:
+            return detected
+
+        nearby = self._nearby(lambda grid: grid.cells_near_segments(x0, y0, x1, y1))
+        hits = segments_hit_circles(x0, y0, x1, y1, self.x[nearby], self.y[nearby],
+                                    self.radius[nearby])
+        detected[nearby] = hits.any(axis=0)
+        return detected
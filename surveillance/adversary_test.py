@@ -0,0 +1,66 @@
+"""
+Testing the array backed adversary pool
+"""
+import numpy as np
+
+from surveillance.adversary import Adversary, AdversaryPool
+from surveillance.environment import Environment
+from surveillance.raycast import segments_hit_circles
+
+
+def test_pool_update_matches_single_update():
+    environment = Environment('assets/big_map.png', 1, 'assets/big_map.pickle')
+    rng = np.random.default_rng(0)
+
+    # Two identical sets of adversaries, one stepped through the pool and
+    # one stepped individually
+    configs = [{'radius': rng.uniform(2, 15), 'speed': rng.uniform(1, 20)}
+               for _ in range(50)]
+    starts = [(rng.uniform(60, 940), rng.uniform(60, 690), rng.uniform(0, 2 * np.pi))
+              for _ in range(50)]
+
+    pooled = [Adversary(1, config, environment) for config in configs]
+    pool = AdversaryPool(pooled)
+    single = [Adversary(1, config, environment) for config in configs]
+    for (adversary, other, start) in zip(pooled, single, starts):
+        adversary.place(*start)
+        other.place(*start)
+
+    for _ in range(100):
+        pool.update()
+        for adversary in single:
+            adversary.update()
+
+    assert np.allclose(pool.x, [adversary.x for adversary in single])
+    assert np.allclose(pool.y, [adversary.y for adversary in single])
+    assert np.allclose(pool.theta, [adversary.theta for adversary in single])
+
+    # The adversaries are views into the pool
+    assert pooled[3].x == pool.x[3]
+    pooled[3].place(100, 200, 0)
+    assert (pool.x[3], pool.y[3], pool.theta[3]) == (100, 200, 0)
+
+
+def test_grid_queries_match_every_adversary():
+    environment = Environment('assets/big_map.png', 1, 'assets/big_map.pickle')
+    rng = np.random.default_rng(1)
+
+    adversaries = [Adversary(1, {'radius': rng.uniform(2, 15), 'speed': rng.uniform(1, 20)}, environment)
+                   for _ in range(300)]
+    pool = AdversaryPool(adversaries)
+    pool.GRID_MIN_ADVERSARIES = 0
+    pool.place(rng.uniform(60, 940, 300), rng.uniform(60, 690, 300), rng.uniform(0, 2 * np.pi, 300))
+
+    x0, y0 = rng.uniform(0, 1000, 50), rng.uniform(0, 750, 50)
+    x1, y1 = x0 + rng.uniform(-400, 400, 50), y0 + rng.uniform(-400, 400, 50)
+    for step in range(20):
+        # The index follows moves through the pool and through the adversaries
+        pool.update()
+        adversaries[step].place(rng.uniform(60, 940), rng.uniform(60, 690), 0)
+
+        expected = segments_hit_circles(x0, y0, x1, y1, pool.x, pool.y, pool.radius).any(axis=0)
+        assert np.array_equal(pool.segments_intersect(x0, y0, x1, y1), expected)
+
+        assert pool.in_adversary(pool.x[step] + 1, pool.y[step])
+        assert np.array_equal(np.sort(pool.grid.order), np.arange(len(pool)))
+        assert np.array_equal(pool.grid.sorted_cells, pool.grid.cell_of(pool.x, pool.y)[pool.grid.order])
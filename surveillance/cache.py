@@ -0,0 +1,131 @@
+"""
+Persistent on-disk cache for artifacts derived from maps (i.e. the
+thresholded map image or camera coverage tables), so processes that are
+restarted many times on the same maps do not recompute them.
+
+Artifacts are dicts of arrays stored as .npy files in an .npz archive. They
+are keyed by a hash of everything they are derived from (file contents and
+parameters), so a changed map never reuses a stale artifact. The cache is
+bounded in size, the least recently used artifacts are evicted first.
+"""
+import hashlib
+import os
+import tempfile
+import zipfile
+from typing import Callable, Dict, Optional
+
+import numpy as np
+
+
+Artifact = Dict[str, np.ndarray]
+
+
+def file_digest(filename: str) -> str:
+    """
+    Hash of the contents of a file
+    """
+    digest = hashlib.sha256()
+    with open(filename, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def content_key(*parts) -> str:
+    """
+    Combine digests and parameters into a single cache key. Parameters are
+    hashed by their repr, so floats and tuples can be used directly.
+    """
+    digest = hashlib.sha256()
+    for part in parts:
+        digest.update(repr(part).encode())
+        digest.update(b'\0')
+    return digest.hexdigest()
+
+
+class ArtifactCache:
+    """
+    Directory of cached artifacts with least recently used eviction once the
+    total size goes over max_bytes. The modification time of a file is used
+    as its last use, so the order survives restarts.
+    """
+    def __init__(self, directory: str, max_bytes: int = 512 * 2**20):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, name: str, key: str) -> str:
+        return os.path.join(self.directory, '{}-{}.npz'.format(name, key))
+
+    def get(self, name: str, key: str) -> Optional[Artifact]:
+        """
+        Load an artifact, None if it is not cached
+        """
+        path = self._path(name, key)
+        try:
+            with np.load(path) as archive:
+                artifact = {array: archive[array] for array in archive.files}
+        except FileNotFoundError:
+            return None
+        except (ValueError, OSError, EOFError, zipfile.BadZipFile):
+            # A partial or corrupt file (i.e. from a process that was killed),
+            # drop it so it is computed again
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            return None
+
+        try:
+            os.utime(path)  # Mark as recently used
+        except FileNotFoundError:
+            pass  # Evicted by another process in the meantime
+        return artifact
+
+    def put(self, name: str, key: str, artifact: Artifact) -> None:
+        """
+        Store an artifact and evict old artifacts if the cache is too big
+        """
+        # Write to a temporary file first so readers never see a partial file
+        fd, temporary = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                np.savez(f, **artifact)
+            os.replace(temporary, self._path(name, key))
+        except BaseException:
+            os.remove(temporary)
+            raise
+
+        self.evict()
+
+    def get_or_compute(self, name: str, key: str,
+                       compute: Callable[[], Artifact]) -> Artifact:
+        """
+        Load an artifact, computing and storing it if it is not cached
+        """
+        artifact = self.get(name, key)
+        if artifact is None:
+            artifact = compute()
+            self.put(name, key, artifact)
+        return artifact
+
+    def evict(self) -> None:
+        """
+        Remove the least recently used artifacts until the cache fits in
+        max_bytes
+        """
+        entries = []
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith('.npz'):
+                stat = entry.stat()
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+
+        total = sum(size for (_, size, _) in entries)
+        for (_, size, path) in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass  # Evicted by another process
+            total -= size
@@ -0,0 +1,68 @@
+import os
+import time
+
+import numpy as np
+
+from surveillance.cache import ArtifactCache, content_key
+from surveillance.environment import Environment
+
+
+def test_get_or_compute_only_computes_once(tmp_path):
+    cache = ArtifactCache(str(tmp_path))
+    calls = []
+
+    def compute():
+        calls.append(1)
+        return {'values': np.arange(5)}
+
+    key = content_key('map', 1.5)
+    first = cache.get_or_compute('test', key, compute)
+    second = ArtifactCache(str(tmp_path)).get_or_compute('test', key, compute)
+
+    assert len(calls) == 1
+    assert np.array_equal(first['values'], second['values'])
+    assert cache.get('test', content_key('map', 2.5)) is None
+
+
+def test_corrupt_artifact_is_dropped(tmp_path):
+    cache = ArtifactCache(str(tmp_path))
+    cache.put('test', 'a', {'values': np.arange(1000)})
+
+    # Truncate the archive, as if the writer was killed
+    path = os.path.join(str(tmp_path), 'test-a.npz')
+    with open(path, 'r+b') as f:
+        f.truncate(100)
+
+    assert cache.get('test', 'a') is None
+    assert not os.path.exists(path)
+    assert cache.get_or_compute('test', 'a', lambda: {'values': np.arange(3)})['values'].tolist() == [0, 1, 2]
+
+
+def test_least_recently_used_is_evicted(tmp_path):
+    artifact = {'values': np.zeros(1000)}
+    cache = ArtifactCache(str(tmp_path), max_bytes=2500 * 8)
+
+    cache.put('test', 'a', artifact)
+    cache.put('test', 'b', artifact)
+
+    # Use a so that b is the least recently used
+    old = time.time() - 10
+    os.utime(os.path.join(str(tmp_path), 'test-b.npz'), (old, old))
+    assert cache.get('test', 'a') is not None
+
+    cache.put('test', 'c', artifact)
+
+    assert cache.get('test', 'b') is None
+    assert cache.get('test', 'a') is not None
+    assert cache.get('test', 'c') is not None
+
+
+def test_environment_from_cache(tmp_path):
+    cache = ArtifactCache(str(tmp_path))
+    expected = Environment('assets/small_map.png', 1, 'assets/small_map.pickle')
+
+    for _ in range(2):
+        environment = Environment('assets/small_map.png', 1, 'assets/small_map.pickle', cache)
+        assert np.array_equal(environment.map, expected.map)
+        assert np.array_equal(environment.distance_field, expected.distance_field)
+        assert environment.map_key is not None
@@ -0,0 +1,96 @@
+"""
+Connected components of undirected graphs using union-find
+"""
+from dataclasses import dataclass
+from typing import Iterable, List, Optional, Sequence, Tuple
+
+
+class UnionFind:
+    """
+    Disjoint sets over the integers 0 to size - 1 with union by size and
+    path compression, so a sequence of operations runs in near-linear time
+    """
+    def __init__(self, size: int):
+        self.parent = list(range(size))
+        self.size = [1] * size
+
+    def find(self, item: int) -> int:
+        """
+        Find the representative of the set containing the item
+        """
+        root = item
+        while self.parent[root] != root:
+            root = self.parent[root]
+
+        # Point everything on the path straight at the root
+        while self.parent[item] != root:
+            self.parent[item], item = root, self.parent[item]
+
+        return root
+
+    def union(self, a: int, b: int) -> bool:
+        """
+        Merge the sets containing a and b
+
+        :return: False if a and b were already in the same set
+        """
+        a = self.find(a)
+        b = self.find(b)
+        if a == b:
+            return False
+
+        # Attach the smaller tree under the larger one
+        if self.size[a] < self.size[b]:
+            a, b = b, a
+        self.parent[b] = a
+        self.size[a] += self.size[b]
+        return True
+
+
+@dataclass
+class Components:
+    sizes: List[int]  # Number of nodes in each component
+    cycle_ranks: List[int]  # Number of independent cycles in each component (E - V + 1)
+
+    @property
+    def num_cycles(self) -> int:
+        return sum(self.cycle_ranks)
+
+
+def find_components(num_nodes: int, edges: Iterable[Tuple[int, int]],
+                    nodes: Optional[Sequence[int]] = None) -> Components:
+    """
+    Find the connected components of an undirected graph. Every edge must
+    only be given once (i.e. (1, 2) but not also (2, 1)).
+
+    :param num_nodes: Nodes are the integers 0 to num_nodes - 1
+    :param edges: Pairs of connected nodes
+    :param nodes: Only these nodes are part of the graph, by default all
+                  nodes are. Edges must only connect these nodes
+    :return: The components in the order their first node appears in nodes
+    """
+    if nodes is None:
+        nodes = range(num_nodes)
+
+    union_find = UnionFind(num_nodes)
+    edge_ends = []
+    for (a, b) in edges:
+        union_find.union(a, b)
+        edge_ends.append(a)
+
+    # Number the components by their root
+    component_of_root = {}
+    sizes: List[int] = []
+    for node in nodes:
+        root = union_find.find(node)
+        if root not in component_of_root:
+            component_of_root[root] = len(sizes)
+            sizes.append(0)
+        sizes[component_of_root[root]] += 1
+
+    num_edges = [0] * len(sizes)
+    for node in edge_ends:
+        num_edges[component_of_root[union_find.find(node)]] += 1
+
+    cycle_ranks = [num_edges[index] - sizes[index] + 1 for index in range(len(sizes))]
+    return Components(sizes=sizes, cycle_ranks=cycle_ranks)
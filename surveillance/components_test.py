@@ -0,0 +1,59 @@
+"""
+Testing the union-find connected components
+"""
+import random
+
+from surveillance.components import UnionFind, find_components
+from surveillance.helpers import _get_number_cycles, _get_sub_graph_sizes
+
+
+def _make_graph(edges) -> dict:
+    graph = {}
+    for (a, b) in edges:
+        graph.setdefault(a, {'neighbors': []})['neighbors'].append(b)
+        graph.setdefault(b, {'neighbors': []})['neighbors'].append(a)
+    return graph
+
+
+def test_find_components():
+    # A square with a diagonal, a separate triangle and an isolated node
+    edges = [(0, 1), (1, 2), (2, 3), (3, 0), (0, 2), (4, 5), (5, 6), (6, 4)]
+    components = find_components(8, edges)
+    assert components.sizes == [4, 3, 1]
+    assert components.cycle_ranks == [2, 1, 0]
+    assert components.num_cycles == 3
+
+    # Only part of the nodes
+    components = find_components(8, [(4, 5)], nodes=[4, 5, 7])
+    assert components.sizes == [2, 1]
+
+
+def test_bridging_node_merges_subgraphs():
+    # Node 3 joins the subgraphs started at node 1 and node 2, which used to
+    # be counted as separate subgraphs depending on the iteration order
+    graph = _make_graph([(1, 3), (2, 4), (3, 2)])
+    graph = {node: graph[node] for node in [1, 2, 3, 4]}
+    assert _get_sub_graph_sizes(graph) == [4]
+
+    # Two separate cycles
+    graph = _make_graph([(1, 2), (2, 3), (3, 1), (4, 5), (5, 6), (6, 4)])
+    assert _get_number_cycles(graph) == 2
+    assert _get_sub_graph_sizes(graph) == [3, 3]
+
+
+def test_union_find_matches_naive_labels():
+    rng = random.Random(7)
+    size = 200
+    edges = [(rng.randrange(size), rng.randrange(size)) for _ in range(150)]
+
+    union_find = UnionFind(size)
+    labels = list(range(size))
+    for (a, b) in edges:
+        union_find.union(a, b)
+        # Relabel everything in the set of b with the label of a
+        old, new = labels[b], labels[a]
+        labels = [new if label == old else label for label in labels]
+
+    for a in range(size):
+        for b in range(a, size, 17):
+            assert (union_find.find(a) == union_find.find(b)) == (labels[a] == labels[b])
@@ -1,9 +1,26 @@
 import cv2 as cv
 import matplotlib.pyplot as plt
+import numpy as np
 from matplotlib.axes._axes import Axes
+from typing import Dict, Optional
+from surveillance.cache import ArtifactCache, content_key, file_digest
+from surveillance.instrumentation import instrument
 from surveillance.roombuilder.roombuilder import RoomMap
 
 
+def _load_map_image(map_file: str) -> Dict[str, np.ndarray]:
+    """
+    Read a map image, threshold it to values of 0 and 1 and compute its
+    distance field
+    """
+    # Open up the map and convert the pixel values to values of 0 and 1
+    image = cv.imread(map_file, cv.IMREAD_GRAYSCALE)
+    image = cv.threshold(image, 127, 1, cv.THRESH_BINARY)[1]
+
+    distance_field = cv.distanceTransform(image, cv.DIST_L2, cv.DIST_MASK_PRECISE)
+    return {'map': image, 'distance_field': distance_field}
+
+
 class Environment:
     """
     Represents the area in which the surveillance is taking place. The
@@ -11,26 +28,60 @@ class Environment:
     representing an occupied space and pixels with values of "0" being
     empty space.
     """
-    def __init__(self, map_file: str, pixel_to_cm: float, graph_file: str):
-        # Open up the map and convert the pixel values to values of 0 and 1
-        image = cv.imread(map_file, cv.IMREAD_GRAYSCALE)
-        image = cv.threshold(image, 127, 255, cv.THRESH_BINARY)[1]
-        image = image / 255
+    def __init__(self, map_file: str, pixel_to_cm: float, graph_file: str,
+                 cache: Optional[ArtifactCache] = None):
+        """
+        :param cache: Optional cache to reuse the processed map image from,
+                      and for placement steps to store what they derive
+                      from the map in
+        """
+        self.cache = cache
+
+        # Identifies the map and graph in the cache
+        self.map_key = None
+        if cache is None:
+            arrays = _load_map_image(map_file)
+        else:
+            image_digest = file_digest(map_file)
+            self.map_key = content_key(image_digest, file_digest(graph_file))
+            arrays = cache.get_or_compute('map', content_key(image_digest),
+                                          lambda: _load_map_image(map_file))
 
         # Store the map
-        self.map = image
+        self.map = arrays['map']
+
+        # Distance (in pixels) from every empty pixel to the closest
+        # occupied pixel, used to skip through open space when ray casting
+        self.distance_field = arrays['distance_field']
 
         # Load the graph
         self.room_map = RoomMap.load(graph_file)
 
         self.cm_to_pixel = 1 / pixel_to_cm
 
+    @classmethod
+    def from_arrays(cls, image: np.ndarray, distance_field: np.ndarray,
+                    room_map: RoomMap, pixel_to_cm: float) -> 'Environment':
+        """
+        Create an environment from an already thresholded map, its distance
+        field and graph (i.e. loaded from a map bundle)
+        """
+        environment = cls.__new__(cls)
+        environment.map = image
+        environment.distance_field = distance_field
+        environment.room_map = room_map
+        environment.cm_to_pixel = 1 / pixel_to_cm
+        environment.cache = None
+        environment.map_key = None
+        return environment
+
     def display(self, ax: Axes) -> None:
         """
         Display the map of the environment
         """
         ax.imshow(self.map, cmap=plt.cm.gray)
 
+    @instrument
     def in_environment(self, x: float, y: float) -> bool:
         """
         Check if a given point is within the bounds of the environment
@@ -40,6 +91,7 @@ class Environment:
         return 0 <= x_coordinate < self.map.shape[1] and \
             0 <= y_coordinate < self.map.shape[0]
 
+    @instrument
     def in_object(self, x: float, y: float) -> bool:
         """
         Check if a given point is within an object
@@ -47,3 +99,16 @@ class Environment:
         x_coordinate = int(x * self.cm_to_pixel)
         y_coordinate = int(y * self.cm_to_pixel)
         return self.map[y_coordinate, x_coordinate] == 0
+
+    @instrument
+    def in_free_space(self, x, y) -> np.ndarray:
+        """
+        Vectorized check for points that are within the bounds of the
+        environment and not within an object
+        """
+        x_coordinate = (np.asarray(x) * self.cm_to_pixel).astype(np.intp)
+        y_coordinate = (np.asarray(y) * self.cm_to_pixel).astype(np.intp)
+        inside = (0 <= x_coordinate) & (x_coordinate < self.map.shape[1]) & \
+            (0 <= y_coordinate) & (y_coordinate < self.map.shape[0])
+        return inside & (self.map[np.where(inside, y_coordinate, 0),
+                                  np.where(inside, x_coordinate, 0)] != 0)
@@ -0,0 +1,187 @@
+"""
+Monte Carlo evaluation of sensor placements against many randomized
+adversaries
+"""
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+import multiprocessing
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+from surveillance.adversary import Adversary, AdversaryPool
+from surveillance.environment import Environment
+from surveillance.placement.step import Placement, PlacementResult
+from surveillance.policies import AdversaryPolicy
+from surveillance.simulator import Simulator
+
+
+@dataclass
+class EvaluationResult:
+    detection_times: np.ndarray  # Timestep of the first detection of each trial, NaN if never detected
+    max_timesteps: int
+
+    @property
+    def num_trials(self) -> int:
+        return len(self.detection_times)
+
+    @property
+    def detection_probability(self) -> float:
+        """
+        Fraction of the trials in which the adversary was detected
+        """
+        return float(np.mean(~np.isnan(self.detection_times)))
+
+    @property
+    def time_to_detection(self) -> np.ndarray:
+        """
+        Timestep of the first detection for the trials that were detected
+        """
+        return self.detection_times[~np.isnan(self.detection_times)]
+
+    def summary(self) -> dict:
+        """
+        Summary statistics of the detection probability and the time to
+        detection distribution
+        """
+        times = self.time_to_detection
+        summary = {
+            'trials': self.num_trials,
+            'max_timesteps': self.max_timesteps,
+            'detection_probability': self.detection_probability
+        }
+        if len(times) != 0:
+            summary['time_to_detection'] = {
+                'mean': float(np.mean(times)),
+                'std': float(np.std(times)),
+                'min': float(np.min(times)),
+                'p50': float(np.percentile(times, 50)),
+                'p90': float(np.percentile(times, 90)),
+                'max': float(np.max(times))
+            }
+        return summary
+
+
+# State shared with the worker processes. It is set before the workers are
+# forked so the environment and sensors are inherited instead of pickled
+_shared = {}
+
+
+def random_adversary_poses(environment: Environment, num_trials: int,
+                           radius: float, rng: np.random.Generator
+                           ) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Pick random starting poses for adversaries. Every position is far
+    enough away from objects for an adversary of the given radius to fit.
+
+    :return: The x (CMs), y (CMs) and theta (radians) of each pose
+    """
+    clearance_px = radius * environment.cm_to_pixel
+    rows, cols = np.nonzero(environment.distance_field > clearance_px)
+    if len(rows) == 0:
+        raise Exception('No space in the environment for adversaries of radius {}'.format(radius))
+
+    # Pick a pixel and then a random point within it
+    picks = rng.integers(0, len(rows), num_trials)
+    x = (cols[picks] + rng.random(num_trials)) / environment.cm_to_pixel
+    y = (rows[picks] + rng.random(num_trials)) / environment.cm_to_pixel
+    theta = rng.uniform(0, 2 * np.pi, num_trials)
+    return x, y, theta
+
+
+def _run_trials(trials: np.ndarray, x: np.ndarray, y: np.ndarray, theta: np.ndarray,
+                speed: np.ndarray, radius: float, max_timesteps: int) -> np.ndarray:
+    """
+    Run one batch of trials in a single simulation. The adversaries never
+    interact with each other or with the sensors, so every adversary in the
+    pool is an independent trial.
+
+    :param trials: Ids of the trials in the batch, the policy draws its
+                   random choices per trial id
+
+    :return: The timestep of the first detection of each trial, NaN if the
+             adversary was never detected
+    """
+    environment: Environment = _shared['environment']
+    placements: List[Placement] = _shared['placements']
+
+    # Start from the placement every time, robots move during a run
+    for placement in placements:
+        placement.apply()
+
+    pixel_to_cm = 1 / environment.cm_to_pixel
+    adversary_pool = AdversaryPool([
+        Adversary(pixel_to_cm, {'radius': radius, 'speed': trial_speed}, environment)
+        for trial_speed in speed])
+    adversary_pool.place(x, y, theta)
+    if _shared.get('policy') is not None:
+        adversary_pool.add_policy(_shared['policy'].bind(trials, _shared['policy_seed']))
+
+    detection_times = np.full(len(x), np.nan)
+
+    def record(timestep: int, events) -> None:
+        for event in events:
+            first = np.isnan(detection_times[event.adversaries])
+            detection_times[event.adversaries[first]] = timestep
+
+    sensors = [placement.sensor for placement in placements]
+    Simulator(environment, sensors, adversary_pool, max_timesteps).run(on_step=record)
+
+    return detection_times
+
+
+def evaluate_placement(environment: Environment, placement: PlacementResult,
+                       num_trials: int, max_timesteps: int = 500,
+                       radius: float = 10, speed: Tuple[float, float] = (1, 10),
+                       seed: Optional[int] = None,
+                       workers: Optional[int] = None,
+                       policy: Optional[AdversaryPolicy] = None) -> EvaluationResult:
+    """
+    Evaluate a placement against adversaries with random starting poses and
+    speeds.
+
+    By default all trials are simulated as one vectorized adversary pool in
+    this process. With workers set, the trials are split across a process
+    pool. The workers are forked, so the environment is loaded once and
+    shared with them instead of being rebuilt or pickled per worker.
+
+    :param placement: The placement of the sensors to evaluate
+    :param num_trials: The number of randomized adversaries to test against
+    :param max_timesteps: How long each trial runs for
+    :param radius: The radius of the adversaries in CMs
+    :param speed: The range that the adversary speeds are picked from
+    :param seed: Seed for the random poses and speeds
+    :param workers: Number of processes to split the trials across
+    :param policy: Policy that steers every adversary, by default they keep
+                   going straight. Its random choices are drawn per trial
+                   from the seed, see AdversaryPolicy.bind
+    """
+    rng = np.random.default_rng(seed)
+    x, y, theta = random_adversary_poses(environment, num_trials, radius, rng)
+    speeds = rng.uniform(speed[0], speed[1], num_trials)
+    policy_seed = int(rng.integers(2**63))
+
+    _shared['environment'] = environment
+    _shared['placements'] = placement.placements
+    _shared['policy'] = policy
+    _shared['policy_seed'] = policy_seed
+
+    # Only fork is able to share the environment without copying it
+    can_fork = 'fork' in multiprocessing.get_all_start_methods()
+
+    try:
+        if workers is None or workers <= 1 or not can_fork:
+            detection_times = _run_trials(np.arange(num_trials), x, y, theta, speeds,
+                                          radius, max_timesteps)
+        else:
+            batches = np.array_split(np.arange(num_trials), workers)
+            context = multiprocessing.get_context('fork')
+            with ProcessPoolExecutor(max_workers=workers, mp_context=context) as executor:
+                futures = [executor.submit(_run_trials, batch, x[batch], y[batch], theta[batch],
+                                           speeds[batch], radius, max_timesteps)
+                           for batch in batches]
+                detection_times = np.concatenate([future.result() for future in futures])
+    finally:
+        _shared.clear()
+
+    return EvaluationResult(detection_times=detection_times, max_timesteps=max_timesteps)
@@ -0,0 +1,56 @@
+"""
+Testing the Monte Carlo placement evaluation
+"""
+import numpy as np
+
+from surveillance.environment import Environment
+from surveillance.evaluation import evaluate_placement, random_adversary_poses
+from surveillance.graph import CompactGraph
+from surveillance.helpers import Pose
+from surveillance.placement.step import Placement, PlacementResult
+from surveillance.policies import RandomWalk
+from surveillance.sensors.camera import CameraSensor
+
+
+def test_evaluation_is_repeatable_across_workers():
+    environment = Environment('assets/small_map.png', 1, 'assets/small_map.pickle')
+    camera = CameraSensor(1, environment, {'name': 'Camera', 'range': 300})
+    placement = PlacementResult(graph=CompactGraph.from_dict({}), placements=[
+        Placement(camera, Pose(x=75, y=75, theta=np.pi / 4))])
+
+    single = evaluate_placement(environment, placement, 200, max_timesteps=50, seed=1)
+    split = evaluate_placement(environment, placement, 200, max_timesteps=50, seed=1,
+                               workers=2)
+
+    assert np.array_equal(single.detection_times, split.detection_times,
+                          equal_nan=True)
+    assert 0 < single.detection_probability < 1
+    assert single.summary()['time_to_detection']['max'] < 50
+
+
+def test_random_walk_is_repeatable_across_workers():
+    environment = Environment('assets/small_map.png', 1, 'assets/small_map.pickle')
+    camera = CameraSensor(1, environment, {'name': 'Camera', 'range': 300})
+    placement = PlacementResult(graph=CompactGraph.from_dict({}), placements=[
+        Placement(camera, Pose(x=75, y=75, theta=np.pi / 4))])
+    policy = RandomWalk(0.3, seed=5)
+
+    # The same policy evaluated serially, split and again
+    runs = [evaluate_placement(environment, placement, 200, max_timesteps=50, seed=1,
+                               workers=workers, policy=policy).detection_times
+            for workers in [1, 2, 1]]
+
+    for times in runs[1:]:
+        assert np.array_equal(runs[0], times, equal_nan=True)
+    straight = evaluate_placement(environment, placement, 200, max_timesteps=50, seed=1)
+    assert not np.array_equal(runs[0], straight.detection_times, equal_nan=True)
+
+
+def test_random_poses_fit_adversary():
+    environment = Environment('assets/small_map.png', 1, 'assets/small_map.pickle')
+    x, y, _ = random_adversary_poses(environment, 500, 20, np.random.default_rng(0))
+
+    # Every point on the edge of the adversaries is in free space
+    for angle in np.linspace(0, 2 * np.pi, 16):
+        assert environment.in_free_space(x + 20 * np.cos(angle),
+                                         y + 20 * np.sin(angle)).all()
@@ -0,0 +1,162 @@
+"""
+Compact graph representation used while scoring placements
+"""
+from typing import Iterable, List
+
+import numpy as np
+
+from surveillance.components import Components, find_components
+
+
+class CompactGraph:
+    """
+    Undirected graph stored as CSR adjacency arrays (indptr/indices) with a
+    boolean node mask overlay. Removing nodes only flips bits of the mask,
+    the adjacency arrays are shared between a graph and everything derived
+    from it, so candidate placements can be scored without copying the
+    graph.
+
+    Node ids are the keys of the dict graph the compact graph was made from.
+    Internally nodes are referred to by their index in node_ids.
+    """
+    def __init__(self, node_ids: np.ndarray, indptr: np.ndarray, indices: np.ndarray,
+                 area: np.ndarray, node_data: List[dict], mask: np.ndarray = None):
+        self.node_ids = node_ids
+        self.indptr = indptr
+        self.indices = indices
+        self.node_data = node_data  # Attribute dicts of the original graph (read only)
+        self.area = area  # Unsurveilled area of each node (in boxes)
+        self.mask = np.ones(len(node_ids), dtype=bool) if mask is None else mask
+
+        self.index = {node: index for (index, node) in enumerate(node_ids.tolist())}
+
+        # Source node of every entry of indices, so edges can be masked with
+        # a single vectorized lookup
+        self.sources = np.repeat(np.arange(len(node_ids)), np.diff(indptr))
+
+    @classmethod
+    def from_dict(cls, graph: dict) -> 'CompactGraph':
+        """
+        Build a compact graph from the dict representation used by RoomMap
+        (i.e. RoomMap.reduced_graph). Edges are treated as undirected.
+        """
+        node_ids = np.array(list(graph.keys()), dtype=np.int64)
+        index = {node: i for (i, node) in enumerate(node_ids.tolist())}
+
+        # Collect every edge in both directions once
+        edges = set()
+        for node in graph:
+            for neighbor in graph[node]['neighbors']:
+                if neighbor in index and neighbor != node:
+                    edges.add((index[node], index[neighbor]))
+                    edges.add((index[neighbor], index[node]))
+        edges = np.array(sorted(edges), dtype=np.int64).reshape(-1, 2)
+
+        indptr = np.zeros(len(node_ids) + 1, dtype=np.int64)
+        np.add.at(indptr, edges[:, 0] + 1, 1)
+        indptr = np.cumsum(indptr)
+
+        area = np.array([graph[node].get('area', 1) for node in graph], dtype=float)
+        node_data = [graph[node] for node in graph]
+
+        return cls(node_ids, indptr, edges[:, 1].copy(), area, node_data)
+
+    def copy(self) -> 'CompactGraph':
+        """
+        Copy the mask and area, the adjacency arrays are shared
+        """
+        graph = CompactGraph.__new__(CompactGraph)
+        graph.__dict__.update(self.__dict__)
+        graph.mask = self.mask.copy()
+        graph.area = self.area.copy()
+        return graph
+
+    def without(self, nodes: Iterable[int]) -> 'CompactGraph':
+        """
+        Return a copy of the graph with the given nodes removed
+        """
+        graph = self.copy()
+        graph.remove(nodes)
+        return graph
+
+    def remove(self, nodes: Iterable[int]) -> None:
+        """
+        Remove the given nodes from the graph, in place
+        """
+        self.mask[[self.index[node] for node in nodes]] = False
+
+    def __contains__(self, node: int) -> bool:
+        index = self.index.get(node)
+        return index is not None and bool(self.mask[index])
+
+    def __len__(self) -> int:
+        return int(self.mask.sum())
+
+    def nodes(self) -> List[int]:
+        """
+        Ids of the nodes that have not been removed
+        """
+        return self.node_ids[self.mask].tolist()
+
+    def data(self, node: int) -> dict:
+        """
+        Attributes of the node in the original graph (i.e. 'pos', 'type')
+        """
+        return self.node_data[self.index[node]]
+
+    def neighbors(self, node: int) -> List[int]:
+        """
+        Ids of the neighbors of the node that have not been removed
+        """
+        index = self.index[node]
+        neighbors = self.indices[self.indptr[index]:self.indptr[index + 1]]
+        return self.node_ids[neighbors[self.mask[neighbors]]].tolist()
+
+    def get_area(self, node: int) -> float:
+        return float(self.area[self.index[node]])
+
+    def set_area(self, node: int, area: float) -> None:
+        self.area[self.index[node]] = area
+
+    def _active_edges(self) -> np.ndarray:
+        """
+        Mask over the entries of indices for edges where both ends remain
+        """
+        return self.mask[self.sources] & self.mask[self.indices]
+
+    def num_edges(self) -> int:
+        # Every edge is stored in both directions
+        return int(self._active_edges().sum()) // 2
+
+    def components(self) -> Components:
+        """
+        Connected components of the graph along with their cycle ranks
+        """
+        active = self._active_edges() & (self.sources < self.indices)
+        edges = zip(self.sources[active].tolist(), self.indices[active].tolist())
+        return find_components(len(self.node_ids), edges,
+                               np.flatnonzero(self.mask).tolist())
+
+    def component_sizes(self) -> List[int]:
+        """
+        Number of nodes in each connected component of the graph
+        """
+        return self.components().sizes
+
+    def num_cycles(self) -> int:
+        """
+        Number of independent cycles in the graph (E - V + components)
+        """
+        return self.components().num_cycles
+
+    def to_dict(self) -> dict:
+        """
+        Convert back to the dict representation, only the nodes and edges
+        that remain are kept
+        """
+        graph = {}
+        for node in self.nodes():
+            graph[node] = dict(self.data(node))
+            graph[node]['neighbors'] = self.neighbors(node)
+            graph[node]['area'] = self.get_area(node)
+        return graph
@@ -0,0 +1,44 @@
+"""
+Testing the compact graph
+"""
+from surveillance.graph import CompactGraph
+
+
+def _make_graph() -> CompactGraph:
+    # Two triangles (1, 2, 3) and (5, 6, 7) joined through node 4, plus
+    # node 8 hanging off of node 7
+    edges = [(1, 2), (2, 3), (3, 1), (3, 4), (4, 5), (5, 6), (6, 7), (7, 5), (7, 8)]
+    graph = {node: {'neighbors': [], 'area': node, 'type': 'hallway'} for node in range(1, 9)}
+    for (a, b) in edges:
+        graph[a]['neighbors'].append(b)
+        graph[b]['neighbors'].append(a)
+    return CompactGraph.from_dict(graph)
+
+
+def test_cycles_and_components():
+    graph = _make_graph()
+    assert graph.num_edges() == 9
+    assert graph.num_cycles() == 2
+    assert graph.component_sizes() == [8]
+
+    # Removing the bridge splits the graph but keeps both cycles
+    split = graph.without([4])
+    assert split.num_cycles() == 2
+    assert sorted(split.component_sizes()) == [3, 4]
+
+    # Breaking a triangle and isolating a node
+    broken = graph.without([2, 7])
+    assert broken.num_cycles() == 0
+    assert sorted(broken.component_sizes()) == [1, 5]
+
+
+def test_without_does_not_modify_original():
+    graph = _make_graph()
+    split = graph.without([4])
+    split.set_area(1, 0)
+
+    assert 4 in graph and 4 not in split
+    assert graph.get_area(1) == 1
+    assert sorted(graph.neighbors(3)) == [1, 2, 4]
+    assert sorted(split.neighbors(3)) == [1, 2]
+    assert sorted(split.to_dict()) == [1, 2, 3, 5, 6, 7, 8]
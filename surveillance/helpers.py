@@ -3,6 +3,7 @@ from typing import List
 
 import numpy as np
 
+from surveillance.components import Components, find_components
 from surveillance.roombuilder.roombuilder import RoomMap
 
 
@@ -13,21 +14,30 @@ class Pose:
     theta: float
 
 
-def _get_number_cycles(graph: dict) -> int:
+def _get_graph_components(graph: dict) -> Components:
     """
-    Determine the number of cycles present in the given graph this needs to
-    ignore the bidirectional edges
+    Find the connected components of the given graph, this needs to ignore
+    the bidirectional edges
     """
+    index = {node: i for (i, node) in enumerate(graph)}
+
     edges = set()
     for node in graph:
         for neighbor in graph[node]['neighbors']:
             # Make the edge representation, have the smaller node always
             # come first to avoid duplicates (i.e. (1, 2) and (2, 1))
-            edge = (min(node, neighbor), max(node, neighbor))
-            if edge not in edges:
-                edges.add(edge)
+            edge = (min(index[node], index[neighbor]), max(index[node], index[neighbor]))
+            edges.add(edge)
+
+    return find_components(len(graph), edges)
+
 
-    return len(edges) - len(graph) + 1
+def _get_number_cycles(graph: dict) -> int:
+    """
+    Determine the number of cycles present in the given graph, summed over
+    every connected component
+    """
+    return _get_graph_components(graph).num_cycles
 
 
 def _get_hallways(room_map: RoomMap) -> List[int]:
@@ -50,28 +60,8 @@ def _get_sub_graph_sizes(graph: dict) -> List[int]:
     """
     Count the number of nodes in each subgraph of the larger graph
     """
-    sub_graphs: List[set] = []
+    return _get_graph_components(graph).sizes
 
-    for node in graph:
-        sub_graph_index = None
-        # Check if the node is already assigned a subgraph
-        for (index, sub_graph) in enumerate(sub_graphs):
-            if node in sub_graph:
-                sub_graph_index = index
-                break
-
-        # If the node is not assigned a subgraph, make one for it
-        if sub_graph_index is None:
-            new_sub_graph = set()
-            new_sub_graph.add(node)
-            new_sub_graph.update(graph[node]['neighbors'])
-            sub_graphs.append(new_sub_graph)
-        # If the node is assigned a subgraph, add the neighbors to the
-        # subgraph
-        else:
-            sub_graphs[sub_graph_index].update(graph[node]['neighbors'])
-
-    return [len(sub_graph) for sub_graph in sub_graphs]
 
 def compute_angle(x1, y1, x2, y2):
     """
@@ -0,0 +1,211 @@
+"""
+Opt-in timing of the hot paths.
+
+Functions are registered with the instrument decorator, which returns them
+unchanged. Only while instrumentation is enabled are the registered methods
+swapped for timed wrappers on their classes, so there is no overhead at all
+when it is disabled. Enable it after the instrumented modules are imported.
+
+    with instrumentation.phase('placement'):
+        ...
+
+groups the timings and counters recorded inside it, and profile() runs
+cProfile alongside the probes and writes a pstats file.
+"""
+import cProfile
+from contextlib import contextmanager
+import functools
+import sys
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+
+# Registered functions as (label, function)
+_probes: List[Tuple[str, Callable]] = []
+
+# Original attributes of the patched classes, to restore when disabling
+_patched: List[Tuple[object, str, Callable]] = []
+
+_enabled = False
+
+# Phase the timings are recorded under
+_phase = 'main'
+
+# phase -> label -> [calls, seconds]
+_timers: Dict[str, Dict[str, List[float]]] = {}
+
+# phase -> name -> count
+_counters: Dict[str, Dict[str, int]] = {}
+
+# phase -> seconds spent in the phase
+_phase_times: Dict[str, float] = {}
+
+
+def instrument(func: Optional[Callable] = None, *, name: Optional[str] = None):
+    """
+    Register a method to be timed while instrumentation is enabled, used as
+    @instrument or @instrument(name='label'). The label defaults to the
+    qualified name of the method (i.e. 'Environment.in_object')
+    """
+    def decorator(func: Callable) -> Callable:
+        _probes.append((name or func.__qualname__, func))
+        return func
+
+    if func is not None:
+        return decorator(func)
+    return decorator
+
+
+def _record(label: str, elapsed: float) -> None:
+    timer = _timers.setdefault(_phase, {}).setdefault(label, [0, 0.0])
+    timer[0] += 1
+    timer[1] += elapsed
+
+
+def _timed(label: str, func: Callable) -> Callable:
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            _record(label, time.perf_counter() - start)
+    return wrapper
+
+
+def _owner(func: Callable) -> object:
+    """
+    Find the class (or module) that a registered function is defined on
+    """
+    owner = sys.modules[func.__module__]
+    for part in func.__qualname__.split('.')[:-1]:
+        if part == '<locals>':
+            raise Exception('Cannot instrument a local function: {}'.format(func.__qualname__))
+        owner = getattr(owner, part)
+    return owner
+
+
+def is_enabled() -> bool:
+    return _enabled
+
+
+def enable() -> None:
+    """
+    Start timing the registered functions
+    """
+    global _enabled
+    if _enabled:
+        return
+
+    for (label, func) in _probes:
+        owner = _owner(func)
+        _patched.append((owner, func.__name__, func))
+        setattr(owner, func.__name__, _timed(label, func))
+    _enabled = True
+
+
+def disable() -> None:
+    """
+    Stop timing and put the original functions back, the recorded timings
+    are kept
+    """
+    global _enabled
+    while len(_patched) != 0:
+        owner, attribute, func = _patched.pop()
+        setattr(owner, attribute, func)
+    _enabled = False
+
+
+def reset() -> None:
+    """
+    Clear everything recorded so far
+    """
+    _timers.clear()
+    _counters.clear()
+    _phase_times.clear()
+
+
+def count(name: str, amount: int = 1) -> None:
+    """
+    Add to a counter of the current phase, does nothing when disabled
+    """
+    if _enabled:
+        counters = _counters.setdefault(_phase, {})
+        counters[name] = counters.get(name, 0) + amount
+
+
+@contextmanager
+def phase(name: str):
+    """
+    Record the timings and counters inside the block under the given phase,
+    along with the time spent in the phase. Phases can be nested
+    """
+    global _phase
+    if not _enabled:
+        yield
+        return
+
+    outer = _phase
+    _phase = name
+    _phase_times.setdefault(name, 0.0)  # Phases are listed in the order they start
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        _phase_times[name] += time.perf_counter() - start
+        _phase = outer
+
+
+def summary() -> dict:
+    """
+    Everything recorded so far, by phase. Timers are sorted by total time
+    """
+    phases = list(_phase_times) + [name for name in {**_timers, **_counters}
+                                   if name not in _phase_times]
+    result = {}
+    for name in phases:
+        timers = sorted(_timers.get(name, {}).items(), key=lambda item: -item[1][1])
+        result[name] = {
+            'seconds': _phase_times.get(name),
+            'timers': {label: {'calls': int(calls), 'seconds': seconds}
+                       for (label, (calls, seconds)) in timers},
+            'counters': dict(_counters.get(name, {}))
+        }
+    return result
+
+
+def format_summary() -> str:
+    """
+    The summary as a table per phase
+    """
+    lines = []
+    for (name, data) in summary().items():
+        seconds = '' if data['seconds'] is None else ' ({:.3f}s)'.format(data['seconds'])
+        lines.append('{}{}'.format(name, seconds))
+        for (label, timer) in data['timers'].items():
+            lines.append('  {:45} {:10} calls {:10.4f}s {:10.2f}us/call'.format(
+                label, timer['calls'], timer['seconds'], 1e6 * timer['seconds'] / timer['calls']))
+        for (counter, value) in data['counters'].items():
+            lines.append('  {:45} {:10}'.format(counter, value))
+    return '\n'.join(lines)
+
+
+@contextmanager
+def profile(filename: str):
+    """
+    Enable instrumentation and cProfile for the block. Afterwards the
+    profile is written to filename (load it with pstats) and the summary is
+    printed to stderr
+    """
+    reset()
+    enable()
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield
+    finally:
+        profiler.disable()
+        disable()
+        profiler.dump_stats(filename)
+        print(format_summary(), file=sys.stderr)
+        print('Profile written to {}'.format(filename), file=sys.stderr)
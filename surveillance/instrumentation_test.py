@@ -0,0 +1,47 @@
+"""
+Testing the opt-in instrumentation
+"""
+import pstats
+
+from surveillance import instrumentation
+from surveillance.environment import Environment
+
+
+def test_probes_only_patch_while_enabled():
+    environment = Environment('assets/small_map.png', 1, 'assets/small_map.pickle')
+    original = Environment.in_object
+
+    instrumentation.reset()
+    instrumentation.count('ignored')
+    environment.in_object(75, 75)
+    assert instrumentation.summary() == {}
+
+    instrumentation.enable()
+    try:
+        assert Environment.in_object is not original
+        with instrumentation.phase('checks'):
+            for _ in range(3):
+                environment.in_object(75, 75)
+            instrumentation.count('points', 3)
+        environment.in_environment(75, 75)
+    finally:
+        instrumentation.disable()
+
+    assert Environment.in_object is original
+    summary = instrumentation.summary()
+    assert list(summary) == ['checks', 'main']
+    assert summary['checks']['timers']['Environment.in_object']['calls'] == 3
+    assert summary['checks']['counters'] == {'points': 3}
+    assert summary['checks']['seconds'] > 0
+    assert summary['main']['timers']['Environment.in_environment']['calls'] == 1
+
+
+def test_profile_writes_stats(tmp_path):
+    environment = Environment('assets/small_map.png', 1, 'assets/small_map.pickle')
+    with instrumentation.profile(str(tmp_path / 'run.prof')):
+        environment.in_free_space([75, 100], [75, 100])
+
+    assert not instrumentation.is_enabled()
+    assert instrumentation.summary()['main']['timers']['Environment.in_free_space']['calls'] == 1
+    stats = pstats.Stats(str(tmp_path / 'run.prof'))
+    assert any(function[2] == 'in_free_space' for function in stats.stats)
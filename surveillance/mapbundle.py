@@ -0,0 +1,171 @@
+"""
+Versioned on-disk map bundles.
+
+A bundle is a directory holding everything derived from a map as plain .npy
+arrays next to a small JSON header:
+
+    header.json          Format version and the names of the arrays
+    occupancy.npy        Thresholded map image (1 is empty, 0 is occupied)
+    distance_field.npy   Distance (in pixels) to the closest occupied pixel
+    box_matrix.npy       RoomMap box grid
+    neighbor_mask.npy    Grid graph of the RoomMap (see RoomMap._build_grid)
+    raw_types.npy        Raw node type of every box (index in NODE_TYPES)
+    reduced_*.npy        Reduced graph, neighbors and the nodes and corners
+                         of rooms are stored as CSR arrays, along with the
+                         shortest path lengths between all of its nodes
+                         (left out for very large graphs)
+
+Arrays are memory mapped when a bundle is loaded, so loading does not decode
+the image, rebuild the graph or unpickle anything.
+
+Convert the bundled assets with:
+    python -m surveillance.mapbundle assets/big_map.png assets/big_map.pickle assets/big_map.bundle
+"""
+import argparse
+import json
+import os
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+from surveillance.environment import Environment
+from surveillance.roombuilder.roombuilder import RoomMap
+
+
+BUNDLE_VERSION = 2
+
+# Older versions that can still be loaded (version 1 has no shortest paths)
+SUPPORTED_VERSIONS = (1, 2)
+
+# Types of the nodes of a reduced graph, stored as their index in this tuple
+REDUCED_TYPES = ('room', 'hallway', 'junction')
+
+
+def _ragged(lists: List[list]) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Store a list of lists of node ids as CSR arrays (indptr, indices)
+    """
+    indptr = np.cumsum([0] + [len(values) for values in lists]).astype(np.int64)
+    indices = np.array([int(value) for values in lists for value in values], dtype=np.int64)
+    return indptr, indices
+
+
+def _encode_reduced_graph(graph: dict) -> Dict[str, np.ndarray]:
+    """
+    Convert a reduced graph to arrays, nodes are kept in the order of the dict
+    """
+    data = list(graph.values())
+    arrays = {
+        'reduced_ids': np.array([int(node) for node in graph], dtype=np.int64),
+        'reduced_pos': np.array([node['pos'] for node in data], dtype=float).reshape(-1, 2),
+        'reduced_area': np.array([node['area'] for node in data], dtype=np.int64),
+        'reduced_types': np.array([REDUCED_TYPES.index(node['type']) for node in data], dtype=np.int8),
+        'reduced_dead_end': np.array([node['is_dead_end'] for node in data], dtype=bool)
+    }
+    for key in ['neighbors', 'room_nodes', 'corners']:
+        indptr, indices = _ragged([node.get(key, []) for node in data])
+        arrays['reduced_{}_indptr'.format(key)] = indptr
+        arrays['reduced_{}'.format(key)] = indices
+    return arrays
+
+
+def _decode_reduced_graph(arrays: Dict[str, np.ndarray]) -> dict:
+    """
+    Convert arrays made by _encode_reduced_graph back to a reduced graph
+    """
+    def ragged(key: str) -> List[List[int]]:
+        indptr = arrays['reduced_{}_indptr'.format(key)].tolist()
+        indices = arrays['reduced_{}'.format(key)].tolist()
+        return [indices[start:end] for (start, end) in zip(indptr[:-1], indptr[1:])]
+
+    neighbors = ragged('neighbors')
+    room_nodes = ragged('room_nodes')
+    corners = ragged('corners')
+
+    graph = {}
+    for (index, node) in enumerate(arrays['reduced_ids'].tolist()):
+        type = REDUCED_TYPES[arrays['reduced_types'][index]]
+        pos = arrays['reduced_pos'][index].tolist()
+        graph[node] = {
+            # Junctions sit on a single box, their position is a box index
+            'pos': tuple(int(value) for value in pos) if type == 'junction' else tuple(pos),
+            'neighbors': neighbors[index],
+            'type': type,
+            'area': int(arrays['reduced_area'][index]),
+            'is_dead_end': bool(arrays['reduced_dead_end'][index])
+        }
+        if type == 'room':
+            graph[node]['corners'] = corners[index]
+            graph[node]['room_nodes'] = room_nodes[index]
+    return graph
+
+
+def save_bundle(bundle: str, environment: Environment) -> None:
+    """
+    Write the map, distance field and graphs of an environment to a bundle
+    directory
+    """
+    room_map = environment.room_map
+    arrays = {
+        'occupancy': np.asarray(environment.map != 0, dtype=np.uint8),
+        'distance_field': np.asarray(environment.distance_field, dtype=np.float32),
+        'box_matrix': np.asarray(room_map.map, dtype=np.uint8),
+        'neighbor_mask': np.asarray(room_map.neighbor_mask, dtype=bool),
+        'raw_types': np.asarray(room_map.raw_types, dtype=np.int8)
+    }
+    arrays.update(_encode_reduced_graph(room_map.reduced_graph))
+    if len(room_map.reduced_graph) <= RoomMap.MAX_STORED_PATHS:
+        arrays['reduced_path_lengths'] = room_map.path_lengths
+
+    os.makedirs(bundle, exist_ok=True)
+    for (name, array) in arrays.items():
+        np.save(os.path.join(bundle, name + '.npy'), array)
+
+    # The header is written last, so a bundle is only valid once complete
+    with open(os.path.join(bundle, 'header.json'), 'w') as f:
+        json.dump({'version': BUNDLE_VERSION, 'arrays': sorted(arrays)}, f, indent=2)
+
+
+def load_bundle(bundle: str, pixel_to_cm: float) -> Environment:
+    """
+    Load an environment from a bundle directory. The arrays are memory
+    mapped read only.
+    """
+    with open(os.path.join(bundle, 'header.json')) as f:
+        header = json.load(f)
+
+    if header['version'] not in SUPPORTED_VERSIONS:
+        raise Exception('Unsupported map bundle version {} (expected {}) in {}'.format(
+            header['version'], BUNDLE_VERSION, bundle))
+
+    arrays = {name: np.load(os.path.join(bundle, name + '.npy'), mmap_mode='r')
+              for name in header['arrays']}
+
+    room_map = RoomMap.from_arrays(arrays['box_matrix'], arrays['neighbor_mask'],
+                                   arrays['raw_types'], _decode_reduced_graph(arrays),
+                                   arrays.get('reduced_path_lengths'))
+    return Environment.from_arrays(arrays['occupancy'], arrays['distance_field'],
+                                   room_map, pixel_to_cm)
+
+
+def convert(map_file: str, graph_file: str, bundle: str) -> None:
+    """
+    Convert a map image and pickled RoomMap to a bundle
+    """
+    # The scale is not part of the bundle
+    save_bundle(bundle, Environment(map_file, 1, graph_file))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='''Convert a map image and its
+                                     pickled graph to a map bundle''')
+    parser.add_argument('image', help='Map image (PNG)')
+    parser.add_argument('graph', help='Pickled RoomMap of the map')
+    parser.add_argument('bundle', help='Directory to write the bundle to')
+    args = parser.parse_args()
+
+    convert(args.image, args.graph, args.bundle)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,50 @@
+import json
+import os
+
+import numpy as np
+import pytest
+
+from surveillance.environment import Environment
+from surveillance.mapbundle import convert, load_bundle
+
+
+def test_bundle_round_trip(tmp_path):
+    bundle = str(tmp_path / 'small_map.bundle')
+    convert('assets/small_map.png', 'assets/small_map.pickle', bundle)
+
+    expected = Environment('assets/small_map.png', 2, 'assets/small_map.pickle')
+    environment = load_bundle(bundle, 2)
+
+    assert isinstance(environment.map, np.memmap)
+    assert np.array_equal(environment.map != 0, expected.map != 0)
+    assert np.array_equal(environment.distance_field, expected.distance_field)
+    assert environment.cm_to_pixel == expected.cm_to_pixel
+
+    room_map = environment.room_map
+    assert np.array_equal(room_map.map, expected.room_map.map)
+    assert np.array_equal(room_map.raw_types, expected.room_map.raw_types)
+    assert room_map.graph == expected.room_map.graph
+    assert np.array_equal(room_map.path_lengths, expected.room_map.path_lengths)
+
+    # Same nodes in the same order, so placements come out the same
+    assert list(room_map.reduced_graph) == list(expected.room_map.reduced_graph)
+    for (node, data) in expected.room_map.reduced_graph.items():
+        loaded = room_map.reduced_graph[node]
+        assert sorted(loaded) == sorted(data)
+        for key in data:
+            assert loaded[key] == data[key]
+
+
+def test_bundle_version_is_checked(tmp_path):
+    bundle = str(tmp_path / 'small_map.bundle')
+    convert('assets/small_map.png', 'assets/small_map.pickle', bundle)
+
+    header_file = os.path.join(bundle, 'header.json')
+    with open(header_file) as f:
+        header = json.load(f)
+    header['version'] += 1
+    with open(header_file, 'w') as f:
+        json.dump(header, f)
+
+    with pytest.raises(Exception, match='version'):
+        load_bundle(bundle, 1)
@@ -1,37 +1,126 @@
-from typing import List
+from typing import Dict, List, Tuple
 
 import numpy as np
 
+from surveillance.cache import content_key
 from surveillance.environment import Environment
+from surveillance.graph import CompactGraph
 from surveillance.sensors.base import Sensor, SensorType
 from surveillance.placement.step import PlacementStep, PlacementResult, Placement
+from surveillance.placement.search import LazyGreedy
 from surveillance.helpers import Pose, compute_angle, node_to_px
+from surveillance.instrumentation import instrument
+from surveillance.visibility import Window, visibility_mask
+
+
+def _popcount(bits: np.ndarray) -> int:
+    """
+    Number of set bits in a packed bitset
+    """
+    return int(np.unpackbits(bits).sum())
 
 
 class CameraSensorPlacement(PlacementStep):
-    def __init__(self, environment: Environment):
+    def __init__(self, environment: Environment, num_headings: int = 5,
+                 heading_spread: float = 90):
+        """
+        :param num_headings: Number of headings tried at every corner
+        :param heading_spread: Angle (in degrees) the headings are spread
+                               over, centered on the direction from the
+                               corner to the average position of its room
+        """
         super().__init__(environment)
+        self.num_headings = num_headings
+        self.heading_spread = heading_spread
 
-    def _compute_coverage(self, camera, pose, room):
+    def _room_pixels(self, room: int) -> Tuple[Window, np.ndarray]:
+        """
+        Finds the window of the map that the given room spans, and the mask of
+        the empty pixels of the room within that window
+        """
+        room_map = self.environment.room_map
+        box_px = int(round(room_map.BOX_SIZE * self.environment.cm_to_pixel))
+
+        rows, cols = np.divmod(np.asarray(room_map.reduced_graph[room]['room_nodes']),
+                               room_map.DIM_X)
+        top, left = rows.min(), cols.min()
+        boxes = np.zeros((rows.max() - top + 1, cols.max() - left + 1), dtype=bool)
+        boxes[rows - top, cols - left] = True
+
+        mask = boxes.repeat(box_px, axis=0).repeat(box_px, axis=1)
+        window = (int(top) * box_px, int(left) * box_px, mask.shape[0], mask.shape[1])
+        free = self.environment.map[window[0]:window[0] + window[2],
+                                    window[1]:window[1] + window[3]] != 0
+        return window, mask & free
+
+    def _compute_coverage(self, camera, pose, window: Window, room_mask: np.ndarray) -> np.ndarray:
         """
-        Computes area inside given room that is covered by given camera sensor
-        with particular placement (Assumes the placement is inside the room)
-        Outputs list of covered nodes, the length of which is the covered area!
+        Computes the pixels of the room that are covered by given camera sensor
+        with particular placement, walls block the view of the camera
+        Outputs a packed bitset over the pixels of room_mask (in row major order)
         """
+        seen = visibility_mask(self.environment, pose.x, pose.y, pose.theta,
+                               camera.fov, camera.range, window)
+        return np.packbits(seen[room_mask])
+
+    def _candidates(self) -> List[Tuple[int, int, Pose]]:
+        """
+        Every (room, corner, pose) a camera can be placed at, for every
+        corner of every room there is one pose per heading
+        """
+        room_map = self.environment.room_map
+
+        spread = np.deg2rad(self.heading_spread)
+        offsets = np.linspace(-spread/2, spread/2, self.num_headings) if self.num_headings > 1 else [0]
+
+        candidates = []
+        for (room, data) in room_map.reduced_graph.items():
+            if data['type'] != 'room':
+                continue
+            for corner in data['corners']:
+                if room_map._identify_node(corner) != 'corner_cvx': # Exclude non-ideal convex corners
+                    # Position of the box, without building the dict graph
+                    y_pos, x_pos = divmod(int(corner), room_map.DIM_X)
 
-        covered_nodes = []
-        for node in room:
-            # First compute the coordinates of the node in pixel space
-            px, py = node_to_px(self.environment.room_map.graph[node]['pos'],
-                                self.environment.room_map.BOX_SIZE)
+                    # Headings are centered on the room centroid
+                    theta = compute_angle(x_pos, y_pos, data['pos'][0], data['pos'][1])
 
-            # Then check if point is covered by camera
-            if camera.is_inside_viewcone(pose, px, py) == True:
-                covered_nodes.append(node)
+                    px, py = node_to_px(tuple([x_pos, y_pos]), room_map.BOX_SIZE)
+                    for offset in offsets:
+                        candidates.append((room, corner, Pose(x=px, y=py, theta=theta + offset)))
 
-        return covered_nodes
+        return candidates
 
-    def place(self, sensors: List[Sensor], original_graph: dict) -> PlacementResult:
+    def _coverage_table(self, camera, candidates: List[Tuple[int, int, Pose]],
+                        room_pixels: Dict[int, Tuple[Window, np.ndarray]]) -> List[np.ndarray]:
+        """
+        Computes the coverage bitset of the camera at each candidate (see
+        _compute_coverage). Only depends on the map, its scale and the range
+        and fov of the camera, so it is stored in the environment cache when
+        there is one
+        """
+        def compute():
+            covered = [self._compute_coverage(camera, pose, *room_pixels[room])
+                       for (room, _, pose) in candidates]
+            return {
+                'indptr': np.cumsum([0] + [len(bits) for bits in covered]),
+                'bits': np.concatenate(covered) if covered else np.zeros(0, dtype=np.uint8)
+            }
+
+        cache = self.environment.cache
+        if cache is None:
+            table = compute()
+        else:
+            key = content_key(self.environment.map_key, 'visibility',
+                              float(self.environment.cm_to_pixel), float(camera.range),
+                              float(camera.fov), self.num_headings, float(self.heading_spread))
+            table = cache.get_or_compute('camera_coverage', key, compute)
+
+        indptr = table['indptr']
+        return [table['bits'][start:end] for (start, end) in zip(indptr[:-1], indptr[1:])]
+
+    @instrument
+    def place(self, sensors: List[Sensor], original_graph: CompactGraph) -> PlacementResult:
         """
         Place camera sensors in the environment. The process by which they are placed
         works as follows:
@@ -39,12 +128,18 @@ class CameraSensorPlacement(PlacementStep):
         > Cameras are always placed inside rooms, and only in corners of the rooms, as
           these are strictly always better than room edges or midpoints.
 
-        1. Find the room with largest (unsurveiled) area
-        2. Compute the coverage of placing a camera on each of that rooms corners
-           Where the camera faces towards the average position of the room
-        3. Select the corner with the highest coverage and place camera there
-        4. Reduce the (unsurveiled) area of the room by the coverage of the camera
-        5. Repeat until no cameras left to place
+        1. Compute the coverage of every candidate pose, a few headings at every corner
+           of every room (The coverage is the area of the room the camera can see,
+           walls block its view)
+        2. Of the cameras left to place, pick the camera and pose that cover the most
+           area that is not covered yet. When cameras differ, the camera that covers
+           the most is placed first, in the pose that suits it best
+        3. Reduce the (unsurveiled) area of the room by the new coverage of the camera
+        4. Repeat until no cameras left to place
+
+        Coverage is submodular (a pose never covers more once other cameras are
+        placed), so step 2 uses lazy greedy selection and only re-evaluates a few
+        poses per camera.
 
         The graph is not modified except for the new area values. This helps indicate to
         robot step what rooms (despite being large) are already mostly covered by cameras
@@ -52,56 +147,70 @@ class CameraSensorPlacement(PlacementStep):
         gains no value from checking rooms that are already covered by other sensors)
         """
 
-        # Unpakc graphs from RoomMap object
-        G = self.environment.room_map.graph
-        M = self.environment.room_map.reduced_graph
+        # The areas are updated on a copy of the graph from the previous steps
+        M = original_graph.copy()
 
-        #TODO: First sort the camera list by coverage, to ensure cameras with
-        #      best coverage get placed first
+        # Rooms that cameras can be placed in
+        rooms = set(room for room in M.nodes() if M.data(room)['type'] == 'room')
 
-        placements = []
+        # Pixels of each room, coverage is measured in pixels and converted
+        # to an area in boxes
+        room_map = self.environment.room_map
+        box_px = int(round(room_map.BOX_SIZE * self.environment.cm_to_pixel))
+        room_pixels = {room: self._room_pixels(room) for room in room_map.reduced_graph
+                       if room_map.reduced_graph[room]['type'] == 'room'}
+
+        # Pixels of each room that are covered by a camera (packed bitsets)
+        covered = {room: np.packbits(np.zeros(room_pixels[room][1].sum(), dtype=bool))
+                   for room in rooms}
 
-        sensors = [sensor for sensor in sensors if sensor.sensor_type == SensorType.CAMERA]
+        candidates = [candidate for candidate in self._candidates() if candidate[0] in rooms]
+
+        # Cameras with the same range and fov share a coverage table and a
+        # lazy greedy search
+        cameras: Dict[Tuple[float, float], List[Sensor]] = {}
         for camera in sensors:
+            if camera.sensor_type == SensorType.CAMERA:
+                cameras.setdefault((camera.range, camera.fov), []).append(camera)
+
+        searches: Dict[Tuple[float, float], LazyGreedy] = {}
+        tables: Dict[Tuple[float, float], List[np.ndarray]] = {}
+        for (kind, kind_cameras) in cameras.items():
+            table = self._coverage_table(kind_cameras[0], candidates, room_pixels)
+
+            def gain(index: int, table=table) -> int:
+                return _popcount(table[index] & ~covered[candidates[index][0]])
 
-            # Find room with largest unsurveiled area (and sort rooms by unsurveiled area)
-            area_node_pairs = [(node, M[node]['area']) for node in M if M[node]['type'] == 'room']
-            area_node_pairs.sort(key=lambda x : x[1], reverse=True) # Sort by area
-            room = area_node_pairs[0][0] # Select largest area and pick node
-
-            # For all corners in room, measure coverage of camera placement and pick highest
-            best_coverage = []
-            best_pose = Pose(-1, -1, 0)
-            chosen_room = -1
-            # Iterate through rooms, biggest to smallest to find the best placement:
-            for room_pair in area_node_pairs:
-                room = room_pair[0]
-                for corner in M[room]['corners']:
-                    if G[corner]['raw_type'] != 'corner_cvx': # Exclude non-ideal convex corners
-                        x_pos = G[corner]['pos'][0]
-                        y_pos = G[corner]['pos'][1]
-
-                        # Compute camera placement angle (aiming towards room centroid)
-                        x_avg = M[room]['pos'][0]
-                        y_avg = M[room]['pos'][1]
-                        theta = compute_angle(x_pos, y_pos, x_avg, y_avg)
-
-                        # Measure coverage and track the corner with the highest value
-                        px, py = node_to_px(tuple([x_pos, y_pos]),
-                                            self.environment.room_map.BOX_SIZE)
-                        pose = Pose(x=px, y=py, theta=theta)
-                        room_nodes = M[room]['room_nodes']
-                        coverage = self._compute_coverage(camera, pose, room_nodes)
-                        if len(coverage) > len(best_coverage):
-                            best_coverage = coverage
-                            best_pose = pose
-                            chosen_room = room
+            tables[kind] = table
+            searches[kind] = LazyGreedy([_popcount(bits) for bits in table], gain)
+
+        placements = []
+        while len(cameras) != 0:
+            # Pick the camera and pose with the largest new coverage
+            best_kind, best_index, best_coverage = None, None, 0
+            for (kind, search) in searches.items():
+                index, coverage = search.best()
+                if best_kind is None or coverage > best_coverage:
+                    best_kind, best_index, best_coverage = kind, index, coverage
+
+            camera = cameras[best_kind].pop(0)
+            if len(cameras[best_kind]) == 0:
+                del cameras[best_kind]
+                del searches[best_kind]
+
+            if best_index is None or best_coverage == 0:
+                # Nothing left to cover (or nowhere to place the camera)
+                placements.append(Placement(camera, pose=Pose(-1, -1, 0)))
+                continue
 
             # Once the best placement is found, place camera there, and update room area
-            placements.append(Placement(camera, pose=best_pose))
-            M[chosen_room]['area'] -= len(best_coverage) # This way the 'area' of the room is
-                                                         # only the unsurveiled area (useful)
-            for covered_node in best_coverage:
-                M[chosen_room]['room_nodes'].remove(covered_node) # Nodes can only be covered once
+            room, _, pose = candidates[best_index]
+            placements.append(Placement(camera, pose=pose))
+
+            # This way the 'area' of the room is only the unsurveiled area (useful)
+            M.set_area(room, M.get_area(room) - best_coverage / box_px**2)
+            covered[room] |= tables[best_kind][best_index] # Pixels can only be covered once
+            for search in searches.values():
+                search.invalidate()
 
         return PlacementResult(graph=M, placements=placements)
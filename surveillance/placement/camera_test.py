@@ -0,0 +1,28 @@
+from surveillance.cache import ArtifactCache
+from surveillance.environment import Environment
+from surveillance.graph import CompactGraph
+from surveillance.placement.camera import CameraSensorPlacement
+from surveillance.sensors.camera import CameraSensor
+
+
+def test_coverage_cache_is_kept_per_scale(tmp_path):
+    cache = ArtifactCache(str(tmp_path))
+
+    # The coverage of the same map at another scale must not be reused
+    for pixel_to_cm in [1, 2]:
+        environment = Environment('assets/small_map.png', pixel_to_cm, 'assets/small_map.pickle', cache)
+        camera = CameraSensor(pixel_to_cm, environment, {'name': 'Camera', 'range': 300})
+        graph = CompactGraph.from_dict(environment.room_map.reduced_graph)
+        result = CameraSensorPlacement(environment).place([camera], graph)
+        assert len(result.placements) == 1
+
+
+def test_placement_does_not_build_the_dict_graph():
+    environment = Environment('assets/big_map.png', 1, 'assets/big_map.pickle')
+    environment.room_map._graph = None  # The bundled pickles hold the dict graph
+    camera = CameraSensor(1, environment, {'name': 'Camera', 'range': 300})
+    graph = CompactGraph.from_dict(environment.room_map.reduced_graph)
+
+    result = CameraSensorPlacement(environment).place([camera], graph)
+    assert len(result.placements) == 1
+    assert environment.room_map._graph is None
@@ -1,6 +1,4 @@
 from typing import List, Tuple
-import itertools
-import copy
 import statistics
 import math
 
@@ -9,89 +7,78 @@ import numpy as np
 from surveillance.environment import Environment
 from surveillance.sensors.base import Sensor, SensorType
 from surveillance.placement.step import PlacementStep, PlacementResult, Placement
-from surveillance.helpers import _get_hallways, _get_number_cycles, _get_sub_graph_sizes, Pose
+from surveillance.placement.search import exhaustive_search, local_search
+from surveillance.graph import CompactGraph
+from surveillance.helpers import _get_hallways, Pose
+from surveillance.instrumentation import instrument
 
 
 class LineSensorPlacement(PlacementStep):
-    def __init__(self, environment: Environment):
+    # Above this many combinations the exhaustive search is replaced by a
+    # local search
+    EXHAUSTIVE_LIMIT = 5000
+
+    def __init__(self, environment: Environment, strategy: str = 'auto',
+                 time_budget: float = 2, seed: int = 0):
+        """
+        :param strategy: How the placement is searched for, either
+                         'exhaustive', 'local' or 'auto' to only use the
+                         exhaustive search when there are few combinations
+        :param time_budget: Seconds the local search may spend trying to
+                            improve on its first solution
+        :param seed: Seed for the random restarts of the local search
+        """
         super().__init__(environment)
+        self.strategy = strategy
+        self.time_budget = time_budget
+        self.seed = seed
 
-    def _get_least_cycles(self, original_graph: dict, line_sensors: List[Sensor], hallways: List[int]) -> List[Tuple]:
+    def _score(self, original_graph: CompactGraph, placement: Tuple) -> Tuple[int, float]:
         """
-        This will iterate through all possible combinations hallways where
-        the line sensors could be placed and determine the number of cycles
-        that would exist in the graph if the nodes in the placement were
-        removed. The placement with the least number of cycles will be
-        returned (likely a list of options)
+        Remove the nodes in the placement from the graph and determine the
+        number of cycles left along with the standard deviation of the sizes
+        of all sub graphs created. Only the node mask of the graph is copied
         """
-        # Generate all possible combinations of hallways that the line sensors
-        # could be placed on
-        num_line_sensor = len(line_sensors)
-        line_sensor_placements = list(itertools.combinations(hallways, num_line_sensor))
-        print('Number of combinations: {}'.format(len(line_sensor_placements)))
-
-        # Go through all combinations and calculate the number of cycles
-        # each combination would create
-        placement_performances: List[Tuple[int, List]] = []
-        for placement in line_sensor_placements:
-            # Make a copy of the reduced_graph
-            graph = copy.deepcopy(original_graph)
-
-            # Remove the nodes that are in the placement
-            for node in placement:
-                graph = self.environment.room_map._remove_node_from_graph(graph, node)
-
-            # Remove nodes that no longer have any neighbors, this throws off
-            # the cycle calculation
-            nodes = list(graph.keys())
-            for node in nodes:
-                if len(graph[node]['neighbors']) == 0:
-                    graph = self.environment.room_map._remove_node_from_graph(graph, node)
-
-            # Now calculate the number of cycles on the graph with the
-            # line sensors segmenting the hallways
-            num_cycles = _get_number_cycles(graph)
-
-            placement_performances.append((num_cycles, placement))
-
-        # Sort the placements by the number of cycles left in the graph
-        placement_performances.sort(key=lambda x: x[0])
-
-        # Keep top placements
-        least_cycles = placement_performances[0][0]
-        top_placements = [placement for placement in placement_performances if placement[0] == least_cycles]
-
-        # Return only the nodes, the cooresponding number of cycles is extra
-        # knowledge that is not needed
-        return [placement[1] for placement in top_placements]
-
-    def _get_lowest_stddev(self, original_graph: dict, line_sensors: List[Sensor],
-                           least_cycles: List[Tuple]) -> Tuple:
+        components = original_graph.without(placement).components()
+
+        graph_sizes = components.sizes
+        stddev = statistics.stdev(graph_sizes) if len(graph_sizes) >= 2 else 0.0
+        return components.num_cycles, stddev
+
+    def _get_best_placement(self, original_graph: CompactGraph, line_sensors: List[Sensor],
+                            hallways: List[int]) -> Tuple:
         """
-        This will iterate through the split options (least_cycles) and
-        determine the size of all sub graphs created if the nodes in the
-        placement are removed. The placement with the lowest standard
-        deviation of subgraph sizes will be returned.
+        Find the hallways to place the line sensors on. Placements are
+        compared first on the number of cycles left in the graph and then
+        on the standard deviation of the subgraph sizes.
+
+        Every combination of hallways is checked when there are few enough
+        of them, otherwise a time limited local search is used
         """
-        placement_performances: List[Tuple[int, List]] = []
-        for placement in least_cycles:
-            # Make a copy of the reduced_graph
-            graph = copy.deepcopy(original_graph)
+        num_line_sensor = len(line_sensors)
+        if num_line_sensor > len(hallways):
+            raise Exception('Cannot place {} line sensors in {} hallways'.format(
+                num_line_sensor, len(hallways)))
 
-            # Remove the nodes that are in the placement
-            for node in placement:
-                graph = self.environment.room_map._remove_node_from_graph(graph, node)
+        def score(placement: Tuple) -> Tuple[int, float]:
+            return self._score(original_graph, placement)
 
-            graph_sizes = _get_sub_graph_sizes(graph)
-            placement_performances.append((statistics.stdev(graph_sizes), placement))
+        num_combinations = math.comb(len(hallways), num_line_sensor)
+        print('Number of combinations: {}'.format(num_combinations))
 
-        # Sort the placements by the number of cycles left in the graph
-        placement_performances.sort(key=lambda x: x[0])
+        if self.strategy == 'exhaustive' or \
+                (self.strategy == 'auto' and num_combinations <= self.EXHAUSTIVE_LIMIT):
+            placement, _ = exhaustive_search(hallways, num_line_sensor, score)
+        elif self.strategy in ('local', 'auto'):
+            placement, _ = local_search(hallways, num_line_sensor, score,
+                                        self.time_budget, self.seed)
+        else:
+            raise Exception('Unsupported line placement strategy: {}'.format(self.strategy))
 
-        # Get the nodes of the ideal placements
-        return placement_performances[0][1]
+        return placement
 
-    def place(self, sensors: List[Sensor], original_graph: dict) -> PlacementResult:
+    @instrument
+    def place(self, sensors: List[Sensor], original_graph: CompactGraph) -> PlacementResult:
         """
         Place line sensors in the environment. Line sensors are placed in
         hallways with the following goals.
@@ -103,7 +90,8 @@ class LineSensorPlacement(PlacementStep):
         2. Minimize the standard deviation of the subgraph sizes
            This goal is to break the graph into subgraphs of similar sizes.
         """
-        hallways = _get_hallways(self.environment.room_map)
+        hallways = [node for node in _get_hallways(self.environment.room_map)
+                    if node in original_graph]
 
         line_sensors = [sensor for sensor in sensors if sensor.sensor_type == SensorType.LINE]
         num_line_sensor = len(line_sensors)
@@ -114,31 +102,13 @@ class LineSensorPlacement(PlacementStep):
         if num_line_sensor == 0:
             return PlacementResult(placements=[], graph=original_graph)
 
-        least_cycles = self._get_least_cycles(original_graph, line_sensors, hallways)
-
-        # Only one combination will remove the most cycles, so use this
-        # combination
-        if len(least_cycles) == 0:
-            # Get the nodes of the ideal placements
-            nodes = least_cycles[0]
-
-            # Update the graph with the nodes removed
-            graph = copy.deepcopy(self.environment.room_map.reduced_graph)
-            for node in nodes:
-                graph = self.environment.room_map._remove_node_from_graph(graph, node)
-
-            # Return the placement and resulting graph
-            return PlacementResult(placements=nodes, graph=graph)
-
-        lowest_std = self._get_lowest_stddev(original_graph, line_sensors, least_cycles)
+        best_placement = self._get_best_placement(original_graph, line_sensors, hallways)
 
         # Update the graph with the nodes removed
-        graph = copy.deepcopy(original_graph)
-        for node in lowest_std:
-            graph = self.environment.room_map._remove_node_from_graph(graph, node)
+        graph = original_graph.without(best_placement)
 
         placements = []
-        for (index, node) in enumerate(lowest_std):
+        for (index, node) in enumerate(best_placement):
             x_map = self.environment.room_map.reduced_graph[node]['pos'][0] * self.environment.room_map.BOX_SIZE
             y_map = self.environment.room_map.reduced_graph[node]['pos'][1] * self.environment.room_map.BOX_SIZE
 
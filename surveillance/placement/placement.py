@@ -1,7 +1,7 @@
 from typing import List
-import copy
 
 from surveillance.environment import Environment
+from surveillance.graph import CompactGraph
 from surveillance.sensors.base import Sensor
 from surveillance.placement.line import LineSensorPlacement
 from surveillance.placement.camera import CameraSensorPlacement
@@ -14,12 +14,19 @@ class Placement:
     Handles the logic of determing the "optimal" placements of the given
     sensors in the given environment.
     """
-    def __init__(self, environment: Environment):
+    def __init__(self, environment: Environment, config=None):
+        """
+        :param config: Optional placement settings, the 'line' entry is
+                       passed on to the line sensor step (i.e. strategy and
+                       time_budget) and the 'camera' entry to the camera
+                       step (i.e. num_headings and heading_spread)
+        """
         self.environment = environment
+        config = config or {}
 
         self.steps: List[PlacementStep] = [
-            LineSensorPlacement(self.environment),
-            CameraSensorPlacement(self.environment),
+            LineSensorPlacement(self.environment, **config.get('line', {})),
+            CameraSensorPlacement(self.environment, **config.get('camera', {})),
             RobotPlacement(self.environment)
         ]
 
@@ -32,7 +39,7 @@ class Placement:
         placements = []
         sensors = sensors.copy()
 
-        graph = copy.deepcopy(self.environment.room_map.reduced_graph)
+        graph = CompactGraph.from_dict(self.environment.room_map.reduced_graph)
 
         for step in self.steps:
             # Get the result of the step
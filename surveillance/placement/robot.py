@@ -1,38 +1,161 @@
-import random
 from typing import List
 
+import numpy as np
+
 from surveillance.placement.step import PlacementStep, PlacementResult, Placement
 from surveillance.environment import Environment
+from surveillance.graph import CompactGraph
 from surveillance.sensors.base import SensorType, Sensor
-from surveillance.helpers import Pose, _get_rooms, node_to_px
+from surveillance.helpers import Pose, compute_angle, node_to_px
+from surveillance.instrumentation import instrument
 
 
 class RobotPlacement(PlacementStep):
     def __init__(self, environment: Environment):
         super().__init__(environment)
 
-    def place(self, sensors: List[Sensor], original_graph: dict) -> PlacementResult:
+    def _anchor(self, node: int) -> int:
+        """
+        Box of the unreduced graph that a robot drives to when visiting the
+        given node of the reduced graph. For rooms this is the room box
+        closest to the average position of the room
+        """
+        room_map = self.environment.room_map
+        data = room_map.reduced_graph[node]
+        if data['type'] != 'room':
+            return int(node)
+
+        room_nodes = np.asarray(data['room_nodes'])
+        rows, cols = np.divmod(room_nodes, room_map.DIM_X)
+        closest = np.argmin(np.hypot(cols - data['pos'][0], rows - data['pos'][1]))
+        return int(room_nodes[closest])
+
+    def _distances(self, targets: List[int]) -> np.ndarray:
+        """
+        Length (in boxes) of the shortest path between every pair of targets
+        through the reduced graph. Robots can drive past line sensors, so
+        every node of the reduced graph is used
+        """
+        room_map = self.environment.room_map
+        rows = [room_map.reduced_index[target] for target in targets]
+        return room_map.path_lengths_from(targets)[:, rows]
+
+    def _tour(self, distances: np.ndarray) -> List[int]:
+        """
+        Order the targets into a short closed tour, nearest neighbor
+        construction followed by 2-opt moves until none improve the tour
+
+        :return: Indexes of the targets in tour order
+        """
+        # Unreachable targets are visited last
+        distances = np.where(np.isinf(distances), 1e9, distances)
+
+        tour = [0]
+        unvisited = set(range(1, len(distances)))
+        while len(unvisited) != 0:
+            nearest = min(unvisited, key=lambda index: distances[tour[-1], index])
+            tour.append(nearest)
+            unvisited.remove(nearest)
+
+        improved = True
+        while improved:
+            improved = False
+            for i in range(1, len(tour) - 1):
+                for j in range(i + 1, len(tour)):
+                    a, b = tour[i - 1], tour[i]
+                    c, d = tour[j], tour[(j + 1) % len(tour)]
+                    if distances[a, c] + distances[b, d] < distances[a, b] + distances[c, d] - 1e-9:
+                        tour[i:j + 1] = tour[i:j + 1][::-1]
+                        improved = True
+
+        return tour
+
+    def _split(self, tour: List[int], area: np.ndarray, num_robots: int) -> List[List[int]]:
         """
-        This is a simplified version of the placement that just places the
-        robots in random room nodes. Ideally the placement is based on graphs
-        that need to be explored
+        Cut the tour into one contiguous part per robot, so that each part
+        holds about the same unsurveilled area. When there are more robots
+        than targets, robots share targets
+        """
+        if num_robots >= len(tour):
+            return [[tour[index % len(tour)]] for index in range(num_robots)]
+
+        # Put each target in the part its area falls in the middle of
+        weights = area[tour]
+        middles = np.cumsum(weights) - weights / 2
+        parts = np.minimum((middles / weights.sum() * num_robots).astype(int), num_robots - 1)
+
+        split = [[tour[index] for index in np.flatnonzero(parts == part)] for part in range(num_robots)]
+        if any(len(part) == 0 for part in split):
+            # A few targets hold most of the area, split by count instead
+            split = [list(part) for part in np.array_split(tour, num_robots)]
+        return split
+
+    def _route(self, anchors: List[int]) -> np.ndarray:
+        """
+        Waypoints (in CMs) of a closed patrol that visits the anchor boxes in
+        order. Consecutive waypoints are connected boxes of the unreduced
+        graph, straight runs of boxes are merged into one waypoint
+        """
+        room_map = self.environment.room_map
+
+        boxes = [anchors[0]]
+        for (start, goal) in zip(anchors, anchors[1:] + anchors[:1]):
+            boxes.extend(room_map.grid_path(start, goal)[1:])
+
+        rows, cols = np.divmod(np.array(boxes), room_map.DIM_X)
+        points = np.column_stack([cols, rows])
+
+        # Only keep the boxes where the direction changes
+        if len(points) > 2:
+            steps = np.diff(points, axis=0)
+            turns = np.any(steps[1:] != steps[:-1], axis=1)
+            points = np.concatenate([points[:1], points[1:-1][turns], points[-1:]])
+
+        return np.array([node_to_px(point, room_map.BOX_SIZE) for point in points], dtype=float)
+
+    @instrument
+    def place(self, sensors: List[Sensor], original_graph: CompactGraph) -> PlacementResult:
+        """
+        Plan patrols for the robots over the area left unsurveilled by the
+        line sensors and cameras:
+
+        1. The targets are the rooms (of the residual graph) with area left,
+           or every node if no room has area left
+        2. Order the targets into a single short tour using distances
+           through the reduced graph
+        3. Cut the tour into one part per robot with about the same area
+        4. Each robot patrols its part of the tour in a loop, driving along
+           shortest paths of boxes between the targets
+
+        The routes are computed once, the robots follow their waypoints while
+        the simulation runs
         """
         robot_sensors = [sensor for sensor in sensors if sensor.sensor_type == SensorType.ROBOT]
+        if len(robot_sensors) == 0:
+            return PlacementResult(graph=original_graph, placements=[])
+
+        # 1. Targets
+        targets = [node for node in original_graph.nodes()
+                   if original_graph.data(node)['type'] == 'room' and original_graph.get_area(node) > 0]
+        if len(targets) == 0:
+            targets = original_graph.nodes()
+        if len(targets) == 0:
+            return PlacementResult(graph=original_graph, placements=[])  # Nothing left to patrol
+        area = np.array([max(original_graph.get_area(node), 0) for node in targets], dtype=float)
+        area = np.maximum(area, 1e-6)  # Every target gets some weight
 
-        # Get all the nodes that are in rooms
-        room_nodes = _get_rooms(self.environment.room_map)
+        # 2. Tour
+        tour = self._tour(self._distances(targets))
 
-        # Place the robots in random rooms
-        allocations = []
-        for robot in robot_sensors:
-            node = random.choice(room_nodes)
-            allocations.append((robot, node))
+        # 3. Split among the robots
+        parts = self._split(tour, area, len(robot_sensors))
 
-        # Translate from box to pixels
+        # 4. Routes, starting at the first waypoint
         placements: List[Placement] = []
-        for alloc in allocations:
-            node_pos = self.environment.room_map.reduced_graph[alloc[1]]['pos']
-            x, y = node_to_px(node_pos, self.environment.room_map.BOX_SIZE)
-            placements.append(Placement(sensor=alloc[0], pose=Pose(x=x, y=y, theta=0)))
+        for (robot, part) in zip(robot_sensors, parts):
+            route = self._route([self._anchor(targets[index]) for index in part])
+            x, y = route[0]
+            theta = 0 if len(route) == 1 else compute_angle(x, y, route[1][0], route[1][1])
+            placements.append(Placement(sensor=robot, pose=Pose(x=x, y=y, theta=theta), route=route))
 
         return PlacementResult(graph=original_graph, placements=placements)
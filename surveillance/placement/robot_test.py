@@ -0,0 +1,76 @@
+import numpy as np
+
+from surveillance.environment import Environment
+from surveillance.graph import CompactGraph
+from surveillance.placement.robot import RobotPlacement
+from surveillance.sensors.factory import SensorFactory
+
+
+def _robots(environment, count):
+    factory = SensorFactory(1, environment)
+    return [factory.construct({'type': 'Robot', 'name': 'Robot {}'.format(index), 'speed': 10})
+            for index in range(count)]
+
+
+def _on_segment(point, start, end) -> bool:
+    direction = end - start
+    length = np.dot(direction, direction)
+    t = 0 if length == 0 else np.clip(np.dot(point - start, direction) / length, 0, 1)
+    return np.linalg.norm(start + t * direction - point) < 1e-6
+
+
+def test_routes_stay_in_free_space_and_visit_every_room():
+    environment = Environment('assets/big_map.png', 1, 'assets/big_map.pickle')
+    graph = CompactGraph.from_dict(environment.room_map.reduced_graph)
+    result = RobotPlacement(environment).place(_robots(environment, 2), graph)
+
+    legs = []
+    for placement in result.placements:
+        route = placement.route
+        assert (placement.pose.x, placement.pose.y) == tuple(route[0])
+
+        # Every leg of the loop only crosses free space
+        for (start, end) in zip(route, np.roll(route, -1, axis=0)):
+            t = np.linspace(0, 1, 100)[:, None]
+            points = start + t * (end - start)
+            assert environment.in_free_space(points[:, 0], points[:, 1]).all()
+            legs.append((start, end))
+
+    # Each room is visited through the box closest to its average position
+    placement = RobotPlacement(environment)
+    for node in graph.nodes():
+        if graph.data(node)['type'] == 'room':
+            row, col = divmod(placement._anchor(node), environment.room_map.DIM_X)
+            center = (np.array([col, row]) + 0.5) * environment.room_map.BOX_SIZE
+            assert any(_on_segment(center, start, end) for (start, end) in legs)
+
+
+def test_robot_follows_route():
+    environment = Environment('assets/big_map.png', 1, 'assets/big_map.pickle')
+    robot = _robots(environment, 1)[0]
+    robot.place(75, 75, 0)
+    robot.follow([(75, 75), (175, 75), (175, 125)])
+
+    for _ in range(10):
+        robot.update()
+    assert (robot.x, robot.y) == (175, 75)
+    assert robot.theta == 0
+
+    for _ in range(5):
+        robot.update()
+    assert (robot.x, robot.y) == (175, 125)
+
+    # Placing the robot again restarts the route
+    robot.place(75, 75, 0)
+    robot.update()
+    assert (robot.x, robot.y) == (85, 75)
+
+
+def test_nothing_left_to_patrol():
+    environment = Environment('assets/big_map.png', 1, 'assets/big_map.pickle')
+    graph = CompactGraph.from_dict(environment.room_map.reduced_graph)
+    graph = graph.without(graph.nodes())
+
+    result = RobotPlacement(environment).place(_robots(environment, 2), graph)
+    assert result.placements == []
+    assert result.graph is graph
@@ -0,0 +1,165 @@
+"""
+Search strategies for picking k nodes out of a list of candidates that
+minimize a score. Scores are tuples that are compared lexicographically, so
+a primary goal can be followed by tie breakers.
+"""
+from typing import Callable, Dict, FrozenSet, List, Optional, Sequence, Tuple
+import heapq
+import itertools
+import random
+import time
+
+
+Score = Tuple[float, ...]
+ScoreFunction = Callable[[Tuple[int, ...]], Score]
+
+
+class _CachedScore:
+    """
+    Wraps a score function so that every placement (regardless of the
+    order of its nodes) is only scored once
+    """
+    def __init__(self, score: ScoreFunction):
+        self.score = score
+        self.cache: Dict[FrozenSet[int], Score] = {}
+
+    def __call__(self, placement: Sequence[int]) -> Score:
+        key = frozenset(placement)
+        if key not in self.cache:
+            self.cache[key] = self.score(tuple(placement))
+        return self.cache[key]
+
+
+def _ordered(candidates: List[int], placement: Sequence[int]) -> Tuple[int, ...]:
+    """
+    Put the nodes of a placement in the same order as the candidates
+    """
+    members = set(placement)
+    return tuple(node for node in candidates if node in members)
+
+
+def exhaustive_search(candidates: List[int], k: int,
+                      score: ScoreFunction) -> Tuple[Tuple[int, ...], Score]:
+    """
+    Score every combination of k candidates and return the best. Ties go to
+    the first combination in itertools.combinations order.
+    """
+    best = None
+    best_score = None
+    for placement in itertools.combinations(candidates, k):
+        placement_score = score(placement)
+        if best_score is None or placement_score < best_score:
+            best = placement
+            best_score = placement_score
+
+    return best, best_score
+
+
+def local_search(candidates: List[int], k: int, score: ScoreFunction,
+                 time_budget: float, seed: int = 0) -> Tuple[Tuple[int, ...], Score]:
+    """
+    Greedy construction followed by swap based local search with random
+    restarts.
+
+    1. Build a placement one node at a time, always adding the candidate
+       that gives the best score
+    2. Swap single nodes of the placement with unused candidates while
+       that improves the score
+    3. Until the time budget runs out, perturb the best placement found by
+       swapping a couple of random nodes and repeat step 2 on it
+
+    :param time_budget: Seconds to spend on the restarts, the greedy
+                        construction and the first descent always complete
+    """
+    deadline = time.perf_counter() + time_budget
+    rng = random.Random(seed)
+    score = _CachedScore(score)
+
+    def descend(placement: List[int], stop_at_deadline: bool) -> List[int]:
+        improved = True
+        while improved:
+            improved = False
+            for index in range(k):
+                for candidate in candidates:
+                    if candidate in placement:
+                        continue
+                    swapped = placement.copy()
+                    swapped[index] = candidate
+                    if score(swapped) < score(placement):
+                        placement = swapped
+                        improved = True
+                if stop_at_deadline and time.perf_counter() > deadline:
+                    return placement
+        return placement
+
+    # 1. Greedy construction
+    placement: List[int] = []
+    for _ in range(k):
+        remaining = [candidate for candidate in candidates if candidate not in placement]
+        placement.append(min(remaining, key=lambda candidate: score(placement + [candidate])))
+
+    # 2. Local search
+    best = descend(placement, stop_at_deadline=False)
+
+    # 3. Random restarts around the best placement
+    unused_count = len(candidates) - k
+    while unused_count != 0 and time.perf_counter() < deadline:
+        perturbed = best.copy()
+        unused = [candidate for candidate in candidates if candidate not in perturbed]
+        swaps = min(2, k, unused_count)
+        for (index, candidate) in zip(rng.sample(range(k), swaps), rng.sample(unused, swaps)):
+            perturbed[index] = candidate
+
+        perturbed = descend(perturbed, stop_at_deadline=True)
+        if score(perturbed) < score(best):
+            best = perturbed
+
+    best = _ordered(candidates, best)
+    return best, score(best)
+
+
+class LazyGreedy:
+    """
+    Lazy greedy (CELF) selection for maximizing a monotone submodular
+    function, i.e. coverage.
+
+    The marginal gain of a candidate can only shrink as more candidates are
+    selected, so the gain computed in an earlier round is an upper bound.
+    Candidates are kept in a max heap of these bounds and only the top of the
+    heap is re-evaluated until a candidate whose gain is up to date stays on
+    top. Usually only a few candidates are re-evaluated per selection.
+    """
+    def __init__(self, gains: Sequence[float], gain: Callable[[int], float]):
+        """
+        :param gains: The gain of every candidate before anything is selected
+        :param gain: Computes the current marginal gain of a candidate
+        """
+        self.gain = gain
+        self.round = 0
+
+        # Entries are (-gain, candidate, round the gain was computed in), ties
+        # go to the first candidate
+        self.heap = [(-float(value), index, 0) for (index, value) in enumerate(gains)]
+        heapq.heapify(self.heap)
+
+    def best(self) -> Tuple[Optional[int], float]:
+        """
+        Find the candidate with the largest marginal gain
+
+        :return: The candidate and its gain, None if there are no candidates
+        """
+        while len(self.heap) != 0:
+            bound, index, computed = self.heap[0]
+            if computed == self.round:
+                return index, -bound
+            heapq.heapreplace(self.heap, (-float(self.gain(index)), index, self.round))
+
+        return None, 0.0
+
+    def invalidate(self) -> None:
+        """
+        Mark every gain as out of date, called whenever something is selected
+        (also when it was selected through another LazyGreedy sharing the
+        objective)
+        """
+        self.round += 1
@@ -0,0 +1,54 @@
+"""
+Testing the placement search strategies
+"""
+import random
+
+from surveillance.placement.search import LazyGreedy, exhaustive_search, local_search
+
+
+def test_local_search_matches_exhaustive():
+    rng = random.Random(3)
+    candidates = list(range(15))
+    weights = {node: rng.randint(0, 20) for node in candidates}
+    pairs = {(a, b): rng.randint(-5, 5) for a in candidates for b in candidates if a < b}
+
+    def score(placement):
+        # Lexicographic score with a tie breaker, like the line placement
+        total = sum(weights[node] for node in placement)
+        interaction = sum(pairs[(a, b)] for a in placement for b in placement if a < b)
+        return (total, interaction)
+
+    for k in [1, 3, 5]:
+        best, best_score = exhaustive_search(candidates, k, score)
+        found, found_score = local_search(candidates, k, score, time_budget=0.2)
+        assert found_score == best_score
+        assert len(set(found)) == k
+        assert list(found) == sorted(found)
+
+
+def test_single_combination():
+    best, _ = exhaustive_search([4, 2], 2, lambda placement: (0,))
+    assert best == (4, 2)
+    found, _ = local_search([4, 2], 2, lambda placement: (0,), time_budget=1)
+    assert found == (4, 2)
+
+
+def test_lazy_greedy_matches_greedy_set_cover():
+    rng = random.Random(1)
+    sets = [set(rng.sample(range(40), rng.randint(1, 12))) for _ in range(30)]
+
+    covered = set()
+    search = LazyGreedy([len(items) for items in sets],
+                        lambda index: len(sets[index] - covered))
+
+    expected_covered = set()
+    for _ in range(6):
+        # Plain greedy, ties go to the first set
+        gains = [len(items - expected_covered) for items in sets]
+        expected = gains.index(max(gains))
+        expected_covered |= sets[expected]
+
+        index, gain = search.best()
+        assert (index, gain) == (expected, max(gains))
+        covered |= sets[index]
+        search.invalidate()
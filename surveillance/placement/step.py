@@ -1,8 +1,11 @@
 from abc import ABC, abstractmethod
 from dataclasses import dataclass
-from typing import List
+from typing import List, Optional
+
+import numpy as np
 
 from surveillance.environment import Environment
+from surveillance.graph import CompactGraph
 from surveillance.sensors.base import Sensor
 from surveillance.helpers import Pose
 
@@ -11,11 +14,20 @@ from surveillance.helpers import Pose
 class Placement:
     sensor: Sensor
     pose: Pose
+    route: Optional[np.ndarray] = None  # Waypoints (CMs) for sensors that patrol, shape (n, 2)
+
+    def apply(self) -> None:
+        """
+        Place the sensor at its pose and start it on its route
+        """
+        self.sensor.place(self.pose.x, self.pose.y, self.pose.theta)
+        if self.route is not None:
+            self.sensor.follow(self.route)
 
 
 @dataclass
 class PlacementResult:
-    graph: dict
+    graph: CompactGraph
     placements: List[Placement]
 
 
@@ -24,5 +36,5 @@ class PlacementStep(ABC):
         self.environment = environment
 
     @abstractmethod
-    def place(self, sensors: List[Sensor], graph: dict) -> PlacementResult:
+    def place(self, sensors: List[Sensor], graph: CompactGraph) -> PlacementResult:
         pass
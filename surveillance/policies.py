@@ -0,0 +1,330 @@
+"""
+Pluggable movement policies for adversaries.
+
+Goal directed policies are driven by flow fields: a BFS over a grid of cells
+laid over Environment.map gives the distance from every cell to the goal,
+and every cell stores the heading that leads downhill. An adversary looks up
+the heading of the cell it is in, so every step costs the same no matter how
+many adversaries share the field.
+"""
+from abc import ABC, abstractmethod
+from typing import Dict, List, Optional, Tuple
+
+import cv2 as cv
+import numpy as np
+
+from surveillance.environment import Environment
+from surveillance.sensors.base import Sensor, SensorType
+
+
+# Offsets (row, column) of the neighbors of a cell
+NEIGHBOR_OFFSETS = [(-1, 0), (0, -1), (1, 0), (0, 1), (-1, -1), (1, -1), (-1, 1), (1, 1)]
+
+
+def _mix(values: np.ndarray) -> np.ndarray:
+    """
+    SplitMix64 finalizer, scrambles uint64 values into uniformly distributed
+    bits. Hashing a counter with it gives a random stream that can be
+    indexed directly
+    """
+    with np.errstate(over='ignore'):
+        values = np.asarray(values, dtype=np.uint64) + np.uint64(0x9E3779B97F4A7C15)
+        values = (values ^ (values >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+        values = (values ^ (values >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+        return values ^ (values >> np.uint64(31))
+
+
+class FlowField:
+    """
+    Distance (in cells) from every cell to the closest goal cell, and the
+    heading (in radians) that moves an adversary towards the goal
+    """
+    def __init__(self, environment: Environment, goal: np.ndarray,
+                 free: np.ndarray, cell_px: int):
+        """
+        :param goal: Mask of the goal cells
+        :param free: Mask of the cells adversaries can move through
+        :param cell_px: Size of a cell in pixels
+        """
+        self.environment = environment
+        self.cell_px = cell_px
+        self.distance = self._bfs(goal & free, free)
+        self.heading = self._headings(free)
+
+    def _bfs(self, goal: np.ndarray, free: np.ndarray) -> np.ndarray:
+        """
+        Breadth first search from all goal cells at once, every ring of the
+        search is expanded with vectorized shifts. Diagonal moves are only
+        allowed when they do not cut a corner
+
+        :return: Distance of every cell, -1 if the goal cannot be reached
+        """
+        height, width = free.shape
+        distance = np.full(free.shape, -1, dtype=np.int32)
+        distance[goal] = 0
+
+        free_padded = np.pad(free, 1)
+        frontier = goal.copy()
+        step = 0
+        while frontier.any():
+            step += 1
+            padded = np.pad(frontier, 1)
+            reached = np.zeros_like(frontier)
+            for (d_row, d_col) in NEIGHBOR_OFFSETS:
+                # Cells whose neighbor in this direction is on the frontier
+                from_frontier = padded[1 + d_row:1 + d_row + height, 1 + d_col:1 + d_col + width]
+                if d_row != 0 and d_col != 0:
+                    from_frontier = from_frontier & \
+                        free_padded[1 + d_row:1 + d_row + height, 1:1 + width] & \
+                        free_padded[1:1 + height, 1 + d_col:1 + d_col + width]
+                reached |= from_frontier
+
+            frontier = reached & free & (distance == -1)
+            distance[frontier] = step
+
+        return distance
+
+    def _headings(self, free: np.ndarray) -> np.ndarray:
+        """
+        Heading of every cell, the average direction of its neighbors that
+        are one step closer to the goal. NaN at the goal and where the goal
+        cannot be reached
+        """
+        height, width = free.shape
+        padded = np.pad(self.distance, 1, constant_values=-1)
+        free_padded = np.pad(free, 1)
+
+        sum_x = np.zeros(free.shape)
+        sum_y = np.zeros(free.shape)
+        for (d_row, d_col) in NEIGHBOR_OFFSETS:
+            neighbor = padded[1 + d_row:1 + d_row + height, 1 + d_col:1 + d_col + width]
+            downhill = (neighbor >= 0) & (neighbor == self.distance - 1)
+            if d_row != 0 and d_col != 0:
+                downhill &= free_padded[1 + d_row:1 + d_row + height, 1:1 + width] & \
+                    free_padded[1:1 + height, 1 + d_col:1 + d_col + width]
+            norm = np.hypot(d_row, d_col)
+            sum_x += downhill * d_col / norm
+            sum_y += downhill * d_row / norm
+
+        heading = np.arctan2(sum_y, sum_x)
+        heading[(self.distance <= 0) | ((sum_x == 0) & (sum_y == 0))] = np.nan
+        return heading
+
+    def lookup(self, x: np.ndarray, y: np.ndarray) -> np.ndarray:
+        """
+        Heading at the given points (in CMs), NaN outside of the grid, at the
+        goal and where the goal cannot be reached
+        """
+        scale = self.environment.cm_to_pixel / self.cell_px
+        x = np.asarray(x, dtype=float)
+        y = np.asarray(y, dtype=float)
+        placed = np.isfinite(x) & np.isfinite(y)  # Unplaced adversaries are NaN
+        row = (np.where(placed, y, -1) * scale).astype(np.intp)
+        col = (np.where(placed, x, -1) * scale).astype(np.intp)
+        inside = placed & (row >= 0) & (row < self.heading.shape[0]) & \
+            (col >= 0) & (col < self.heading.shape[1])
+        heading = self.heading[np.where(inside, row, 0), np.where(inside, col, 0)]
+        return np.where(inside, heading, np.nan)
+
+
+class AdversaryPolicy(ABC):
+    """
+    Decides the heading of a group of adversaries every timestep, before
+    they move. Adversaries that would run into an object still turn 90
+    degrees instead of moving
+    """
+    @abstractmethod
+    def steer(self, x: np.ndarray, y: np.ndarray, theta: np.ndarray) -> np.ndarray:
+        """
+        :return: The new heading of every adversary
+        """
+        pass
+
+    def bind(self, trials: np.ndarray, seed: int) -> 'AdversaryPolicy':
+        """
+        The policy for a single run over the given trials (i.e. a batch of
+        the evaluation, one adversary per trial). Policies with random state
+        return a fresh copy whose choices only depend on the seed and the
+        trial ids, so a run is repeatable however the trials are split into
+        batches. Policies without state return themselves
+        """
+        return self
+
+
+class RandomWalk(AdversaryPolicy):
+    """
+    Keep going straight, but every timestep turn to a random heading with
+    the given probability
+    """
+    def __init__(self, turn_probability: float = 0.05, seed: Optional[int] = None):
+        self.turn_probability = turn_probability
+        self.seed = seed
+        self.rng = np.random.default_rng(seed)
+
+        # Once bound, every adversary draws from its own stream: the hash of
+        # its key and a counter of the draws
+        self._keys: Optional[np.ndarray] = None
+        self._draws = 0
+
+    def bind(self, trials: np.ndarray, seed: int) -> 'RandomWalk':
+        walk = RandomWalk(self.turn_probability, self.seed)
+        entropy = [seed] if self.seed is None else [seed, self.seed]
+        key = np.random.SeedSequence(entropy).generate_state(1, dtype=np.uint64)[0]
+        walk._keys = _mix(_mix(np.asarray(trials, dtype=np.uint64)) ^ key)
+        return walk
+
+    def _random(self) -> np.ndarray:
+        """
+        Next uniform value in [0, 1) of every bound adversary
+        """
+        bits = _mix(self._keys ^ _mix(np.uint64(self._draws)))
+        self._draws += 1
+        return (bits >> np.uint64(11)) * 2.0 ** -53
+
+    def steer(self, x: np.ndarray, y: np.ndarray, theta: np.ndarray) -> np.ndarray:
+        if self._keys is None:
+            turn = self.rng.random(len(theta)) < self.turn_probability
+            return np.where(turn, self.rng.uniform(-np.pi, np.pi, len(theta)), theta)
+
+        turn = self._random() < self.turn_probability
+        return np.where(turn, self._random() * 2 * np.pi - np.pi, theta)
+
+
+class FollowFlowField(AdversaryPolicy):
+    """
+    Follow a flow field to its goal, adversaries keep their heading where
+    the field has none (i.e. once they reach the goal)
+    """
+    def __init__(self, field: FlowField):
+        self.field = field
+
+    def steer(self, x: np.ndarray, y: np.ndarray, theta: np.ndarray) -> np.ndarray:
+        heading = self.field.lookup(x, y)
+        return np.where(np.isnan(heading), theta, heading)
+
+
+class PolicyFactory:
+    """
+    Creates adversary policies from their config. Flow fields are shared
+    between policies with the same goal.
+
+    Config entries:
+        type: random_walk, shortest_path or sensor_avoiding
+        turn_probability, seed: For random_walk
+        target: [x, y] in CMs, the goal is the room (or box) holding this point
+        radius: Clearance adversaries need from walls and sensors in CMs
+        cell_size: Size of the flow field cells in CMs
+    """
+    def __init__(self, environment: Environment, sensors: List[Sensor] = None):
+        """
+        :param sensors: Placed sensors that sensor_avoiding policies keep
+                        out of the view of
+        """
+        self.environment = environment
+        self.sensors = sensors or []
+        self.fields: Dict[Tuple, FlowField] = {}
+
+    def construct(self, config) -> AdversaryPolicy:
+        policy_type = config['type']
+        if policy_type == 'random_walk':
+            return RandomWalk(config.get('turn_probability', 0.05), config.get('seed'))
+        if policy_type in ['shortest_path', 'sensor_avoiding']:
+            field = self.flow_field(tuple(config['target']), config.get('radius', 10),
+                                    config.get('cell_size', 20),
+                                    avoid_sensors=policy_type == 'sensor_avoiding')
+            return FollowFlowField(field)
+        raise Exception('Unsupported adversary policy: {}'.format(policy_type))
+
+    def flow_field(self, target: Tuple[float, float], radius: float, cell_size: float,
+                   avoid_sensors: bool = False) -> FlowField:
+        """
+        Flow field towards the room containing the target point. When
+        avoiding sensors, the cells within radius of a ray of a static
+        sensor are blocked. Cells that are cut off from the target by them
+        (and the watched cells themselves) take their heading from the plain
+        field instead, their distance stays -1
+        """
+        key = (target, radius, cell_size, avoid_sensors)
+        if key in self.fields:
+            return self.fields[key]
+
+        environment = self.environment
+        cell_px = max(1, int(round(cell_size * environment.cm_to_pixel)))
+
+        # Cells that an adversary centered in them fits in
+        height, width = environment.map.shape
+        rows = np.minimum(np.arange(0, height, cell_px) + cell_px // 2, height - 1)
+        cols = np.minimum(np.arange(0, width, cell_px) + cell_px // 2, width - 1)
+        clearance = environment.distance_field[np.ix_(rows, cols)]
+        free = clearance > radius * environment.cm_to_pixel
+
+        goal = self._goal_cells(target, free.shape, cell_px)
+
+        field = FlowField(environment, goal, free, cell_px)
+        if avoid_sensors:
+            plain = field
+            unseen = free & ~self._watched_cells(free.shape, cell_px, radius)
+            field = FlowField(environment, goal, unseen, cell_px)
+
+            # Only cut off cells (i.e. every cell when the goal itself is
+            # watched) go through view of the sensors
+            cut_off = (field.distance == -1) & (plain.distance >= 0)
+            field.heading[cut_off] = plain.heading[cut_off]
+
+        self.fields[key] = field
+        return field
+
+    def _goal_cells(self, target: Tuple[float, float], shape: Tuple[int, int],
+                    cell_px: int) -> np.ndarray:
+        """
+        Cells covering the room that contains the target point, or just the
+        box of the target if it is not in a room
+        """
+        environment = self.environment
+        room_map = environment.room_map
+        box_cm = room_map.BOX_SIZE
+        box = int(target[1] // box_cm) * room_map.DIM_X + int(target[0] // box_cm)
+
+        boxes = [box]
+        for data in room_map.reduced_graph.values():
+            if data['type'] == 'room' and box in data['room_nodes']:
+                boxes = list(data['room_nodes'])
+                break
+
+        # Mark every cell whose center lies in one of the boxes
+        box_rows, box_cols = np.divmod(np.asarray(boxes), room_map.DIM_X)
+        in_boxes = np.zeros((room_map.DIM_Y, room_map.DIM_X), dtype=bool)
+        in_boxes[box_rows, box_cols] = True
+
+        box_px = box_cm * environment.cm_to_pixel
+        centers_row = ((np.arange(shape[0]) + 0.5) * cell_px / box_px).astype(np.intp)
+        centers_col = ((np.arange(shape[1]) + 0.5) * cell_px / box_px).astype(np.intp)
+        centers_row = np.minimum(centers_row, room_map.DIM_Y - 1)
+        centers_col = np.minimum(centers_col, room_map.DIM_X - 1)
+        return in_boxes[np.ix_(centers_row, centers_col)]
+
+    def _watched_cells(self, shape: Tuple[int, int], cell_px: int, radius: float) -> np.ndarray:
+        """
+        Cells that are within radius of a ray of a line sensor or camera
+        (robots move, so they are not avoided)
+        """
+        scale = self.environment.cm_to_pixel / cell_px
+        thickness = 2 * int(np.ceil(radius * scale)) + 1
+
+        watched = np.zeros(shape, dtype=np.uint8)
+        for sensor in self.sensors:
+            if sensor.x is None:
+                continue
+            if sensor.sensor_type == SensorType.LINE:
+                end_x, end_y = sensor._get_endpoint()
+                end_x, end_y = [end_x], [end_y]
+            elif sensor.sensor_type == SensorType.CAMERA:
+                end_x, end_y = sensor._get_endpoints()
+            else:
+                continue
+
+            start = (int(sensor.x * scale), int(sensor.y * scale))
+            for (x, y) in zip(end_x, end_y):
+                cv.line(watched, start, (int(x * scale), int(y * scale)), 1, thickness)
+
+        return watched != 0
@@ -0,0 +1,79 @@
+"""
+Testing the adversary policies and their flow fields
+"""
+import numpy as np
+
+from surveillance.adversary import Adversary, AdversaryPool
+from surveillance.environment import Environment
+from surveillance.evaluation import random_adversary_poses
+from surveillance.policies import PolicyFactory, RandomWalk
+from surveillance.sensors.line import LineSensor
+
+
+def _room_target(environment: Environment):
+    """
+    Center of a box in the middle of the largest room
+    """
+    room_map = environment.room_map
+    room = max((data for data in room_map.reduced_graph.values() if data['type'] == 'room'),
+               key=lambda data: len(data['room_nodes']))
+    row, col = divmod(sorted(room['room_nodes'])[len(room['room_nodes']) // 2], room_map.DIM_X)
+    return [(col + 0.5) * room_map.BOX_SIZE, (row + 0.5) * room_map.BOX_SIZE], room
+
+
+def test_shortest_path_reaches_target_room():
+    environment = Environment('assets/big_map.png', 1, 'assets/big_map.pickle')
+    target, room = _room_target(environment)
+    policy = PolicyFactory(environment).construct({'type': 'shortest_path', 'target': target})
+    field = policy.field
+
+    # Start the adversaries in cells that can reach the goal
+    x, y, theta = random_adversary_poses(environment, 300, 10, np.random.default_rng(0))
+    reachable = field.distance[(y / field.cell_px).astype(int), (x / field.cell_px).astype(int)] >= 0
+
+    pool = AdversaryPool([Adversary(1, {'radius': 10, 'speed': 5}, environment)
+                          for _ in range(reachable.sum())])
+    pool.place(x[reachable], y[reachable], theta[reachable])
+    pool.add_policy(policy)
+    for _ in range(500):
+        pool.update()
+
+    room_boxes = set(room['room_nodes'])
+    boxes = (pool.y // environment.room_map.BOX_SIZE).astype(int) * environment.room_map.DIM_X + \
+        (pool.x // environment.room_map.BOX_SIZE).astype(int)
+    in_room = np.array([box in room_boxes for box in boxes])
+    assert in_room.mean() > 0.95
+
+
+def test_sensor_avoiding_field_stays_out_of_view():
+    environment = Environment('assets/big_map.png', 1, 'assets/big_map.pickle')
+    target, _ = _room_target(environment)
+    line = LineSensor(1, environment, {'name': 'Line'})
+    line.place(target[0] - 100, target[1], 0)
+
+    factory = PolicyFactory(environment, [line])
+    plain = factory.flow_field(tuple(target), 10, 20)
+    avoiding = factory.construct({'type': 'sensor_avoiding', 'target': target}).field
+    assert avoiding is not plain
+    assert factory.flow_field(tuple(target), 10, 20, avoid_sensors=True) is avoiding
+
+    # No path runs through the cells the line crosses, and no path gets shorter
+    watched = factory._watched_cells(plain.distance.shape, plain.cell_px, 10)
+    assert watched.any()
+    assert (avoiding.distance[watched] == -1).all()
+    reachable = avoiding.distance >= 0
+    assert (avoiding.distance[reachable] >= plain.distance[reachable]).all()
+
+    # Cells cut off from the target by the line follow the plain field
+    cut_off = ~reachable & (plain.distance >= 0)
+    assert cut_off.any()
+    assert np.array_equal(avoiding.heading[cut_off], plain.heading[cut_off], equal_nan=True)
+
+
+def test_random_walk_is_seeded():
+    theta = np.zeros(1000)
+    first = RandomWalk(0.5, seed=3).steer(theta, theta, theta)
+    second = RandomWalk(0.5, seed=3).steer(theta, theta, theta)
+
+    assert np.array_equal(first, second)
+    assert 0.4 < np.mean(first != 0) < 0.6
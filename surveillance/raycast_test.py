@@ -0,0 +1,65 @@
+"""
+Testing the vectorized ray casting
+"""
+import numpy as np
+
+from surveillance.environment import Environment
+from surveillance.raycast import cast_ray, cast_rays, segments_hit_circles
+
+
+def _make_environment() -> Environment:
+    return Environment('assets/small_map.png', 1, 'assets/small_map.pickle')
+
+
+def _step_ray(environment: Environment, x: float, y: float, theta: float,
+              max_range: float):
+    """
+    Reference implementation, walk the ray in small increments
+    """
+    distance = 0
+    while distance < max_range:
+        distance = min(distance + 0.05, max_range)
+        next_x = x + distance * np.cos(theta)
+        next_y = y + distance * np.sin(theta)
+        if not environment.in_environment(next_x, next_y) or \
+                environment.in_object(next_x, next_y):
+            break
+    return distance
+
+
+def test_matches_stepped_rays():
+    environment = _make_environment()
+    thetas = np.linspace(-np.pi, np.pi, 37)
+
+    for (x, y, max_range) in [(75, 75, np.inf), (300, 125, 100),
+                              (525, 325, 40)]:
+        end_x, end_y = cast_rays(environment, x, y, thetas, max_range)
+        lengths = np.hypot(end_x - x, end_y - y)
+        for (theta, length) in zip(thetas, lengths):
+            expected = _step_ray(environment, x, y, theta, max_range)
+            assert abs(length - expected) <= 1.5
+
+
+def test_single_ray():
+    environment = _make_environment()
+
+    # The map is surrounded by a 50 pixel thick wall
+    end_x, end_y = cast_ray(environment, 75, 75, np.pi)
+    assert 49 <= end_x <= 50
+    assert end_y == 75
+
+    end_x, end_y = cast_ray(environment, 75, 75, 0, max_range=20)
+    assert np.isclose(end_x, 95)
+
+
+def test_segments_hit_circles():
+    # Two horizontal segments against circles before, on, past the end and
+    # just off of the first segment
+    hits = segments_hit_circles([0, 0], [0, 10], [100, 100], [0, 10],
+                                [-5, 50, 103, 50], [0, 0.4, 0, 3], [2, 0.5, 4, 2])
+    assert hits.tolist() == [[False, True, True, False],
+                             [False, False, False, False]]
+
+    # A zero length segment only hits circles around its start point
+    hits = segments_hit_circles(5, 5, 5, 5, [5, 8], [6, 5], [1, 1])
+    assert hits.tolist() == [[True, False]]
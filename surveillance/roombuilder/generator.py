@@ -0,0 +1,268 @@
+"""
+Procedural floor plans for scaling studies.
+
+A floor plan is a RoomMap box matrix (0 is solid, 1 is empty) made of:
+
+1. Main hallways that run the whole length or width of the floor
+2. Rectangular rooms, placed at random where they do not touch a hallway
+   or another room
+3. Corridors between the rooms: a spanning tree over nearby rooms keeps the
+   floor connected and extra corridors add loops
+4. Finally any part of the floor still cut off is joined to the rest
+
+Every random choice comes from a single seeded generator, so the same
+arguments always give the same floor plan.
+
+Generate a map and its graph with:
+    python -m surveillance.roombuilder.generator --width 200 --height 150 --rooms 150 out.png out.pickle
+"""
+import argparse
+from typing import List, Optional, Tuple
+
+import cv2 as cv
+import numpy as np
+
+from surveillance.components import UnionFind
+from surveillance.roombuilder.roombuilder import RoomMap
+
+
+# Size (in boxes) of the buckets rooms are sorted into when looking for nearby
+# rooms, as a multiple of the average spacing between rooms
+BUCKET_SPACING = 1.5
+
+
+def _main_hallways(size: int, spacing: int, density: float,
+                   rng: np.random.Generator) -> np.ndarray:
+    """
+    Pick the rows (or columns) of the main hallways, a density of 1 puts a
+    hallway every spacing boxes
+    """
+    candidates = np.arange(spacing // 2 + 1, size - 1, spacing)
+    count = int(round(density * len(candidates)))
+    return np.sort(rng.choice(candidates, count, replace=False))
+
+
+def _place_rooms(reserved: np.ndarray, num_rooms: int, room_size: Tuple[int, int],
+                 rng: np.random.Generator) -> List[Tuple[int, int, int, int]]:
+    """
+    Place up to num_rooms rooms, each separated from the reserved boxes (and
+    the other rooms) by at least one solid box
+
+    :return: The rooms as (top, left, height, width)
+    """
+    height, width = reserved.shape
+    rooms = []
+    for _ in range(50 * num_rooms):
+        if len(rooms) == num_rooms:
+            break
+
+        room_height, room_width = rng.integers(room_size[0], room_size[1] + 1, 2)
+        if room_height > height - 2 or room_width > width - 2:
+            continue
+        top = int(rng.integers(1, height - room_height))
+        left = int(rng.integers(1, width - room_width))
+
+        if reserved[top - 1:top + room_height + 1, left - 1:left + room_width + 1].any():
+            continue
+        reserved[top:top + room_height, left:left + room_width] = True
+        rooms.append((top, left, int(room_height), int(room_width)))
+
+    return rooms
+
+
+def _carve_corridor(matrix: np.ndarray, start: Tuple[int, int], end: Tuple[int, int],
+                    horizontal_first: bool) -> None:
+    """
+    Empty an L shaped corridor, one box wide, between two boxes (row, col)
+    """
+    (row_0, col_0), (row_1, col_1) = start, end
+    corner = (row_0, col_1) if horizontal_first else (row_1, col_0)
+    for ((row_a, col_a), (row_b, col_b)) in [(start, corner), (corner, end)]:
+        matrix[min(row_a, row_b):max(row_a, row_b) + 1,
+               min(col_a, col_b):max(col_a, col_b) + 1] = 1
+
+
+def _connect_rooms(matrix: np.ndarray, centers: np.ndarray, loops: float,
+                   rng: np.random.Generator) -> None:
+    """
+    Carve corridors along a minimum spanning tree of nearby rooms, then add
+    about loops extra corridors per room
+    """
+    num_rooms = len(centers)
+    if num_rooms < 2:
+        return
+
+    # Candidate corridors go to the rooms in the same or a neighboring bucket
+    spacing = np.sqrt(np.prod(matrix.shape) / num_rooms) * BUCKET_SPACING
+    buckets = {}
+    for (room, bucket) in enumerate(map(tuple, (centers // spacing).astype(int))):
+        buckets.setdefault(bucket, []).append(room)
+
+    nearby = []
+    for ((row, col), rooms) in buckets.items():
+        for (d_row, d_col) in [(0, 0), (0, 1), (1, -1), (1, 0), (1, 1)]:
+            for other in buckets.get((row + d_row, col + d_col), []):
+                nearby.extend((room, other) for room in rooms if room < other or (d_row, d_col) != (0, 0))
+    nearby = np.unique(np.sort(np.array(nearby, dtype=int).reshape(-1, 2), axis=1), axis=0)
+
+    # Neighbors along x are candidates too, so the tree spans every room even
+    # where the buckets are sparse
+    order = np.argsort(centers[:, 1], kind='stable')
+    chain = np.sort(np.column_stack([order[:-1], order[1:]]), axis=1)
+
+    pairs = np.concatenate([nearby, chain])
+    lengths = np.abs(centers[pairs[:, 0]] - centers[pairs[:, 1]]).sum(axis=1)
+
+    # Kruskal's algorithm, the shortest candidates first
+    union_find = UnionFind(num_rooms)
+    in_tree = np.zeros(len(pairs), dtype=bool)
+    for index in np.argsort(lengths, kind='stable'):
+        in_tree[index] = union_find.union(*pairs[index])
+
+    # Loops only join nearby rooms
+    extra = np.flatnonzero(~in_tree[:len(nearby)])
+    num_loops = min(int(round(loops * num_rooms)), len(extra))
+    corridors = np.concatenate([np.flatnonzero(in_tree),
+                                rng.choice(extra, num_loops, replace=False)])
+
+    horizontal_first = rng.random(len(corridors)) < 0.5
+    for (index, horizontal) in zip(corridors, horizontal_first):
+        a, b = pairs[index]
+        _carve_corridor(matrix, tuple(centers[a]), tuple(centers[b]), horizontal)
+
+
+def _join_components(matrix: np.ndarray, rng: np.random.Generator) -> None:
+    """
+    Carve a corridor from every part of the floor that cannot be reached
+    from the largest part to the closest box of the largest part
+    """
+    num_labels, labels = cv.connectedComponents(matrix, connectivity=4)
+    if num_labels <= 2:
+        return
+
+    sizes = np.bincount(labels.ravel())
+    sizes[0] = 0  # Solid boxes
+    main = np.argmax(sizes)
+    main_rows, main_cols = np.nonzero(labels == main)
+
+    # First box (in raster order) of every label
+    _, first = np.unique(labels.ravel(), return_index=True)
+    for label in range(1, num_labels):
+        if label == main:
+            continue
+        row, col = np.divmod(first[label], matrix.shape[1])
+        closest = np.argmin(np.abs(main_rows - row) + np.abs(main_cols - col))
+        _carve_corridor(matrix, (int(row), int(col)),
+                        (int(main_rows[closest]), int(main_cols[closest])), rng.random() < 0.5)
+
+
+def generate_floor_plan(width: int, height: int, num_rooms: int,
+                        room_size: Tuple[int, int] = (3, 8),
+                        hallway_density: float = 0.3, loops: float = 0.1,
+                        seed: Optional[int] = None) -> np.ndarray:
+    """
+    Generate a connected floor plan with a solid outer wall
+
+    :param width: Number of boxes along x
+    :param height: Number of boxes along y
+    :param num_rooms: Number of rooms to place, fewer are placed when they do
+                      not fit
+    :param room_size: Smallest and largest side of a room in boxes
+    :param hallway_density: Fraction (0 to 1) of the main hallways that are
+                            built, 1 puts a hallway between every band of
+                            rooms
+    :param loops: Number of extra corridors per room on top of the ones that
+                  connect the rooms, each one adds a loop
+    :param seed: Seed for every random choice
+    :return: The box matrix, shape (height, width)
+    """
+    if width < 3 or height < 3:
+        raise Exception('A floor plan needs at least 3 x 3 boxes, got {} x {}'.format(width, height))
+    if room_size[0] < 1 or room_size[0] > room_size[1]:
+        raise Exception('Invalid room size range: {}'.format(room_size))
+
+    rng = np.random.default_rng(seed)
+    matrix = np.zeros((height, width), dtype=np.uint8)
+    reserved = np.zeros((height, width), dtype=bool)
+
+    # 1. Main hallways, along with the wall on each side of them
+    spacing = room_size[1] + 3
+    for row in _main_hallways(height, spacing, hallway_density, rng):
+        matrix[row, 1:-1] = 1
+        reserved[row - 1:row + 2] = True
+    for col in _main_hallways(width, spacing, hallway_density, rng):
+        matrix[1:-1, col] = 1
+        reserved[:, col - 1:col + 2] = True
+
+    # 2. Rooms
+    rooms = _place_rooms(reserved, num_rooms, room_size, rng)
+    for (top, left, room_height, room_width) in rooms:
+        matrix[top:top + room_height, left:left + room_width] = 1
+
+    if not matrix.any():
+        raise Exception('No rooms or hallways fit in {} x {} boxes'.format(width, height))
+
+    # 3. Corridors between the rooms
+    centers = np.array([(top + room_height // 2, left + room_width // 2)
+                        for (top, left, room_height, room_width) in rooms], dtype=int).reshape(-1, 2)
+    _connect_rooms(matrix, centers, loops, rng)
+
+    # 4. Everything connected
+    _join_components(matrix, rng)
+
+    return matrix
+
+
+def save_floor_plan(box_matrix: np.ndarray, image_file: str, graph_file: Optional[str] = None,
+                    box_px: Optional[int] = None, memmap_file: Optional[str] = None) -> RoomMap:
+    """
+    Render a floor plan to a PNG and optionally pickle its RoomMap, so it can
+    be loaded as an Environment
+
+    :param box_px: Size of a box in the image in pixels, by default
+                   RoomMap.BOX_SIZE. The environment then needs a
+                   pixel_to_cm of RoomMap.BOX_SIZE / box_px
+    :param memmap_file: Render the image into this memory mapped .npy file
+                        instead of memory (see RoomMap.make_map_image)
+    """
+    room_map = RoomMap(box_matrix)
+    room_map.make_map_image(image_file, box_px, memmap_file)
+    if graph_file is not None:
+        room_map.save(graph_file)
+    return room_map
+
+
+def main():
+    parser = argparse.ArgumentParser(description='''Generate a random floor
+                                     plan as a map image and its graph''')
+    parser.add_argument('image', help='Map image (PNG) to write')
+    parser.add_argument('graph', nargs='?', help='Pickled RoomMap to write')
+    parser.add_argument('--width', type=int, default=100, help='Boxes along x')
+    parser.add_argument('--height', type=int, default=100, help='Boxes along y')
+    parser.add_argument('--rooms', type=int, default=50, help='Number of rooms')
+    parser.add_argument('--room-size', type=int, nargs=2, default=[3, 8],
+                        help='Smallest and largest side of a room in boxes')
+    parser.add_argument('--hallway-density', type=float, default=0.3,
+                        help='Fraction of the main hallways that are built')
+    parser.add_argument('--loops', type=float, default=0.1,
+                        help='Extra corridors per room')
+    parser.add_argument('--seed', type=int, help='Seed of the floor plan')
+    parser.add_argument('--box-px', type=int, help='''Size of a box in the
+                        image in pixels''')
+    parser.add_argument('--memmap', help='''Render the image into this memory
+                        mapped .npy file, for floors too large to render in
+                        memory''')
+    args = parser.parse_args()
+
+    box_matrix = generate_floor_plan(args.width, args.height, args.rooms,
+                                     tuple(args.room_size), args.hallway_density,
+                                     args.loops, args.seed)
+    room_map = save_floor_plan(box_matrix, args.image, args.graph, args.box_px, args.memmap)
+
+    box_px = args.box_px or room_map.BOX_SIZE
+    print('Reduced graph has {} nodes, load the map with pixel_to_cm: {}'.format(
+        len(room_map.reduced_graph), room_map.BOX_SIZE / box_px))
+
+
+if __name__ == '__main__':
+    main()
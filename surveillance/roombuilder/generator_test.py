@@ -0,0 +1,41 @@
+"""
+Testing the floor plan generator
+"""
+import cv2 as cv
+import numpy as np
+
+from surveillance.environment import Environment
+from surveillance.roombuilder.generator import generate_floor_plan, save_floor_plan
+
+
+def test_floor_plan_is_deterministic():
+    first = generate_floor_plan(120, 80, 60, seed=7)
+    second = generate_floor_plan(120, 80, 60, seed=7)
+    other = generate_floor_plan(120, 80, 60, seed=8)
+
+    assert first.shape == (80, 120)
+    assert np.array_equal(first, second)
+    assert not np.array_equal(first, other)
+
+
+def test_floor_plan_is_connected_and_closed():
+    for (hallway_density, loops) in [(0, 0), (0.5, 0.2), (1, 1)]:
+        matrix = generate_floor_plan(150, 100, 100, hallway_density=hallway_density,
+                                     loops=loops, seed=1)
+
+        num_labels, _ = cv.connectedComponents(matrix, connectivity=4)
+        assert num_labels == 2
+        assert not matrix[[0, -1]].any() and not matrix[:, [0, -1]].any()
+
+
+def test_floor_plan_loads_as_environment(tmp_path):
+    matrix = generate_floor_plan(60, 40, 20, seed=3)
+    room_map = save_floor_plan(matrix, str(tmp_path / 'map.png'), str(tmp_path / 'map.pickle'), 10)
+
+    rooms = [node for (node, data) in room_map.reduced_graph.items() if data['type'] == 'room']
+    assert len(rooms) >= 10
+
+    # Boxes are 10 pixels, so a pixel is 5 CMs
+    environment = Environment(str(tmp_path / 'map.png'), 5, str(tmp_path / 'map.pickle'))
+    assert environment.map.shape == (400, 600)
+    assert np.array_equal(environment.map[5::10, 5::10] != 0, matrix != 0)
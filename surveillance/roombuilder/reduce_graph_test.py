@@ -0,0 +1,121 @@
+"""
+Testing the graph reduction against the reduced graphs stored with the
+bundled maps
+"""
+import heapq
+
+import cv2 as cv
+import numpy as np
+import pytest
+
+from surveillance.roombuilder.roombuilder import RoomMap
+
+
+def _canonical(graph: dict):
+    """
+    Describe a reduced graph without its node ids, which depend on how the
+    clusters were found
+    """
+    def key(node):
+        data = graph[node]
+        return (data['type'], tuple(round(float(value), 6) for value in data['pos']),
+                int(data['area']))
+
+    nodes = {key(node): (bool(data['is_dead_end']),
+                         sorted(int(room_node) for room_node in data.get('room_nodes', [])),
+                         sorted(int(corner) for corner in data.get('corners', [])))
+             for (node, data) in graph.items()}
+    edges = {(key(node), key(neighbor)) for node in graph for neighbor in graph[node]['neighbors']}
+    return nodes, edges
+
+
+@pytest.mark.parametrize('name', ['small_map', 'big_map', 'very_large_map'])
+def test_reduce_graph_matches_bundled_maps(name):
+    stored = RoomMap.load('assets/{}.pickle'.format(name))
+    rebuilt = RoomMap(stored.map)
+
+    assert rebuilt.graph == stored.graph
+    assert _canonical(rebuilt.reduced_graph) == _canonical(stored.reduced_graph)
+
+    # Clusters are represented by one of their own nodes
+    for (node, data) in rebuilt.reduced_graph.items():
+        if data['type'] == 'room':
+            assert node in data['room_nodes']
+
+
+def test_identify_node_uses_cached_types():
+    stored = RoomMap.load('assets/small_map.pickle')
+    room_map = RoomMap(stored.map)
+
+    for (node, data) in stored.graph.items():
+        assert room_map._identify_node(node) == data['raw_type']
+        assert room_map._is_hallway_node(node) == (data['raw_type'] == 'hallway')
+
+    # Solid boxes are not part of the graph
+    solid = next(node for node in range(room_map.DIM_X * room_map.DIM_Y)
+                 if node not in stored.graph)
+    with pytest.raises(KeyError):
+        room_map._identify_node(solid)
+
+
+def _dijkstra(graph: dict, source) -> dict:
+    lengths = {source: 0.0}
+    queue = [(0.0, source)]
+    while queue:
+        length, node = heapq.heappop(queue)
+        if length > lengths[node]:
+            continue
+        for neighbor in graph[node]['neighbors']:
+            step = np.hypot(graph[node]['pos'][0] - graph[neighbor]['pos'][0],
+                            graph[node]['pos'][1] - graph[neighbor]['pos'][1])
+            if length + step < lengths.get(neighbor, np.inf):
+                lengths[neighbor] = length + step
+                heapq.heappush(queue, (length + step, neighbor))
+    return lengths
+
+
+def test_path_lengths_match_dijkstra(tmp_path):
+    room_map = RoomMap.load('assets/very_large_map.pickle')
+
+    for source in list(room_map.reduced_graph)[::7]:
+        expected = _dijkstra(room_map.reduced_graph, source)
+        for target in room_map.reduced_graph:
+            assert room_map.path_length(source, target) == \
+                pytest.approx(expected.get(target, np.inf), rel=1e-5)
+
+    # The table is saved with the map
+    room_map.save(str(tmp_path / 'map.pickle'))
+    loaded = RoomMap.load(str(tmp_path / 'map.pickle'))
+    assert loaded._path_lengths is not None
+    assert np.array_equal(loaded.path_lengths, room_map.path_lengths)
+
+
+def test_large_graphs_run_dijkstra_from_the_sources():
+    room_map = RoomMap.load('assets/very_large_map.pickle')
+    sources = list(room_map.reduced_graph)[::5]
+    expected = room_map.path_lengths[[room_map.reduced_index[source] for source in sources]]
+
+    # Too large for the table
+    room_map._path_lengths = None
+    room_map.MAX_STORED_PATHS = 10
+    assert np.allclose(room_map.path_lengths_from(sources), expected, rtol=1e-5)
+    assert room_map._path_lengths is None
+    with pytest.raises(Exception):
+        room_map.path_lengths
+
+
+@pytest.mark.parametrize('name', ['small_map', 'big_map', 'very_large_map'])
+def test_map_image_matches_bundled_image(name, tmp_path):
+    room_map = RoomMap.load('assets/{}.pickle'.format(name))
+
+    # The bundled images were made by stacking the boxes one at a time
+    room_map.make_map_image(str(tmp_path / 'map.png'))
+    assert np.array_equal(cv.imread(str(tmp_path / 'map.png'), cv.IMREAD_GRAYSCALE),
+                          cv.imread('assets/{}.png'.format(name), cv.IMREAD_GRAYSCALE))
+
+    # Rendering in bands into a memory mapped file gives the same image
+    room_map.RENDER_BAND_BYTES = 1000
+    room_map.make_map_image(str(tmp_path / 'small.png'), 7, str(tmp_path / 'map.npy'))
+    expected = np.kron(np.asarray(room_map.map) != 0, np.ones((7, 7), dtype=np.uint8)) * 255
+    assert np.array_equal(np.load(str(tmp_path / 'map.npy'), mmap_mode='r'), expected)
+    assert np.array_equal(cv.imread(str(tmp_path / 'small.png'), cv.IMREAD_GRAYSCALE), expected)
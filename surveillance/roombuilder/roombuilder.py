@@ -4,10 +4,25 @@ Used for making room maps and graphs
 import cv2 as cv
 import matplotlib.pyplot as plt
 import numpy as np
-import copy
-from typing import List
+from collections import deque
+import heapq
+from typing import List, Tuple
 import pickle
 
+from surveillance.components import UnionFind
+from surveillance.instrumentation import instrument
+
+
+# Offsets (row, column) of the neighbors of a box, in the order the graph
+# lists them. Straight neighbors come first, then diagonal neighbors
+STRAIGHT_OFFSETS = [(-1, 0), (0, -1), (1, 0), (0, 1)]
+DIAGONAL_OFFSETS = [(-1, -1), (1, -1), (-1, 1), (1, 1)]
+
+# Raw node types, the raw type of a box is stored as its index in this tuple
+# (-1 for solid boxes)
+NODE_TYPES = ('default', 'room', 'corner_ccv', 'corner_drw', 'corner_cvx', 'dead_end',
+              'L_junction', 'hallway', 'T_junction', 'X_junction')
+
 
 class RenameUnpickler(pickle.Unpickler):
     def find_class(self, module, name):
@@ -19,8 +34,41 @@ class RenameUnpickler(pickle.Unpickler):
 
 
 class RoomMap:
+    # Largest reduced graph that the all pairs shortest path table is built
+    # for (and stored with when saving). The table grows with the square of
+    # the nodes and takes the cube of the nodes to compute, larger graphs run
+    # Dijkstra from the nodes they need instead
+    MAX_STORED_PATHS = 1000
+
+    # Most bytes of image rendered at once, larger images are rendered in bands
+    RENDER_BAND_BYTES = 1 << 26
+
     def __init__(self, box_matrix):
+        self._set_map(box_matrix)
+        self._build_grid()
+        self.reduced_graph = self.reduce_graph()
 
+    @classmethod
+    def from_arrays(cls, box_matrix, neighbor_mask: np.ndarray, raw_types: np.ndarray,
+                    reduced_graph: dict, path_lengths: np.ndarray = None) -> 'RoomMap':
+        """
+        Rebuild a RoomMap from its precomputed grid arrays and reduced graph
+        (i.e. loaded from a map bundle) without classifying or reducing the
+        map again
+        """
+        room_map = cls.__new__(cls)
+        room_map._set_map(box_matrix)
+        room_map.neighbor_mask = neighbor_mask
+        room_map.raw_types = raw_types
+        room_map.reduced_graph = reduced_graph
+        room_map._path_lengths = path_lengths
+        return room_map
+
+    def _set_map(self, box_matrix) -> None:
+        """
+        Attributes shared by every way of making a RoomMap, the ones derived
+        from the map are computed when needed
+        """
         # Box grid: 0 is solid, 1 is empty, 2 is marker (considered empty)
         self.map = box_matrix
 
@@ -33,32 +81,197 @@ class RoomMap:
         self.DIM_X = len(box_matrix[0])
         self.DIM_Y = len(box_matrix)
 
-        self.graph = self.make_graph()
-        self.graph = self._identify_graph()
-        self.reduced_graph = self.reduce_graph()
+        self._graph = None
+        self._path_lengths = None
+        self._reduced_index = None
+
+    def __getstate__(self) -> dict:
+        # The dict graph is rebuilt from the grid arrays when needed
+        state = self.__dict__.copy()
+        state['_graph'] = None
+        state['_reduced_index'] = None
+        return state
+
+    def __setstate__(self, state: dict) -> None:
+        self.__dict__.update(state)
+
+        # Maps saved before the shortest paths were stored compute them when needed
+        self.__dict__.setdefault('_path_lengths', None)
+        self.__dict__.setdefault('_reduced_index', None)
+
+        # Maps saved before the grid arrays existed only store the dict graph
+        if 'neighbor_mask' not in state:
+            self._graph = self.__dict__.pop('graph')
+            self._build_grid()
+
+    @property
+    def graph(self) -> dict:
+        """
+        The unreduced graph of the map as a dict of nodes, built from the grid
+        arrays the first time it is needed
+        """
+        if self._graph is None:
+            self._graph = self.make_graph()
+        return self._graph
 
-    def make_map_image(self, filename: str) -> None:
+    @property
+    def reduced_index(self) -> dict:
+        """
+        Row of every node of the reduced graph in path_lengths (the order of
+        the nodes in reduced_graph)
+        """
+        if self._reduced_index is None:
+            self._reduced_index = {node: index for (index, node) in enumerate(self.reduced_graph)}
+        return self._reduced_index
+
+    @property
+    def path_lengths(self) -> np.ndarray:
+        """
+        Length (in boxes) of the shortest path between every pair of nodes of
+        the reduced graph, moving in straight lines between the positions of
+        neighboring nodes. Rows and columns follow reduced_index, unreachable
+        pairs are inf. Computed the first time it is needed and saved with
+        the map, only for graphs of up to MAX_STORED_PATHS nodes (see
+        path_lengths_from)
+        """
+        if self._path_lengths is None:
+            if len(self.reduced_graph) > self.MAX_STORED_PATHS:
+                raise Exception('Reduced graph of {} nodes is too large for the all pairs table, '
+                                'use path_lengths_from'.format(len(self.reduced_graph)))
+            self._path_lengths = self._all_pairs_path_lengths()
+        return self._path_lengths
+
+    def path_length(self, a: int, b: int) -> float:
+        """
+        Length (in boxes) of the shortest path between two nodes of the
+        reduced graph
+        """
+        return float(self.path_lengths_from([a])[0, self.reduced_index[b]])
+
+    def path_lengths_from(self, sources: List[int]) -> np.ndarray:
+        """
+        Length (in boxes) of the shortest path from each of the given nodes
+        of the reduced graph to every node, one row per source with columns
+        following reduced_index. Rows of path_lengths when the table is (or
+        can cheaply be) built, otherwise Dijkstra from every source
+        """
+        index = self.reduced_index
+        rows = [index[source] for source in sources]
+        if self._path_lengths is not None or len(index) <= self.MAX_STORED_PATHS:
+            return self.path_lengths[rows].astype(float)
+
+        edges = self._reduced_edges()
+        lengths = np.full((len(rows), len(index)), np.inf)
+        for (i, source) in enumerate(rows):
+            best = [np.inf] * len(index)
+            best[source] = 0.0
+            queue = [(0.0, source)]
+            while len(queue) != 0:
+                distance, row = heapq.heappop(queue)
+                if distance > best[row]:
+                    continue
+                for (neighbor, length) in edges[row]:
+                    candidate = distance + length
+                    if candidate < best[neighbor]:
+                        best[neighbor] = candidate
+                        heapq.heappush(queue, (candidate, neighbor))
+            lengths[i] = best
+
+        return lengths
+
+    def _reduced_edges(self) -> List[List[Tuple[int, float]]]:
+        """
+        Neighbors of every node of the reduced graph as (row, length) by row
+        of reduced_index, both directions of every edge are listed
+        """
+        index = self.reduced_index
+        pos = np.array([self.reduced_graph[node]['pos'] for node in index], dtype=float).reshape(-1, 2)
+
+        edges = [{} for _ in range(len(index))]
+        for (node, row) in index.items():
+            for neighbor in self.reduced_graph[node]['neighbors']:
+                if neighbor in index and neighbor != node:
+                    length = float(np.hypot(*(pos[row] - pos[index[neighbor]])))
+                    edges[row][index[neighbor]] = length
+                    edges[index[neighbor]][row] = length
+        return [list(neighbors.items()) for neighbors in edges]
+
+    def _all_pairs_path_lengths(self) -> np.ndarray:
+        """
+        Floyd-Warshall over the reduced graph, one vectorized relaxation of
+        the whole matrix per intermediate node
+        """
+        lengths = np.full((len(self.reduced_index), len(self.reduced_index)), np.inf)
+        np.fill_diagonal(lengths, 0)
+        for (row, neighbors) in enumerate(self._reduced_edges()):
+            for (neighbor, length) in neighbors:
+                lengths[row, neighbor] = length
+
+        for k in range(len(lengths)):
+            np.minimum(lengths, lengths[:, k, None] + lengths[None, k, :], out=lengths)
+
+        return lengths.astype(np.float32)
+
+    def render(self, box_size: int = None, out: np.ndarray = None) -> np.ndarray:
+        """
+        Render the map as a grayscale image (0 is solid, 255 is empty). The
+        gray level of every box comes from a lookup table indexed with the
+        box matrix, then each box is expanded into a block of pixels.
+
+        :param box_size: Size of a box in pixels, by default BOX_SIZE
+        :param out: Array to render into (i.e. a np.memmap for very large
+                    maps), shape (DIM_Y * box_size, DIM_X * box_size). It is
+                    filled one band of box rows at a time, so the whole image
+                    is never held in memory
+        :return: The image (out if given)
+        """
+        box_size = box_size or self.BOX_SIZE
+        shape = (self.DIM_Y * box_size, self.DIM_X * box_size)
+        if out is None:
+            out = np.empty(shape, dtype=np.uint8)
+        elif out.shape != shape:
+            raise Exception('Cannot render a {} image into an array of shape {}'.format(shape, out.shape))
+
+        # Gray level of every box type, 0-1 grayscale converted to 0-255
+        levels = np.round(np.array([box[0, 0] for box in self.BOXES]) * 255).astype(np.uint8)
+        box_matrix = np.asarray(self.map)
+
+        # Box rows per band
+        band = max(1, self.RENDER_BAND_BYTES // (box_size * shape[1]))
+        for top in range(0, self.DIM_Y, band):
+            rows = levels[box_matrix[top:top + band]]
+            out[top * box_size:(top + band) * box_size] = \
+                np.repeat(np.repeat(rows, box_size, axis=0), box_size, axis=1)
+
+        return out
+
+    def make_map_image(self, filename: str, box_size: int = None, memmap_file: str = None) -> None:
         """
         Makes an image visualization of the map
         Filename must contain '.png'
+
+        :param box_size: Size of a box in pixels, by default BOX_SIZE
+        :param memmap_file: Render into a memory mapped .npy file at this
+                            path instead of memory, the PNG is encoded from it
         """
-        # Build image from map
-        img = np.array([]).reshape((0, self.DIM_X * self.BOX_SIZE))
-        # Make pixel matrix
-        for x in range(len(self.map)):
-            row = np.array([]).reshape((self.BOX_SIZE, 0))
-            for y in range(len(self.map[x])):
-                row = np.hstack((row, self.BOXES[self.map[x][y]]))
-            img = np.vstack((img, row))
+        out = None
+        if memmap_file is not None:
+            box_size = box_size or self.BOX_SIZE
+            out = np.lib.format.open_memmap(memmap_file, mode='w+', dtype=np.uint8,
+                                            shape=(self.DIM_Y * box_size, self.DIM_X * box_size))
 
         # Create image PNG file
-        img = img * 255  # Convert 0-1 grayscale to 0-255 grayscale
-        cv.imwrite(filename, img)
+        cv.imwrite(filename, self.render(box_size, out))
+        if out is not None:
+            out.flush()
 
     def save(self, filename: str) -> None:
         """
         Serialize this object to a file
         """
+        # Store the shortest paths with the map
+        if self._path_lengths is None and len(self.reduced_graph) <= self.MAX_STORED_PATHS:
+            self._path_lengths = self._all_pairs_path_lengths()
         with open(filename, 'wb') as f:
             pickle.dump(self, f)
 
@@ -69,106 +282,103 @@ class RoomMap:
         with open(filename, 'rb') as f:
             return RenameUnpickler(f).load()
 
-    def _identify_graph(self):
+    def _build_grid(self) -> None:
         """
-        Runs _identify_node() on all nodes of the unreduced graph and stores the
-        result in the 'type' field of each node
+        Compute the grid graph of the map as arrays over the box matrix.
+
+        neighbor_mask has one (DIM_Y, DIM_X) layer per neighbor offset
+        (STRAIGHT_OFFSETS followed by DIAGONAL_OFFSETS) that is True where a
+        box connects to that neighbor. raw_types holds the index in
+        NODE_TYPES of the raw type of every box, -1 for solid boxes. Node ids
+        are the flattened box index (row * DIM_X + column).
         """
+        # Pad with solid boxes so every box has all 8 neighbors
+        free = np.pad(np.asarray(self.map) != 0, 1)
+        center = free[1:-1, 1:-1]
 
-        G = self.graph
+        def shifted(d_row: int, d_col: int) -> np.ndarray:
+            return free[1 + d_row:1 + d_row + self.DIM_Y, 1 + d_col:1 + d_col + self.DIM_X]
 
-        for node in G:
-            G[node]['raw_type'] = self._identify_node(node)
+        layers = [center & shifted(d_row, d_col) for (d_row, d_col) in STRAIGHT_OFFSETS]
 
-        return G
+        # Diagonals only connect if they do not intersect a corner
+        for (d_row, d_col) in DIAGONAL_OFFSETS:
+            layers.append(center & shifted(d_row, d_col) & shifted(d_row, 0) & shifted(0, d_col))
 
-    def make_graph(self) -> dict:
+        self.neighbor_mask = np.stack(layers)
+        self.raw_types = self._identify_grid()
+
+    def _identify_grid(self) -> np.ndarray:
         """
-        Returns a simple graph representation of the map
+        Classify every box of the grid at once. Returns the index in
+        NODE_TYPES of every box. The result is cached in raw_types and every
+        node type query is answered from it
         """
+        num_str = self.neighbor_mask[:4].sum(axis=0)
+        num_diag = self.neighbor_mask[4:].sum(axis=0)
+        up, left, down, right = self.neighbor_mask[:4]
 
-        graph = {}
+        # Nodes with two straight neighbors are aligned when the neighbors
+        # are on opposite sides
+        aligned = (num_str != 2) | (up & down) | (left & right)
 
-        nodes = np.reshape(list(range(self.DIM_X * self.DIM_Y)), (self.DIM_Y, self.DIM_X))
-        for x in range(len(self.map)):
-            for y in range(len(self.map[x])):
-                if self.map[x][y] != 0:
-                    graph[nodes[x][y]] = {
-                        'pos': tuple([y, x]),
-                        'neighbors': [],  # Contains all neighbors of the node
-                        'raw_type': 'default', # Contains a string indentifying the unreduced node type
-                        'nbr_str': [],  # Contains neighbors directly up, down, left and right
-                        'nbr_diag': []} # Contains neighbors that connect diagonally
-                    neighbors = [(x-1, y), (x, y-1), (x+1, y), (x, y+1)]
-                    for pos in neighbors:
-                        if self.map[pos[0]][pos[1]] != 0:
-                            graph[nodes[x][y]]['neighbors'].append(nodes[pos[0]][pos[1]])
-                            graph[nodes[x][y]]['nbr_str'].append(nodes[pos[0]][pos[1]])
-
-                    # Check diagonal conectivity:
-                    diagonals = [(x-1, y-1), (x+1, y-1), (x-1, y+1), (x+1, y+1)]
-                    corners = [
-                        [(x - 1, y), (x, y - 1)],
-                        [(x + 1, y), (x, y - 1)],
-                        [(x - 1, y), (x, y + 1)],
-                        [(x + 1, y), (x, y + 1)]]
-
-                    for i, pos in enumerate(diagonals):
-                        if self.map[pos[0]][pos[1]] != 0:
-                            if (self.map[corners[i][0][0]][corners[i][0][1]] != 0) and \
-                               (self.map[corners[i][1][0]][corners[i][1][1]] != 0):
-                                # Diagonals only connect if they do not intersect a corner
-                                graph[nodes[x][y]]['neighbors'].append(nodes[pos[0]][pos[1]])
-                                graph[nodes[x][y]]['nbr_diag'].append(nodes[pos[0]][pos[1]])
+        types = np.zeros(num_str.shape, dtype=np.int8)
 
-        return graph
+        # Room nodes
+        types[num_str + num_diag > 4] = NODE_TYPES.index('room')
 
-    def _identify_node(self, node: int) -> str:
+        # Corner nodes
+        types[(num_str == 2) & (num_diag > 0) & ~aligned] = NODE_TYPES.index('corner_ccv')
+        types[(num_str == 3) & (num_diag == 1)] = NODE_TYPES.index('corner_drw')
+        types[(num_str == 4) & (num_diag == 3)] = NODE_TYPES.index('corner_cvx')
+
+        # Hallway nodes
+        hallway = num_diag == 0
+        types[hallway & (num_str == 1)] = NODE_TYPES.index('dead_end')
+        types[hallway & (num_str == 2) & ~aligned] = NODE_TYPES.index('L_junction')
+        types[hallway & (num_str == 2) & aligned] = NODE_TYPES.index('hallway')
+        types[hallway & (num_str == 3)] = NODE_TYPES.index('T_junction')
+        types[hallway & (num_str == 4)] = NODE_TYPES.index('X_junction')
+
+        types[np.asarray(self.map) == 0] = -1
+        return types
+
+    def make_graph(self) -> dict:
         """
-        Returns a string that identifies the type of node given
+        Returns a simple graph representation of the map, converted from the
+        grid arrays
         """
-        G = self.graph
-        type = 'default'  # Default type for node
-
-        # For nodes with two straight neighbors, get neighbor coordinates and check geometry
-        aligned = True
-        if len(G[node]['nbr_str']) == 2:  # Hallway corner nodes
-            xn1 = G[G[node]['nbr_str'][0]]['pos'][0]
-            xn2 = G[G[node]['nbr_str'][1]]['pos'][0]
-            yn1 = G[G[node]['nbr_str'][0]]['pos'][1]
-            yn2 = G[G[node]['nbr_str'][1]]['pos'][1]
-            if not (xn1 == xn2) and not (yn1 == yn2):
-                aligned = False
+        graph = {}
 
-        # Room nodes
-        if len(G[node]['neighbors']) > 4:  # Room nodes
-            type = 'room'
+        offsets = STRAIGHT_OFFSETS + DIAGONAL_OFFSETS
+        rows, cols = np.nonzero(self.raw_types >= 0)
+        for (row, col) in zip(rows.tolist(), cols.tolist()):
+            connected = self.neighbor_mask[:, row, col].tolist()
+            neighbors = [(row + d_row) * self.DIM_X + col + d_col
+                         for ((d_row, d_col), is_connected) in zip(offsets, connected)
+                         if is_connected]
+            num_str = sum(connected[:4])
+
+            graph[row * self.DIM_X + col] = {
+                'pos': tuple([col, row]),
+                'neighbors': neighbors,  # Contains all neighbors of the node
+                'raw_type': NODE_TYPES[self.raw_types[row, col]], # Contains a string indentifying the unreduced node type
+                'nbr_str': neighbors[:num_str],  # Contains neighbors directly up, down, left and right
+                'nbr_diag': neighbors[num_str:]} # Contains neighbors that connect diagonally
 
-        # Corner nodes
-        if len(G[node]['nbr_str']) == 2:  # Concave corner nodes
-            if len(G[node]['nbr_diag']) > 0:  # Make sure it is not a hallway corner
-                if not aligned:
-                    type = 'corner_ccv'
-        elif (len(G[node]['nbr_str']) == 3) and (len(G[node]['nbr_diag']) == 1):  # Doorway corners
-            type = 'corner_drw'
-        elif (len(G[node]['nbr_str']) == 4) and (len(G[node]['nbr_diag']) == 3):  # Convex corners
-            type = 'corner_cvx'
+        return graph
 
-        # Hallway nodes
-        if len(G[node]['nbr_diag']) == 0:  # Check it is a hallway node
-            if len(G[node]['nbr_str']) == 1:  # Dead ends
-                type = 'dead_end'
-            elif len(G[node]['nbr_str']) == 2:  # Hallway corner nodes
-                if not aligned:
-                    type = 'L_junction'
-                else:
-                    type = 'hallway'
-            elif len(G[node]['nbr_str']) == 3:  # T junction nodes
-                type = 'T_junction'
-            elif len(G[node]['nbr_str']) == 4:  # X junction nodes
-                type = 'X_junction'
+    def _identify_node(self, node: int) -> str:
+        """
+        Returns a string that identifies the type of node given. The types of
+        all nodes are classified once when the grid is built (see
+        _identify_grid), this only looks the type up.
+        """
+        type = self.raw_types.flat[node]
+        if type < 0:
+            raise KeyError(node)  # Solid boxes are not nodes of the graph
 
-        return type
+        return NODE_TYPES[type]
 
     def _is_cluster_node(self, node: int) -> bool:
         """
@@ -176,7 +386,7 @@ class RoomMap:
         (Room cluster nodes = room nodes and corner nodes)
         False otherwise
         """
-        type = self.graph[node]['raw_type']
+        type = self._identify_node(node)
 
         # Room nodes
         if type == 'room':  # Room nodes
@@ -208,12 +418,11 @@ class RoomMap:
         parent nodes or terminate at any goal node. Fully explores the entire connected
         component of G that is accessible from given node.
         """
-        Q = []  # Queue
+        Q = deque([node])  # Queue
         explored = set([node])  # List of explored nodes
-        Q.append(node)
 
         while len(Q) != 0:
-            v = Q.pop(0)  # Exctract node
+            v = Q.popleft()  # Exctract node
             for nbr in G[v]['neighbors']:
                 if nbr not in explored:
                     explored.add(nbr)
@@ -221,26 +430,13 @@ class RoomMap:
 
         return list(explored)
 
-    def _is_exit_node(self, G, node: int, room: List[int]) -> bool:
-        """
-        Returns True if given node is an exit/doorway node conected to the given
-        room cluster, in the given graph. False otherwise
-        """
-
-        for room_node in room:
-            if node not in room:
-                if room_node in G[node]['neighbors']:
-                    return True
-
-        return False
-
     def _is_corner_node(self, node: int) -> bool:
         """
         Returns True if given node is an exit/doorway node conected to the given
         room cluster, in the given graph. False otherwise
         """
 
-        type = self.graph[node]['raw_type']
+        type = self._identify_node(node)
 
         if (type == 'corner_ccv') | (type == 'corner_cvx') | (type == 'corner_drw'):
             return True
@@ -261,126 +457,181 @@ class RoomMap:
 
         return G_new
 
+    def grid_path(self, start: int, goal: int) -> List[int]:
+        """
+        Returns the nodes of a shortest path (in number of boxes) from start
+        to goal in the unreduced graph, including both ends. Empty if goal
+        cannot be reached. The search expands the whole frontier at once.
+        """
+        offsets = [d_row * self.DIM_X + d_col for (d_row, d_col) in STRAIGHT_OFFSETS + DIAGONAL_OFFSETS]
+        connected = self.neighbor_mask.reshape(len(offsets), -1)
+
+        parent = np.full(connected.shape[1], -1, dtype=np.int64)
+        parent[start] = start
+        frontier = np.array([start])
+        while len(frontier) != 0 and parent[goal] == -1:
+            reached = []
+            for (layer, offset) in zip(connected, offsets):
+                sources = frontier[layer[frontier]]
+                targets = sources + offset
+                new = parent[targets] == -1
+                parent[targets[new]] = sources[new]
+                reached.append(targets[new])
+            frontier = np.unique(np.concatenate(reached))
+
+        if parent[goal] == -1:
+            return []
+
+        path = [goal]
+        while path[-1] != start:
+            path.append(int(parent[path[-1]]))
+        return path[::-1]
+
+    def _grid_edges(self) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Returns every edge of the unreduced graph as arrays of (flattened)
+        source and target node ids. Edges are listed in both directions
+        """
+        sources = []
+        targets = []
+        for (layer, (d_row, d_col)) in zip(self.neighbor_mask,
+                                           STRAIGHT_OFFSETS + DIAGONAL_OFFSETS):
+            rows, cols = np.nonzero(layer)
+            sources.append(rows * self.DIM_X + cols)
+            targets.append((rows + d_row) * self.DIM_X + cols + d_col)
+
+        return np.concatenate(sources), np.concatenate(targets)
+
+    def _label_clusters(self, mask: np.ndarray) -> Tuple[np.ndarray, int]:
+        """
+        Split the boxes in the mask into clusters that are connected in the
+        unreduced graph. Returns the cluster index of every box (-1 outside
+        the mask) and the number of clusters
+        """
+        # Straight neighbors are always connected, so a 4-connected labeling
+        # finds most of each cluster
+        num_labels, labels = cv.connectedComponents(mask.astype(np.uint8), connectivity=4)
+        labels = labels.astype(np.int64) - 1  # Background becomes -1
+
+        # Diagonal neighbors only connect if they do not intersect a corner,
+        # so join the labels across the diagonal edges of the graph
+        union_find = UnionFind(num_labels - 1)
+        for (layer, (d_row, d_col)) in zip(self.neighbor_mask[4:], DIAGONAL_OFFSETS):
+            rows, cols = np.nonzero(layer & mask)
+            source = labels[rows, cols]
+            target = labels[rows + d_row, cols + d_col]
+            joined = (target >= 0) & (source != target)
+            for (a, b) in set(zip(source[joined].tolist(), target[joined].tolist())):
+                union_find.union(a, b)
+
+        # Number the merged clusters from 0
+        roots = np.array([union_find.find(label) for label in range(num_labels - 1)],
+                         dtype=np.int64)
+        unique_roots, compact = np.unique(roots, return_inverse=True)
+        labels[mask] = compact[labels[mask]]
+        return labels, len(unique_roots)
+
+    def _cluster_nodes(self, labels: np.ndarray, num_clusters: int) -> List[np.ndarray]:
+        """
+        Returns the (sorted) node ids of every cluster in the labels
+        """
+        if num_clusters == 0:
+            return []
+
+        flat = labels.ravel()
+        nodes = np.flatnonzero(flat >= 0)
+        order = np.argsort(flat[nodes], kind='stable')
+        counts = np.bincount(flat[nodes], minlength=num_clusters)
+        return np.split(nodes[order], np.cumsum(counts)[:-1])
+
+    @instrument
     def reduce_graph(self) -> dict:
         """
-        Reduces the graph representation to one node per room
-        """
-
-        M = copy.deepcopy(self.graph)  # Minimal graph (M is reduced version of G)
-
-        # 1. LOCATE AND REDUCE ROOMS  -------------------------------------------------
-        G = self.graph
-
-        # Find all room/corner nodes
-        room_nodes = [node for node in G if self._is_cluster_node(node)]
-
-        # Make graph that only contains room clusters
-        G_split = copy.deepcopy(G)
-        for node in G:
-            if not self._is_cluster_node(node):
-                G_split = self._remove_node_from_graph(G_split, node)
-
-        # Split into individual room clusters
-        rooms = []
-        nodes_to_check = room_nodes
-        while len(nodes_to_check) != 0:
-            start_node = nodes_to_check[0]  # Pick start node
-            cluster = self._bfs(G_split, start_node)  # Explore cluster
-            rooms.append(cluster)
-            for cluster_node in cluster:
-                nodes_to_check.remove(cluster_node)  # Remove cluster nodes from nodes_to_check
-
-        # Process each room cluster
-        for room in rooms:
-            # Find all exit nodes (doorway nodes that connect outside the cluster)
-            exit_nodes = [node for node in G if self._is_exit_node(G, node, room)]
-
-            # Delete all cluster room/corner nodes and insert new node at their avg location
-            avg_x = np.average([G[node]['pos'][0] for node in room])  # Find avg x pos of cluster
-            avg_y = np.average([G[node]['pos'][1] for node in room])  # Find avg y pos of cluster
-
-            # Exctract corners
-            corners = list([node for node in room if self._is_corner_node(node)])
-
-            for node_to_remove in room:
-                M = self._remove_node_from_graph(M, node_to_remove)  # Remove cluster nodes
-
-            M[room[0]] = {'pos': tuple([avg_x, avg_y]), # New node reuses one of the removed indexes
-                          'neighbors': [],              # to ensure it uses a free index
-                          'area': len(room), # Contains the area of the entire room (in boxes)
-                          'type': 'room',  # Marks this as a room
-                       'corners': corners, # List of node indexes comprising the room corner nodes
-                    'room_nodes': room,    # List of node indexes comprising the all the room nodes
-                   'is_dead_end': False}   # True if room only has 1 entry/exit
-
-            # Set dead end flag
-            if len(exit_nodes) == 1:
-                M[room[0]]['is_dead_end'] = True
-
-            # Reconnect exit nodes to new node (set neighbors)
-            for exit_node in exit_nodes:
-                M[room[0]]['neighbors'].append(exit_node)  # Connect room to exit
-                M[exit_node]['neighbors'].append(room[0])  # Connect exit to room
-
-        # Mark non-room nodes and cleanup
-        for node in M:
-            if 'type' not in M[node]:
-                if self._identify_node(node) != 'hallway':
-                    M[node]['type'] = 'junction'
-                    M[node]['area'] = 1 # Set area of jucntions to 1 since it is not set earlier
-                    M[node]['is_dead_end'] = False # Set dead end flag to false since it does not apply
-                else:
-                    M[node]['type'] = 'hallway'
-            M[node].pop('nbr_str', None) # Meaningless in the reduced graph so it is removed
-            M[node].pop('nbr_diag', None) # Meaningless in the reduced graph so it is removed
-            M[node].pop('raw_type', None) # Meaningless in the reduced graph so it is removed
-
-        # 2. LOCATE AND REDUCE HALLWAYS -------------------------------------------------
-        G = copy.deepcopy(M)
-
-        # Find all hallway nodes in reduced graph
-        hallway_nodes = [node for node in G if self._is_hallway_node(node)]
-
-        # Make graph that only contains hallway nodes
-        G_split = copy.deepcopy(G)
-        for node in G:
-            if not self._is_hallway_node(node):
-                G_split = self._remove_node_from_graph(G_split, node)
-
-        # Split into individual hallway strings
-        hallways = []
-        nodes_to_check = hallway_nodes
-        while len(nodes_to_check) != 0:
-            start_node = nodes_to_check[0]  # Pick start node
-            cluster = self._bfs(G_split, start_node)  # Explore cluster
-            hallways.append(cluster)
-            for cluster_node in cluster:
-                nodes_to_check.remove(cluster_node)  # Remove cluster nodes from nodes_to_check
-
-        # Process each hallway cluster
+        Reduces the graph representation to one node per room and one node
+        per straight hallway.
+
+        Rooms are the clusters of connected room/corner nodes and hallways
+        are the clusters of connected hallway nodes. Each cluster is replaced
+        by a single node, reusing the smallest node id of the cluster, at the
+        average position of the cluster. The remaining (junction) nodes are
+        kept as they are. Clusters are found by labeling the box grid, so
+        nothing is copied and every step is linear in the size of the map.
+        """
+        room_types = [NODE_TYPES.index(type) for type in
+                      ['room', 'corner_ccv', 'corner_cvx', 'corner_drw']]
+        corner_types = room_types[1:]
+
+        room_mask = np.isin(self.raw_types, room_types)
+        hallway_mask = self.raw_types == NODE_TYPES.index('hallway')
+
+        room_labels, num_rooms = self._label_clusters(room_mask)
+        hallway_labels, num_hallways = self._label_clusters(hallway_mask)
+        rooms = self._cluster_nodes(room_labels, num_rooms)
+        hallways = self._cluster_nodes(hallway_labels, num_hallways)
+
+        # Every node of the unreduced graph maps to the node representing it
+        # in the reduced graph, clusters use their smallest node id
+        node_ids = np.arange(self.DIM_X * self.DIM_Y)
+        representative = node_ids.copy()
+        for cluster in rooms + hallways:
+            representative[cluster] = cluster[0]
+
+        # Edges of the reduced graph, each unreduced edge that connects two
+        # different reduced nodes (i.e. a room to one of its exits)
+        sources, targets = self._grid_edges()
+        reduced_sources = representative[sources]
+        reduced_targets = representative[targets]
+        crossing = reduced_sources != reduced_targets
+        edges = np.unique(np.stack([reduced_sources[crossing],
+                                    reduced_targets[crossing]], axis=1), axis=0)
+
+        neighbors = {}
+        for (source, target) in edges.tolist():
+            neighbors.setdefault(source, []).append(target)
+
+        # Exit nodes of each room (doorway nodes that connect outside the
+        # cluster) in the unreduced graph, a room with only one is a dead end
+        flat_room_labels = room_labels.ravel()
+        leaving = (flat_room_labels[sources] >= 0) & (flat_room_labels[targets] < 0)
+        room_exits = np.unique(np.stack([flat_room_labels[sources[leaving]],
+                                         targets[leaving]], axis=1), axis=0)
+        num_exits = np.bincount(room_exits[:, 0], minlength=num_rooms)
+
+        M = {}  # Minimal graph (M is reduced version of G)
+        rows, cols = np.divmod(node_ids, self.DIM_X)
+
+        # 1. ROOMS -------------------------------------------------------------------
+        flat_types = self.raw_types.ravel()
+        for (index, room) in enumerate(rooms):
+            M[int(room[0])] = {
+                'pos': tuple([float(np.average(cols[room])), float(np.average(rows[room]))]),
+                'neighbors': neighbors.get(room[0], []),
+                'area': len(room),  # Contains the area of the entire room (in boxes)
+                'type': 'room',  # Marks this as a room
+                'corners': room[np.isin(flat_types[room], corner_types)].tolist(),  # Room corner nodes
+                'room_nodes': room.tolist(),  # List of node indexes comprising the all the room nodes
+                'is_dead_end': bool(num_exits[index] == 1)}  # True if room only has 1 entry/exit
+
+        # 2. HALLWAYS ----------------------------------------------------------------
         for hallway in hallways:
-            # Find all exit nodes (doorway nodes that connect outside the cluster)
-            exit_nodes = [node for node in G if self._is_exit_node(G, node, hallway)]
-
-            # Delete all cluster room/corner nodes and insert new node at their avg location
-            avg_x = np.average([G[node]['pos'][0] for node in hallway])  # Find avg x pos of cluster
-            avg_y = np.average([G[node]['pos'][1] for node in hallway])  # Find avg y pos of cluster
-
-            for node_to_remove in hallway:
-                M = self._remove_node_from_graph(M, node_to_remove)  # Remove cluster nodes
-
-            M[hallway[0]] = {'pos': tuple([avg_x, avg_y]),  # New node reuses one of the removed indexes
-                             'neighbors': [],  # to ensure it uses a free index
-                             'area': len(hallway), # Contains the area/length of the entire hallway (in boxes)
-                             'type': 'hallway', # Marks this as a room
-                      'is_dead_end': False}     # Always false since it does not apply
-
-            # Reconnect exit nodes to new node (set neighbors)
-            for exit_node in exit_nodes:
-                M[hallway[0]]['neighbors'].append(exit_node)  # Connect room to exit
-                M[exit_node]['neighbors'].append(hallway[0])  # Connect exit to room
-
-        return M
+            M[int(hallway[0])] = {
+                'pos': tuple([float(np.average(cols[hallway])), float(np.average(rows[hallway]))]),
+                'neighbors': neighbors.get(hallway[0], []),
+                'area': len(hallway),  # Contains the area/length of the entire hallway (in boxes)
+                'type': 'hallway',
+                'is_dead_end': False}  # Always false since it does not apply
+
+        # 3. JUNCTIONS ---------------------------------------------------------------
+        junctions = np.flatnonzero((flat_types >= 0) & ~room_mask.ravel() & ~hallway_mask.ravel())
+        for junction in junctions.tolist():
+            M[junction] = {
+                'pos': tuple([int(cols[junction]), int(rows[junction])]),
+                'neighbors': neighbors.get(junction, []),
+                'area': 1,  # Junctions are a single box
+                'type': 'junction',
+                'is_dead_end': False}  # Does not apply to junctions
+
+        return {node: M[node] for node in sorted(M)}
 
     def draw_box_grid(self) -> None:
         """
@@ -1,9 +1,12 @@
 from abc import abstractmethod
 from enum import Enum
 
+import numpy as np
+
 from surveillance.environment import Environment
 from surveillance.base import SurveillanceObject
 from surveillance.adversary import AdversaryPool
+from surveillance.instrumentation import instrument
 
 
 class SensorType(Enum):
@@ -20,8 +23,17 @@ class Sensor(SurveillanceObject):
         self.sensor_type = sensor_type
 
     @abstractmethod
+    def detected_adversaries(self, adversary_pool: AdversaryPool) -> np.ndarray:
+        """
+        Determine which adversaries are detected by the given sensor
+
+        :return: Boolean array with one entry per adversary in the pool
+        """
+        pass
+
+    @instrument
     def adversary_detected(self, adversary_pool: AdversaryPool) -> bool:
         """
         Determine if an advisary is detected by the given sensor
         """
-        return False
+        return bool(self.detected_adversaries(adversary_pool).any())
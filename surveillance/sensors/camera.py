@@ -5,7 +5,8 @@ from surveillance.environment import Environment
 from surveillance.adversary import AdversaryPool
 import numpy as np
 from typing import Tuple
-from surveillance.helpers import compute_angle
+from surveillance.raycast import cast_ray, cast_rays
+from surveillance.instrumentation import instrument
 
 
 class CameraSensor(Sensor):
@@ -22,32 +23,7 @@ class CameraSensor(Sensor):
 
         self.fov = self.fov * np.pi/180 # Convert deg to rad
 
-    def is_inside_viewcone(self, pose, px, py):
-        """
-        Returns true if given point (in pixel coordinates) is inside
-        the view cone of the camera (DOES NOT CHECK VISIBILITY)
-        """
-
-        # For point to be inside viewcone, it has to be within the FOV angle
-        # and has to be at a distance from the camera smaller than its max range
-        cx = pose.x
-        cy = pose.y
-        theta = pose.theta
-
-        # Check range (faster, so done first)
-        distance = np.sqrt((px - cx)**2 + (py - cy)**2)
-        if distance > self.range:
-            return False
-
-        # Check FOV cone
-        max_angle = theta + self.fov/2 # If angle to point exceeds this, point is outside the cone
-        min_angle = theta - self.fov/2 # If angle to point is below this, point is outside the cone
-        angle_to_point = compute_angle(cx, cy, px, py)
-        if (angle_to_point < min_angle) or (angle_to_point > max_angle):
-            return False
-
-        return True
-
+    @instrument
     def _get_endpoint(self, theta) -> Tuple[float, float]:
         """
         Get the end points of the line originating at the camera at angle theta
@@ -55,26 +31,25 @@ class CameraSensor(Sensor):
         if self.x is None or self.y is None or self.theta is None:
             raise Exception('Cannot display before sensor is placed')
 
-        distance = 0
-        self.next_x = self.x
-        self.next_y = self.y
-
-        while distance < self.range:
-            distance += 1
+        return cast_ray(self.environment, self.x, self.y, theta, self.range)
 
-            # Calculate the next point
-            next_x = self.x + distance * np.cos(theta)
-            next_y = self.y + distance * np.sin(theta)
-
-            # Check if the next point is in the environment
-            if not self.environment.in_environment(next_x, next_y):
-                break
+    def _ray_angles(self) -> np.ndarray:
+        """
+        Get the angles of the rays used for raytracing across the fov
+        """
+        return np.linspace(self.theta - self.fov/2, self.theta + self.fov/2,
+                           self.num_rays, endpoint=True)
 
-            # Check if the next point is in an object
-            if self.environment.in_object(next_x, next_y):
-                break
+    @instrument
+    def _get_endpoints(self) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Get the end points of every ray across the fov of the camera
+        """
+        if self.x is None or self.y is None or self.theta is None:
+            raise Exception('Cannot display before sensor is placed')
 
-        return next_x, next_y
+        return cast_rays(self.environment, self.x, self.y, self._ray_angles(),
+                         self.range)
 
     def display(self, ax: Axes, color='b') -> None:
         if self.x is None or self.y is None or self.theta is None:
@@ -106,33 +81,17 @@ class CameraSensor(Sensor):
         # Plot a point at the start
         ax.plot(self.x, self.y, str(color+'o'))
 
-    def adversary_detected(self, adversary_pool: AdversaryPool) -> bool:
+    @instrument
+    def detected_adversaries(self, adversary_pool: AdversaryPool) -> np.ndarray:
         """
-        Ray trace and determine if an adversary is detected
+        Determine which adversaries are crossed by any of the rays
         """
         if self.x is None or self.y is None or self.theta is None:
             raise Exception('Cannot display before sensor is placed')
 
-        for ray_angle in np.linspace(self.theta - self.fov/2, self.theta + self.fov/2,
-                                     self.num_rays, endpoint=True):
-
-            # Get ray endpoint and calculate ray length
-            end_point_x, end_point_y = self._get_endpoint(ray_angle)
-            length = np.sqrt((end_point_x - self.x)**2 + (end_point_y - self.y)**2)
-
-            # Check in 1 cm increments from start point to end point
-            for distance in np.arange(0, length, 1):
-                # Calculate the next point
-                next_x = self.x + distance * np.cos(ray_angle)
-                next_y = self.y + distance * np.sin(ray_angle)
-
-                # Check if the next point is in the adversary
-                if adversary_pool.in_adversary(next_x, next_y):
-                    return True
-
-                distance += 1
-
-        return False
+        end_points_x, end_points_y = self._get_endpoints()
+        return adversary_pool.segments_intersect(self.x, self.y,
+                                                 end_points_x, end_points_y)
 
     def update(self) -> None:
         """
@@ -4,6 +4,8 @@ from surveillance.environment import Environment
 from surveillance.adversary import AdversaryPool
 import numpy as np
 from typing import Tuple
+from surveillance.raycast import cast_ray
+from surveillance.instrumentation import instrument
 
 
 class LineSensor(Sensor):
@@ -12,6 +14,7 @@ class LineSensor(Sensor):
 
         self.range = config.get('range', np.inf)
 
+    @instrument
     def _get_endpoint(self) -> Tuple[float, float]:
         """
         Get the end point of the line sensor based on the current
@@ -20,26 +23,8 @@ class LineSensor(Sensor):
         if self.x is None or self.y is None or self.theta is None:
             raise Exception('Cannot display before sensor is placed')
 
-        distance = 0
-        self.next_x = self.x
-        self.next_y = self.y
-
-        while distance < self.range:
-            distance += 1
-
-            # Calculate the next point
-            next_x = self.x + distance * np.cos(self.theta)
-            next_y = self.y + distance * np.sin(self.theta)
-
-            # Check if the next point is in the environment
-            if not self.environment.in_environment(next_x, next_y):
-                break
-
-            # Check if the next point is in an object
-            if self.environment.in_object(next_x, next_y):
-                break
-
-        return next_x, next_y
+        return cast_ray(self.environment, self.x, self.y, self.theta,
+                        self.range)
 
     def display(self, ax: Axes, color='b') -> None:
         if self.x is None or self.y is None or self.theta is None:
@@ -59,28 +44,17 @@ class LineSensor(Sensor):
         # Plot a point at the start
         ax.plot(start_point_x, start_point_y, 'bo')
 
-    def adversary_detected(self, adversary_pool: AdversaryPool) -> bool:
+    @instrument
+    def detected_adversaries(self, adversary_pool: AdversaryPool) -> np.ndarray:
         """
-        Ray trace and determine if an adversary is detected
+        Determine which adversaries cross the line of the sensor
         """
         if self.x is None or self.y is None or self.theta is None:
             raise Exception('Cannot display before sensor is placed')
 
-        # Get the end point
         end_point_x, end_point_y = self._get_endpoint()
-        length = np.sqrt((end_point_x - self.x)**2 + (end_point_y - self.y)**2)
-
-        # Check in 1 cm increments from start point to end point
-        for distance in np.arange(0, length, 1):
-            # Calculate the next point
-            next_x = self.x + distance * np.cos(self.theta)
-            next_y = self.y + distance * np.sin(self.theta)
-
-            # Check if the next point is in the adversary
-            if adversary_pool.in_adversary(next_x, next_y):
-                return True
-
-        return False
+        return adversary_pool.segments_intersect(self.x, self.y,
+                                                 end_point_x, end_point_y)
 
     def update(self) -> None:
         """
@@ -7,6 +7,8 @@ import numpy as np
 
 from surveillance.sensors.base import Sensor, SensorType
 from surveillance.environment import Environment
+from surveillance.raycast import cast_ray, cast_rays
+from surveillance.instrumentation import instrument
 
 
 class Robot(Sensor):
@@ -23,6 +25,28 @@ class Robot(Sensor):
         self.angle_resolution = math.radians(config.get('angle_resolution', 1))
         self.environment = environment
 
+        # Waypoints (in CMs) that the robot patrols in a loop, shape (n, 2)
+        self.route = None
+        self.route_index = 0
+
+    def place(self, x: float, y: float, theta: float) -> None:
+        super().place(x, y, theta)
+        self.route_index = 0
+
+    def follow(self, route) -> None:
+        """
+        Patrol the given waypoints (in CMs) in a loop, starting at the first.
+        The path between consecutive waypoints must be free
+        """
+        route = np.asarray(route, dtype=float).reshape(-1, 2)
+
+        # Drop repeated waypoints (the route is a loop, so the last waypoint
+        # comes before the first)
+        moves = np.any(route != np.roll(route, 1, axis=0), axis=1)
+        self.route = route[moves] if moves.any() else route[:1]
+        self.route_index = 0
+
+    @instrument
     def _get_endpoint(self, theta: float) -> Tuple[float, float]:
         """
         Get the end points of the line originating at the camera at angle theta
@@ -30,26 +54,26 @@ class Robot(Sensor):
         if self.x is None or self.y is None or self.theta is None:
             raise Exception('Cannot display before sensor is placed')
 
-        distance = 0
-        self.next_x = self.x
-        self.next_y = self.y
+        return cast_ray(self.environment, self.x, self.y, theta, self.range)
 
-        while distance < self.range:
-            distance += 1
-
-            # Calculate the next point
-            next_x = self.x + distance * np.cos(theta)
-            next_y = self.y + distance * np.sin(theta)
-
-            # Check if the next point is in the environment
-            if not self.environment.in_environment(next_x, next_y):
-                break
+    def _ray_angles(self) -> np.ndarray:
+        """
+        Get the angles of the LIDAR rays across the fov
+        """
+        return np.arange(self.theta - self.fov / 2,
+                         self.theta + self.fov / 2,
+                         self.angle_resolution)
 
-            # Check if the next point is in an object
-            if self.environment.in_object(next_x, next_y):
-                break
+    @instrument
+    def _get_endpoints(self) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Get the end points of every LIDAR ray across the fov
+        """
+        if self.x is None or self.y is None or self.theta is None:
+            raise Exception('Cannot display before sensor is placed')
 
-        return next_x, next_y
+        return cast_rays(self.environment, self.x, self.y, self._ray_angles(),
+                         self.range)
 
     def display(self, ax: Axes, color='b') -> None:
         """
@@ -63,21 +87,21 @@ class Robot(Sensor):
         ax.add_artist(circle)
 
         # Display the LIDAR, remove collisions with the environment
-        for theta in np.arange(self.theta - self.fov / 2,
-                               self.theta + self.fov / 2,
-                               self.angle_resolution):
-            # Get the end point
-            end_point_x, end_point_y = self._get_endpoint(theta)
-
+        end_points_x, end_points_y = self._get_endpoints()
+        for (end_point_x, end_point_y) in zip(end_points_x, end_points_y):
             # Plot the line
             ax.plot([x_pos, end_point_x * self.cm_to_pixel],
                     [y_pos, end_point_y * self.cm_to_pixel], 'b-')
 
     def update(self) -> None:
         """
-        Movement with the robot moving forward or turning 90 degrees
-        if it cannot move forward
+        Movement along the route of the robot when it has one, otherwise
+        the robot moves forward or turns 90 degrees if it cannot move forward
         """
+        if self.route is not None and len(self.route) != 0:
+            self._follow_route()
+            return
+
         # Check if the path forward is clear accounting for the radius
         x_i = self.x + self.speed * np.cos(self.theta)
         y_i = self.y + self.speed * np.sin(self.theta)
@@ -94,28 +118,42 @@ class Robot(Sensor):
             # Turn 90 degrees
             self.theta += np.pi / 2
 
-    def adversary_detected(self, adversary_pool) -> bool:
+    def _follow_route(self) -> None:
         """
-        Ray trace and determine if an adversary is detected
+        Move up to speed CMs along the route, facing the next waypoint. A
+        robot with a single waypoint stays there and turns to sweep the
+        LIDAR around
+        """
+        if len(self.route) == 1:
+            self.x, self.y = self.route[0]
+            self.theta += self.fov
+            return
+
+        remaining = self.speed
+        while remaining > 0:
+            target_x, target_y = self.route[self.route_index]
+            distance = math.hypot(target_x - self.x, target_y - self.y)
+            if distance > 0:
+                self.theta = math.atan2(target_y - self.y, target_x - self.x)
+
+            if distance > remaining:
+                self.x += remaining * math.cos(self.theta)
+                self.y += remaining * math.sin(self.theta)
+                return
+
+            # Reached the waypoint, carry on to the next one
+            self.x, self.y = target_x, target_y
+            remaining -= distance
+            self.route_index = (self.route_index + 1) % len(self.route)
+
+    @instrument
+    def detected_adversaries(self, adversary_pool) -> np.ndarray:
+        """
+        Determine which adversaries are crossed by any of the rays
         """
         if self.x is None or self.y is None or self.theta is None:
             raise Exception('Cannot display before sensor is placed')
 
-        for theta in np.arange(self.theta - self.fov / 2,
-                               self.theta + self.fov / 2,
-                               self.angle_resolution):
-            # Get the end point
-            end_point_x, end_point_y = self._get_endpoint(theta)
-            length = np.sqrt((end_point_x - self.x)**2 + (end_point_y - self.y)**2)
-
-            # Check in 1 cm increments from start point to end point
-            for distance in np.arange(0, length, 1):
-                # Calculate the next point
-                next_x = self.x + distance * np.cos(theta)
-                next_y = self.y + distance * np.sin(theta)
-
-                # Check if the next point is in the adversary
-                if adversary_pool.in_adversary(next_x, next_y):
-                    return True
-
-        return False
+        end_points_x, end_points_y = self._get_endpoints()
+        return adversary_pool.segments_intersect(self.x, self.y,
+                                                 end_points_x, end_points_y)
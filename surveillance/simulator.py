@@ -0,0 +1,112 @@
+from dataclasses import dataclass
+from typing import Callable, List, Optional
+
+import numpy as np
+
+from surveillance.adversary import AdversaryPool
+from surveillance.environment import Environment
+from surveillance.instrumentation import count, instrument
+from surveillance.sensors.base import Sensor
+
+
+@dataclass
+class DetectionEvent:
+    timestep: int
+    sensor: Sensor
+    adversaries: np.ndarray  # Indexes of the adversaries in the pool that were detected
+
+
+StepCallback = Callable[[int, List[DetectionEvent]], None]
+
+
+class Simulator:
+    """
+    Runs the sense/update loop of a surveillance configuration without any
+    plotting. Sensors are expected to already be placed.
+
+    Every timestep the sensors look for adversaries, then the sensors and
+    adversaries are updated. Anything that wants to watch the simulation
+    (i.e. a viewer) can register a callback that is fired once a timestep
+    after sensing and before anything moves.
+    """
+    def __init__(self, environment: Environment, sensors: List[Sensor],
+                 adversary_pool: AdversaryPool, max_timesteps: float = np.inf):
+        self.environment = environment
+        self.sensors = sensors
+        self.adversary_pool = adversary_pool
+        self.max_timesteps = max_timesteps
+
+        self.timestep = 0
+        self.callbacks: List[StepCallback] = []
+
+    def add_callback(self, callback: StepCallback) -> None:
+        """
+        Register a function that is called every timestep with the timestep
+        and the detection events of that timestep
+        """
+        self.callbacks.append(callback)
+
+    @instrument
+    def sense(self) -> List[DetectionEvent]:
+        """
+        Determine which adversaries each sensor detects at the current
+        timestep
+        """
+        events = []
+        for sensor in self.sensors:
+            detected = np.flatnonzero(sensor.detected_adversaries(self.adversary_pool))
+            if len(detected) != 0:
+                events.append(DetectionEvent(self.timestep, sensor, detected))
+        return events
+
+    def step(self) -> List[DetectionEvent]:
+        """
+        Run a single timestep of the simulation
+
+        :return: The detection events of the timestep
+        """
+        events = self.sense()
+
+        for callback in self.callbacks:
+            callback(self.timestep, events)
+
+        # Update sensors
+        for sensor in self.sensors:
+            sensor.update()
+
+        # Update adversaries
+        self.adversary_pool.update()
+
+        count('timesteps')
+        count('detection events', len(events))
+
+        self.timestep += 1
+        return events
+
+    def run(self, on_step: Optional[StepCallback] = None,
+            keep_events: bool = True) -> List[DetectionEvent]:
+        """
+        Run the simulation until max_timesteps is reached
+
+        :param on_step: Optional callback fired every timestep in addition to
+                        the registered callbacks
+        :param keep_events: Collect the events to return, turn it off for
+                            runs without a max_timesteps and handle the
+                            events in on_step instead
+        :return: Every detection event of the run in timestep order, empty
+                 when keep_events is off
+        """
+        if on_step is not None:
+            self.add_callback(on_step)
+
+        events = []
+        try:
+            while self.timestep < self.max_timesteps:
+                step_events = self.step()
+                if keep_events:
+                    events.extend(step_events)
+        finally:
+            if on_step is not None:
+                self.callbacks.remove(on_step)
+
+        return events
@@ -0,0 +1,37 @@
+"""
+Testing the headless simulator
+"""
+from surveillance.adversary import Adversary, AdversaryPool
+from surveillance.environment import Environment
+from surveillance.sensors.line import LineSensor
+from surveillance.simulator import Simulator
+
+
+def test_detection_events():
+    environment = Environment('assets/small_map.png', 1, 'assets/small_map.pickle')
+
+    # Line sensor across the first room, adversary walking into it
+    sensor = LineSensor(1, environment, {'name': 'Line'})
+    sensor.place(150, 60, 1.5707963267948966)
+    adversary = Adversary(1, {'radius': 5, 'speed': 10}, environment)
+    pool = AdversaryPool([adversary])
+    adversary.place(75, 100, 0)
+
+    steps = []
+    simulator = Simulator(environment, [sensor], pool, max_timesteps=20)
+    events = simulator.run(on_step=lambda timestep, events: steps.append(timestep))
+
+    assert steps == list(range(20))
+    assert len(events) != 0
+    assert all(event.sensor is sensor for event in events)
+    assert all(event.adversaries.tolist() == [0] for event in events)
+
+    # The adversary is seen as soon as its edge reaches the line
+    assert events[0].timestep == 7
+
+    # The same events reach the callback when they are not kept
+    streamed = []
+    simulator = Simulator(environment, [sensor], pool, max_timesteps=20)
+    adversary.place(75, 100, 0)
+    assert simulator.run(lambda timestep, events: streamed.extend(events), keep_events=False) == []
+    assert [event.timestep for event in streamed] == [event.timestep for event in events]
@@ -0,0 +1,154 @@
+"""
+Uniform grid index of points (the adversaries) over the environment map, so
+that queries only look at the points in the cells they cross
+"""
+import math
+from typing import Tuple
+
+import numpy as np
+
+
+# 3 x 3 block of cells around a cell
+_NEIGHBORHOOD = np.array([(d_row, d_col) for d_row in (-1, 0, 1) for d_col in (-1, 0, 1)])
+
+
+class UniformGrid:
+    """
+    Square cells of cell_px x cell_px pixels of Environment.map. Every point
+    is kept in the cell its center falls in (points outside of the map are
+    kept in the closest cell), as a list of the points sorted by cell.
+
+    Queries look for points within one cell of what they cover, so the cells
+    must be at least twice as large as the radius of the largest point (the
+    segments are sampled every half cell).
+    """
+    # Above this fraction of points changing cell the index is rebuilt
+    # instead of moving the points one by one
+    REBUILD_FRACTION = 0.1
+
+    def __init__(self, map_shape: Tuple[int, int], cm_to_pixel: float, cell_px: int):
+        """
+        :param map_shape: Shape of Environment.map in pixels
+        :param cell_px: Size of a cell in pixels
+        """
+        self.cell_cm = cell_px / cm_to_pixel
+        self.num_rows = max(1, math.ceil(map_shape[0] / cell_px))
+        self.num_cols = max(1, math.ceil(map_shape[1] / cell_px))
+
+        # Cell ids are stored in the smallest type that holds them, numpy
+        # sorts 16 bit integers far faster than larger ones
+        num_cells = self.num_rows * self.num_cols
+        self.dtype = np.int16 if num_cells < 2**15 else np.int32 if num_cells < 2**31 else np.int64
+
+        self.cells = np.empty(0, dtype=self.dtype)  # Cell of every point, -1 for NaN
+        self.order = np.empty(0, dtype=np.intp)  # Points sorted by cell
+        self.sorted_cells = np.empty(0, dtype=self.dtype)  # Cell of each point in order
+
+    def _row_col(self, x, y) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Cell row and column of points given in CMs, clipped to the grid
+        """
+        row = np.clip(np.floor(np.asarray(y, dtype=float) / self.cell_cm), 0, self.num_rows - 1)
+        col = np.clip(np.floor(np.asarray(x, dtype=float) / self.cell_cm), 0, self.num_cols - 1)
+        return row.astype(np.intp), col.astype(np.intp)
+
+    def cell_of(self, x, y) -> np.ndarray:
+        """
+        Cell id (row * num_cols + col) of points given in CMs, -1 for NaN
+        """
+        x = np.asarray(x, dtype=float)
+        y = np.asarray(y, dtype=float)
+        placed = np.isfinite(x) & np.isfinite(y)
+        row, col = self._row_col(np.where(placed, x, 0), np.where(placed, y, 0))
+        return np.where(placed, row * self.num_cols + col, -1).astype(self.dtype)
+
+    def build(self, x: np.ndarray, y: np.ndarray) -> None:
+        """
+        Index every point from scratch
+        """
+        self._index(self.cell_of(x, y))
+
+    def _index(self, cells: np.ndarray) -> None:
+        self.cells = cells
+        self.order = np.argsort(cells, kind='stable')
+        self.sorted_cells = cells[self.order]
+
+    def update(self, x: np.ndarray, y: np.ndarray) -> None:
+        """
+        Move the points that changed cell since the last update, the rest of
+        the index is kept as it is
+        """
+        cells = self.cell_of(x, y)
+        if len(cells) != len(self.cells):
+            self._index(cells)
+            return
+
+        moved = np.flatnonzero(cells != self.cells)
+        if len(moved) == 0:
+            return
+        if len(moved) > self.REBUILD_FRACTION * len(cells):
+            self._index(cells)
+            return
+
+        # Take the moved points out, then insert them at their new cells
+        is_moved = np.zeros(len(cells), dtype=bool)
+        is_moved[moved] = True
+        keep = ~is_moved[self.order]
+        order = self.order[keep]
+        sorted_cells = self.sorted_cells[keep]
+
+        moved = moved[np.argsort(cells[moved], kind='stable')]
+        positions = np.searchsorted(sorted_cells, cells[moved], side='right')
+        self.order = np.insert(order, positions, moved)
+        self.sorted_cells = np.insert(sorted_cells, positions, cells[moved])
+        self.cells[moved] = cells[moved]
+
+    def points_in(self, cells: np.ndarray) -> np.ndarray:
+        """
+        Indexes of the points in the given cells, which must be unique
+        """
+        cells = np.asarray(cells, dtype=self.dtype)
+        start = np.searchsorted(self.sorted_cells, cells, side='left')
+        counts = np.searchsorted(self.sorted_cells, cells, side='right') - start
+
+        # Concatenate the runs [start, start + count) of every cell
+        offsets = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+        return self.order[np.repeat(start, counts) + offsets]
+
+    def _around(self, row: np.ndarray, col: np.ndarray) -> np.ndarray:
+        """
+        Unique cells within one cell of the given cells
+        """
+        # Many of the given cells repeat (i.e. samples along a segment)
+        cells = np.unique(row * self.num_cols + col)
+        row, col = np.divmod(cells, self.num_cols)
+
+        rows = np.clip(row[:, None] + _NEIGHBORHOOD[:, 0], 0, self.num_rows - 1)
+        cols = np.clip(col[:, None] + _NEIGHBORHOOD[:, 1], 0, self.num_cols - 1)
+        return np.unique(rows * self.num_cols + cols)
+
+    def cells_near_points(self, x, y) -> np.ndarray:
+        """
+        Cells that may hold a point within one cell size of the given points
+        """
+        row, col = self._row_col(np.atleast_1d(x), np.atleast_1d(y))
+        return self._around(row, col)
+
+    def cells_near_segments(self, x0, y0, x1, y1) -> np.ndarray:
+        """
+        Cells that may hold a point within one cell size of the given line
+        segments. Each segment is sampled every half cell, every point of the
+        segment is then within a quarter cell of a sample
+        """
+        x0, y0, x1, y1 = [np.atleast_1d(np.asarray(value, dtype=float))
+                          for value in np.broadcast_arrays(x0, y0, x1, y1)]
+
+        lengths = np.hypot(x1 - x0, y1 - y0)
+        counts = np.ceil(lengths / (self.cell_cm / 2)).astype(np.intp) + 1
+        segment = np.repeat(np.arange(len(counts)), counts)
+        step = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+        t = step / np.maximum(counts - 1, 1)[segment]
+
+        x = x0[segment] + t * (x1 - x0)[segment]
+        y = y0[segment] + t * (y1 - y0)[segment]
+        return self.cells_near_points(x, y)
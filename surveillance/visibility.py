@@ -0,0 +1,78 @@
+"""
+Occlusion aware coverage, computed by rasterizing the part of a view cone
+that can be seen from its origin against the environment bitmap
+"""
+from typing import Optional, Tuple
+
+import cv2 as cv
+import numpy as np
+
+from surveillance.environment import Environment
+from surveillance.raycast import cast_rays
+
+
+# Fractional bits of the polygon vertices when rasterizing
+SUBPIXEL_BITS = 4
+
+# A window of the environment map given as (top, left, height, width) in pixels
+Window = Tuple[int, int, int, int]
+
+
+def visibility_polygon(environment: Environment, x: float, y: float, theta: float,
+                       fov: float, max_range: float = np.inf) -> np.ndarray:
+    """
+    Find the visibility polygon of a view cone: the origin followed by where
+    rays cast across the fov stop. One ray is cast per pixel of arc at the
+    furthest distance a ray can reach, so no pixel falls between two rays.
+
+    :param x: The x location of the origin in CMs
+    :param y: The y location of the origin in CMs
+    :param theta: The direction the cone faces in radians
+    :param fov: The angle of the cone in radians
+    :param max_range: The range of the cone in CMs
+    :return: The vertices of the polygon in pixels, shape (vertices, 2)
+    """
+    cm_to_pixel = environment.cm_to_pixel
+    reach_px = min(max_range * cm_to_pixel, np.hypot(*environment.map.shape) + 1)
+    num_rays = max(int(np.ceil(fov * reach_px)), 1) + 1
+
+    thetas = np.linspace(theta - fov/2, theta + fov/2, num_rays)
+    end_x, end_y = cast_rays(environment, x, y, thetas, max_range)
+
+    return np.column_stack([np.concatenate([[x], end_x]),
+                            np.concatenate([[y], end_y])]) * cm_to_pixel
+
+
+def visibility_mask(environment: Environment, x: float, y: float, theta: float,
+                    fov: float, max_range: float = np.inf,
+                    window: Optional[Window] = None) -> np.ndarray:
+    """
+    Find the empty pixels of the environment that can be seen within a view
+    cone. Walls block the view.
+
+    :param window: Only compute the mask for this part of the map, by default
+                   the whole map is used. Rays are not cast further than the
+                   window reaches
+    :return: Boolean mask over the window
+    """
+    if window is None:
+        window = (0, 0) + environment.map.shape
+    top, left, height, width = window
+
+    # Nothing past the furthest corner of the window can be in it
+    corners_x = np.array([left, left + width]) / environment.cm_to_pixel
+    corners_y = np.array([top, top + height]) / environment.cm_to_pixel
+    furthest = np.hypot(np.max(np.abs(corners_x - x)), np.max(np.abs(corners_y - y)))
+    polygon = visibility_polygon(environment, x, y, theta, fov,
+                                 min(max_range, furthest))
+
+    # Pixel (row, col) covers [col, col + 1) x [row, row + 1) while OpenCV
+    # puts pixel centers on integer coordinates
+    polygon = polygon - [left + 0.5, top + 0.5]
+    vertices = np.round(polygon * (1 << SUBPIXEL_BITS)).astype(np.int32)
+
+    mask = np.zeros((height, width), dtype=np.uint8)
+    cv.fillPoly(mask, [vertices], 1, lineType=cv.LINE_8, shift=SUBPIXEL_BITS)
+
+    free = environment.map[top:top + height, left:left + width] != 0
+    return (mask != 0) & free
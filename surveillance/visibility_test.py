@@ -0,0 +1,53 @@
+import numpy as np
+import pytest
+
+from surveillance.environment import Environment
+from surveillance.raycast import cast_rays
+from surveillance.visibility import visibility_mask
+
+
+@pytest.fixture(scope='module')
+def environment():
+    return Environment('assets/big_map.png', 1, 'assets/big_map.pickle')
+
+
+def _reference_mask(environment, x, y, theta, fov, max_range):
+    """
+    Cast a ray to the center of every empty pixel in the cone and keep the
+    pixels the ray reaches
+    """
+    rows, cols = np.nonzero(environment.map != 0)
+    px = cols + 0.5
+    py = rows + 0.5
+    distance = np.hypot(px - x, py - y)
+    angle = np.arctan2(py - y, px - x)
+    offset = np.angle(np.exp(1j * (angle - theta)))
+    in_cone = np.flatnonzero((distance <= max_range) & (np.abs(offset) <= fov / 2))
+
+    end_x, end_y = cast_rays(environment, x, y, angle[in_cone], max_range)
+    seen = np.hypot(end_x - x, end_y - y) >= distance[in_cone] - 1
+
+    mask = np.zeros(environment.map.shape, dtype=bool)
+    mask[rows[in_cone[seen]], cols[in_cone[seen]]] = True
+    return mask
+
+
+@pytest.mark.parametrize('pose', [(425, 325, -0.6), (925, 75, 2.85), (75, 225, -0.98)])
+def test_visibility_mask_matches_per_pixel_rays(environment, pose):
+    x, y, theta = pose
+    fov = np.deg2rad(60)
+    mask = visibility_mask(environment, x, y, theta, fov, 300)
+    expected = _reference_mask(environment, x, y, theta, fov, 300)
+
+    # Only pixels on the boundary of the cone or of a shadow may differ
+    assert (mask ^ expected).sum() <= 0.02 * expected.sum()
+
+
+def test_visibility_mask_window(environment):
+    mask = visibility_mask(environment, 425, 325, -0.6, np.deg2rad(60), 300)
+    window = (200, 400, 150, 250)
+    windowed = visibility_mask(environment, 425, 325, -0.6, np.deg2rad(60), 300, window)
+
+    # Fewer rays are cast for the window, so only the edges may differ
+    expected = mask[200:350, 400:650]
+    assert (windowed ^ expected).sum() <= 0.01 * expected.sum()